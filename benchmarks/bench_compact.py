@@ -0,0 +1,79 @@
+"""Memory and set operation speed of the results dict vs. compact.CompactResults.
+
+Builds synthetic accounts (followers overlapping with following and with each
+other) and measures the memory of both representations with tracemalloc.
+
+Usage: python benchmarks/bench_compact.py [followers] [accounts]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import compact
+
+
+def synthetic_results(followers, accounts):
+    now = "2024-05-01 12:00:00"
+    population = [f"user-{i:07d}" for i in range(followers * 2)]
+    results = {}
+    for a in range(accounts):
+        rng = random.Random(a)
+        follower_set = set(rng.sample(population, followers))
+        following_set = set(rng.sample(population, followers // 2))
+        results[f"account{a}"] = {
+            "followers": follower_set,
+            "following": following_set,
+            "follower_timestamps": {login: now for login in follower_set},
+            "following_timestamps": {login: now for login in following_set},
+            "last_update": {"followers": now, "following": now},
+        }
+    return results
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size, elapsed
+
+
+def timed(name, func, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    print(f"{name:<28} {(time.perf_counter() - start) / repeat * 1000:8.2f} ms  ({len(result)} logins)")
+    return result
+
+
+def main():
+    followers = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    accounts = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    print(f"{accounts} accounts with {followers} followers, NumPy: {'yes' if compact.np is not None else 'no'}")
+    results, dict_size, dict_time = measure(lambda: synthetic_results(followers, accounts))
+    compact_results, compact_size, _ = measure(lambda: compact.CompactResults.from_results(results))
+    start = time.perf_counter()  # tracemalloc slows the build down, time it again without
+    compact_results = compact.CompactResults.from_results(results)
+    compact_time = time.perf_counter() - start
+    print(f"{'results dict':<28} {dict_size / 2**20:8.1f} MiB")
+    print(f"{'CompactResults':<28} {compact_size / 2**20:8.1f} MiB  (built in {compact_time:.2f} s)")
+    print(f"{'ratio':<28} {dict_size / compact_size:8.1f} x")
+
+    account = results["account0"]
+    dict_back = timed("dict: not following back", lambda: account["following"] - account["followers"])
+    compact_back = timed("compact: not following back", lambda: compact_results.not_following_back("account0"))
+    assert dict_back == set(compact_back), "compact result differs"
+    timed("dict: mutual followers", lambda: results["account0"]["followers"] & results["account1"]["followers"]
+          if accounts > 1 else set())
+    timed("compact: mutual followers", lambda: compact_results.mutual_followers("account0", "account1"))
+    assert compact_results.account("account0").as_dict() == account, "as_dict() differs"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compares the old serial pagination loop with github_api.fetch_logins.
+
+The second fetch_logins run repeats the refresh with a warm ETag cache, so
+every page is answered with 304 Not Modified.
+
+Usage: python benchmarks/bench_fetch.py [followers] [latency_seconds]
+"""
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import github_api
+from github_stub import StubConfig, start_stub
+
+
+def serial_fetch(base_url, username, endpoint_type, per_page=100):
+    # The loop fetch_github_data used before: one fresh request per page.
+    all_logins = []
+    page = 1
+    while True:
+        url = f"{base_url}/users/{username}/{endpoint_type}?per_page={per_page}&page={page}"
+        response = requests.get(url)
+        response.raise_for_status()
+        data = response.json()
+        all_logins.extend(item["login"] for item in data)
+        if len(data) < per_page:
+            break
+        page += 1
+    return all_logins
+
+
+def run(name, func, pages):
+    start = time.perf_counter()
+    logins = func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} {len(logins):>7} logins  {elapsed:7.3f} s  {pages / elapsed:8.1f} pages/s")
+    return logins
+
+
+def main():
+    followers = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    config = StubConfig(followers=followers, latency=latency)
+    server, base_url = start_stub(config)
+    pages = -(-followers // github_api.PER_PAGE) + (followers % github_api.PER_PAGE == 0)
+    print(f"{followers} followers, {latency * 1000:.0f} ms latency per request")
+    github_api._cache = github_api.ConditionalCache(path=None)  # in-memory only
+    fetch = lambda: github_api.fetch_logins("octocat", "followers", base_url=base_url)
+    try:
+        serial = run("serial", lambda: serial_fetch(base_url, "octocat", "followers"), pages)
+        pooled = run("concurrent", fetch, pages)
+        assert serial == pooled, "concurrent fetch returned a different result"
+        before = config.not_modified_count
+        cached = run("conditional", fetch, pages)
+        assert serial == cached, "conditional refresh returned a different result"
+        print(f"{config.not_modified_count - before} of {pages} pages answered with 304")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Scores synthetic user details with scoring.ScoreEngine vs. calling calculate_score per user.
+
+Usage: python benchmarks/bench_scoring.py [users]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import scoring
+
+
+def synthetic_details(users):
+    rng = random.Random(1)
+    return {f"user-{i:07d}": {
+        "followers": rng.randint(0, 5000), "public_repos": rng.randint(0, 300), "public_gists": rng.randint(0, 50),
+        "site_admin": i % 5000 == 0, "created_at": f"20{rng.randint(8, 23):02d}-{rng.randint(1, 12):02d}-15T10:00:00Z",
+    } for i in range(users)}
+
+
+def timed(name, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{name:<32} {(time.perf_counter() - start) * 1000:9.2f} ms")
+    return result
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    details = synthetic_details(users)
+    print(f"{users} users, NumPy: {'yes' if scoring.np is not None else 'no'}")
+    per_user = timed("score_details per user + sort", lambda: sorted(
+        details, key=lambda login: scoring.score_details(details[login]), reverse=True)[:10])
+    engine = scoring.ScoreEngine()
+    timed("ScoreEngine.update (all)", lambda: engine.update(details))
+    top = timed("top 10 (first ranking)", lambda: engine.top_k(10))
+    timed("top 10 (cached ranking)", lambda: engine.top_k(10))
+    followers = random.Random(2).sample(list(details), min(users, 5000))
+    timed("top 10 of 5000 followers", lambda: engine.top_k(10, followers))
+    timed("percentile", lambda: engine.percentile(followers[0]))
+    changed = {login: dict(details[login], followers=details[login]["followers"] + 1) for login in followers[:100]}
+    timed("update 100 changed + re-rank", lambda: (engine.update(changed), engine.top_k(10)))
+    # Compare scores, not logins: users with the same integer score may come in any order
+    assert [score for login, score in top] == [scoring.score_details(details[login]) for login in per_user], \
+        "rankings differ"
+
+
+if __name__ == "__main__":
+    main()
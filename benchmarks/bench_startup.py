@@ -0,0 +1,90 @@
+"""Startup time: loading all accounts (core.load_results) vs. lazy loading (core.load_results_lazy).
+
+Creates a synthetic data file with many large accounts and cached user
+details, then measures both startup paths in fresh interpreters, including
+the imports. Fails (exit code 1) if the lazy startup takes longer than the
+budget or imports requests, so it can guard against regressions.
+
+Usage: python benchmarks/bench_startup.py [accounts] [followers] [budget_seconds]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import storage
+
+EAGER = """
+import core
+store = core.open_store(DB, None)
+results = core.load_results(store)
+"""
+
+LAZY = """
+import core
+store = core.open_store(DB, None)
+results = core.load_results_lazy(store, store.get_metadata("last_username"))
+"""
+
+MEASURE = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, ROOT)
+{code}
+import jobs, result_view  # The rest of what tracker.py imports before the window appears
+print(time.perf_counter() - start, "requests" in sys.modules)
+"""
+
+
+def create_data_file(path, accounts, followers):
+    store = storage.SQLiteStore(path)
+    now = "2024-05-01 12:00:00"
+    details = {}
+    for a in range(accounts):
+        username = f"account{a}"
+        for category, count in (("followers", followers), ("following", followers // 2)):
+            logins = {f"user-{(a * 7919 + i) % (followers * 3):07d}" for i in range(count)}
+            store.replace_set(username, category, logins, set(), record_changes=False)
+            store.add_first_seen(username, "follower_timestamps" if category == "followers" else "following_timestamps",
+                                 dict.fromkeys(logins, now))
+            store.set_last_update(username, category, now)
+            for login in logins:
+                details[login] = {"followers": 10, "public_repos": 3, "public_gists": 0,
+                                  "created_at": "2015-01-01T00:00:00Z", "site_admin": False, "fetched_at": now}
+    store.upsert_many_user_details(details)
+    store.set_metadata("last_username", "account0")
+    store.close()
+
+
+def measure(code, db):
+    script = MEASURE.format(code=code)
+    output = subprocess.run([sys.executable, "-c", f"ROOT = {ROOT!r}\nDB = {db!r}\n" + script],
+                            capture_output=True, text=True, check=True).stdout.split()
+    return float(output[0]), output[1] == "True"
+
+
+def main():
+    accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    followers = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    budget = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "startup.db")
+        start = time.perf_counter()
+        create_data_file(db, accounts, followers)
+        print(f"{accounts} accounts x {followers} followers, data file {os.path.getsize(db) / 2**20:.0f} MiB "
+              f"(created in {time.perf_counter() - start:.1f} s)")
+        eager, _ = measure(EAGER, db)
+        lazy, imported_requests = measure(LAZY, db)
+    print(f"{'load everything':<20} {eager:7.3f} s")
+    print(f"{'lazy':<20} {lazy:7.3f} s  (requests imported: {'yes' if imported_requests else 'no'})")
+    if lazy > budget or imported_requests:
+        print(f"FAILED: lazy startup must take at most {budget} s without importing requests")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
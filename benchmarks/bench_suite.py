@@ -0,0 +1,340 @@
+"""Benchmark suite: refresh, diff, save/load and Treeview population/sort at several sizes.
+
+Everything runs offline against the local stub in github_stub.py (or a
+recording of the real API, see --replay). For every scenario and size the
+suite reports the time, throughput, p50/p99 latency (per HTTP request for
+the refresh scenarios, per repetition otherwise), the number of requests
+and the peak Python memory (traced in a separate run, so tracing does not
+slow down the timed one).
+
+Scenarios:
+    refresh        followers + following with a cold ETag cache
+    refresh-304    the same again, every page answered with 304
+    refresh-429    cold cache, every 20th request answered with 429 + Retry-After
+    diff           core.apply_category with 1% of the followers changed
+    save / load    a whole account plus user details into / out of a new SQLite file
+    populate/sort  VirtualTreeview.set_rows and sorting two columns (needs a display)
+
+Regression gating: --save FILE writes the results as JSON, --baseline FILE
+compares against such a file and exits with 1 if a scenario got slower (or
+used more memory) by more than --tolerance.
+
+Usage: python benchmarks/bench_suite.py [--sizes 1000,10000,100000] [--only refresh,diff]
+           [--latency 0.005] [--repeat 5] [--no-memory] [--save FILE] [--baseline FILE]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import core
+import github_api
+import storage
+from github_stub import StubConfig, start_stub
+
+SIZES = (1000, 10000, 100000)
+TOLERANCE = 0.25  # Allowed slowdown against the baseline
+MIN_DIFFERENCE = 0.005  # Seconds; smaller differences are noise
+NOW = "2024-05-01 12:00:00"
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def logins_of(users, offset=0):
+    return [f"user{i}" for i in range(offset, offset + users)]
+
+
+def details_of(logins):
+    return {login: {"followers": 10, "following": 5, "public_repos": 3, "public_gists": 0, "location": None,
+                    "created_at": "2015-01-01T00:00:00Z", "site_admin": False, "fetched_at": NOW}
+            for login in logins}
+
+
+def repeated(func, repeat, setup=None):
+    """Runs func repeat times and returns the durations (setup() before each run is not timed)."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summary(samples, items, requests=0):
+    """Result of a scenario that was repeated: time and throughput of the median run."""
+    seconds = percentile(samples, 0.5)
+    return {"seconds": seconds, "items": items, "latencies": samples, "requests": requests}
+
+
+# --- scenarios: func(users, args) -> {"seconds", "items", "latencies", "requests"} ---
+
+def _fetch_both(config, base_url, username, warm=False):
+    if not warm:
+        github_api._cache = github_api.ConditionalCache(path=None)  # In-memory only
+    github_api._partial_fetches.clear()
+    latencies = []
+    hook = lambda response, *args, **kwargs: latencies.append(response.elapsed.total_seconds())
+    session = github_api.get_session()
+    session.hooks["response"].append(hook)
+    requests_before = config.request_count
+    items = 0
+    start = time.perf_counter()
+    try:
+        for category in core.CATEGORIES:
+            logins = github_api.fetch_logins(username, category, base_url=base_url)
+            if config.replay is None:
+                assert len(logins) == getattr(config, category), f"{category}: got {len(logins)} logins"
+            items += len(logins)
+    finally:
+        session.hooks["response"].remove(hook)
+    return {"seconds": time.perf_counter() - start, "items": items,
+            "latencies": latencies, "requests": config.request_count - requests_before}
+
+
+def _stub(users, args, **kwargs):
+    """Starts a stub for the scenario. Returns (server, base_url, config)."""
+    if args.replay:
+        config = StubConfig(replay=args.replay, latency=args.latency, **kwargs)
+    else:
+        config = StubConfig(followers=users, following=users, latency=args.latency, **kwargs)
+    return start_stub(config) + (config,)
+
+
+def bench_refresh(users, args):
+    server, base_url, config = _stub(users, args)
+    try:
+        return _fetch_both(config, base_url, args.username)
+    finally:
+        server.shutdown()
+
+
+def bench_refresh_304(users, args):
+    server, base_url, config = _stub(users, args)
+    try:
+        _fetch_both(config, base_url, args.username)
+        return _fetch_both(config, base_url, args.username, warm=True)
+    finally:
+        server.shutdown()
+
+
+def bench_refresh_429(users, args):
+    server, base_url, config = _stub(users, args, inject_every=20, retry_after=0)
+    try:
+        return _fetch_both(config, base_url, args.username)
+    finally:
+        server.shutdown()
+
+
+def bench_diff(users, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = storage.SQLiteStore(os.path.join(tmp, "bench.db"))
+        results = {}
+        before = logins_of(users)
+        changed = users // 100
+        after = before[changed:] + logins_of(changed, offset=users)
+        core.apply_category(results, store, "octocat", "followers", before)
+        state = [after, before]  # Every run applies the other list: always a 1% diff
+
+        def diff():
+            core.apply_category(results, store, "octocat", "followers", state[0])
+            state.reverse()
+        samples = repeated(diff, args.repeat)
+        store.close()
+    return summary(samples, users)
+
+
+def _save(path, users):
+    store = storage.SQLiteStore(path)
+    with store.batch():
+        for category, key in core.TIMESTAMP_KEYS.items():
+            logins = logins_of(users)
+            store.replace_set("octocat", category, logins, set(), record_changes=False)
+            store.add_first_seen("octocat", key, dict.fromkeys(logins, NOW))
+            store.set_last_update("octocat", category, NOW)
+        store.upsert_many_user_details(details_of(logins_of(users)))
+    store.close()
+
+
+def bench_save(users, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, f"bench{i}.db") for i in range(args.repeat)]
+        samples = repeated(lambda: _save(paths.pop(), users), args.repeat)
+    return summary(samples, users)
+
+
+def bench_load(users, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        _save(path, users)
+
+        def load():
+            store = storage.SQLiteStore(path)
+            core.load_results(store, ["octocat"])
+            store.close()
+        samples = repeated(load, args.repeat)
+    return summary(samples, users)
+
+
+_root = None
+
+
+def _tk_root():
+    """A hidden Tk root, or None without a display."""
+    global _root
+    if _root is None:
+        try:
+            import tkinter as tk
+            _root = tk.Tk()
+            _root.withdraw()
+        except Exception:  # No tkinter or no display
+            _root = False
+    return _root or None
+
+
+def _view_and_rows(users):
+    from result_view import VirtualTreeview
+    view = VirtualTreeview(_tk_root(), columns=("username", "timestamp", "follows_back"), height=15)
+    # Same rows as tracker.compute_result_rows builds for the following list
+    rows = [((login, NOW, "Yes" if i % 3 else "No"), ("new_user_tag",) if i % 50 == 0 else ())
+            for i, login in enumerate(logins_of(users))]
+    return view, rows
+
+
+def bench_populate(users, args):
+    if _tk_root() is None:
+        return None
+    view, rows = _view_and_rows(users)
+    samples = repeated(lambda: view.set_rows(rows), args.repeat)
+    view.tree.destroy()
+    return summary(samples, users)
+
+
+def bench_sort(users, args):
+    if _tk_root() is None:
+        return None
+    view, rows = _view_and_rows(users)
+
+    def sort():
+        view.sort("username", reverse=True)
+        view.sort("follows_back")
+    samples = repeated(sort, args.repeat, setup=lambda: view.set_rows(rows))
+    view.tree.destroy()
+    return summary(samples, users)
+
+
+SCENARIOS = {
+    "refresh": bench_refresh,
+    "refresh-304": bench_refresh_304,
+    "refresh-429": bench_refresh_429,
+    "diff": bench_diff,
+    "save": bench_save,
+    "load": bench_load,
+    "populate": bench_populate,
+    "sort": bench_sort,
+}
+
+
+def run(name, users, args):
+    """Runs a scenario (plus a traced run for the memory peak). Returns a result dict or None (skipped)."""
+    result = SCENARIOS[name](users, args)
+    if result is None:
+        return None
+    latencies = result.pop("latencies")
+    result["p50_ms"] = percentile(latencies, 0.5) * 1000 if latencies else None
+    result["p99_ms"] = percentile(latencies, 0.99) * 1000 if latencies else None
+    result["throughput"] = result["items"] / result["seconds"] if result["seconds"] else None
+    result["peak_mib"] = None
+    if args.memory:
+        traced = argparse.Namespace(**dict(vars(args), repeat=1))
+        tracemalloc.start()
+        try:
+            SCENARIOS[name](users, traced)
+            result["peak_mib"] = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def print_row(name, users, result):
+    if result is None:
+        print(f"{name:<12} {users:>7}  skipped (no display)")
+        return
+    fmt = lambda value, spec, width=9: ("-" if value is None else format(value, spec)).rjust(width)
+    print(f"{name:<12} {users:>7} {result['seconds']:9.4f} {fmt(result['throughput'], ',.0f', 12)} "
+          f"{fmt(result['p50_ms'], '.2f')} {fmt(result['p99_ms'], '.2f')} {result['requests']:>9} "
+          f"{fmt(result['peak_mib'], '.1f')}")
+
+
+def regressions(results, baseline, tolerance):
+    """Lists the scenarios that are slower / use more memory than the baseline allows."""
+    found = []
+    for key, result in results.items():
+        old = baseline.get(key)
+        if not old or not result:
+            continue
+        if result["seconds"] > old["seconds"] * (1 + tolerance) and \
+                result["seconds"] - old["seconds"] > MIN_DIFFERENCE:
+            found.append(f"{key}: {old['seconds']:.3f} s -> {result['seconds']:.3f} s")
+        if result["peak_mib"] and old.get("peak_mib") and result["peak_mib"] > old["peak_mib"] * (1 + tolerance):
+            found.append(f"{key}: {old['peak_mib']:.1f} MiB -> {result['peak_mib']:.1f} MiB")
+        if old.get("requests") and result["requests"] > old["requests"]:
+            found.append(f"{key}: {old['requests']} -> {result['requests']} requests")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite against the local GitHub API stub")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="comma separated user counts")
+    parser.add_argument("--only", help="comma separated scenarios: " + ", ".join(SCENARIOS))
+    parser.add_argument("--latency", type=float, default=0.005, help="stub latency per request in seconds")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of the non-HTTP scenarios")
+    parser.add_argument("--replay", help="serve a recording (github_stub.py record) instead of synthetic users")
+    parser.add_argument("--username", default="octocat", help="account fetched in the refresh scenarios")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip the traced memory run")
+    parser.add_argument("--save", help="write the results as JSON")
+    parser.add_argument("--baseline", help="compare against results written with --save")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    names = args.only.split(",") if args.only else list(SCENARIOS)
+    unknown = set(names).difference(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(sorted(unknown))}")
+
+    print(f"{'scenario':<12} {'users':>7} {'seconds':>9} {'items/s':>12} {'p50 ms':>9} {'p99 ms':>9} "
+          f"{'requests':>9} {'peak MiB':>9}")
+    results = {}
+    for name in names:
+        for users in sizes:
+            result = run(name, users, args)
+            results[f"{name}/{users}"] = result
+            print_row(name, users, result)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        if found:
+            print("REGRESSIONS:")
+            for line in found:
+                print("  " + line)
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
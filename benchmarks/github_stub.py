@@ -0,0 +1,278 @@
+"""Minimal local stand-in for the GitHub REST API, used by the benchmarks.
+
+Serves /users/{user}, /users/{user}/followers, /users/{user}/following and
+a /graphql endpoint that answers aliased user(login:) queries
+for synthetic users with a fixed number of followers/following, including
+Link headers for pagination, ETags (answering If-None-Match with 304) and an
+optional artificial latency per request. With rate_limit set, the stub sends
+X-RateLimit-* headers and answers 403 once the budget is used up. With
+inject_every=N every Nth request is answered with inject_status (429 or a
+secondary-limit 403) and a Retry-After header instead.
+
+Recorded responses of the real API can be replayed: record() saves the
+profile and all follower/following pages of a user to a JSON file, and
+StubConfig(replay=path) serves exactly these responses (with their ETags).
+
+Standalone use, e.g. to run the GUI or cli.py against a recording:
+    python benchmarks/github_stub.py record octocat octocat.json   # uses GITHUB_TOKEN if set
+    python benchmarks/github_stub.py serve --replay octocat.json   # then set GITHUB_API_URL
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, parse_qsl, urlencode, urlparse
+
+
+class StubConfig:
+    def __init__(self, followers=1000, following=1000, latency=0.0, link_header=True, etags=True,
+                 rate_limit=None, reset_after=60, inject_every=0, inject_status=429, retry_after=0,
+                 replay=None):
+        self.followers = followers
+        self.following = following
+        self.latency = latency
+        self.link_header = link_header
+        self.etags = etags
+        self.rate_limit = rate_limit
+        self.reset_after = reset_after
+        self.inject_every = inject_every
+        self.inject_status = inject_status
+        self.retry_after = retry_after
+        self.replay = load_recording(replay) if isinstance(replay, str) else replay
+        self.reset_at = None
+        self.used = 0
+        self.request_count = 0
+        self.not_modified_count = 0
+        self.injected_count = 0
+        self.lock = threading.Lock()
+
+
+# --- recording and replay ---
+
+def request_key(method, path):
+    """Recording key of a request: method, path and the sorted query."""
+    url = urlparse(path)
+    query = urlencode(sorted(parse_qsl(url.query)))
+    return f"{method} {url.path}" + (f"?{query}" if query else "")
+
+
+def load_recording(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record(username, path, base_url=None, token=None, per_page=100):
+    """Fetches the profile and all follower/following pages of username and saves them for replay."""
+    import requests
+    base_url = base_url or os.environ.get("GITHUB_API_URL", "https://api.github.com")
+    session = requests.Session()
+    token = token or os.environ.get("GITHUB_TOKEN")
+    if token:
+        session.headers["Authorization"] = f"token {token}"
+    recording = {}
+
+    def fetch(path):
+        response = session.get(base_url + path)
+        headers = {key: value for key, value in response.headers.items() if key in ("ETag", "Link")}
+        if "Link" in headers:
+            headers["Link"] = headers["Link"].replace(base_url, "{base}")  # Pointed at the stub on replay
+        recording[request_key("GET", path)] = {"status": response.status_code, "headers": headers,
+                                               "body": response.json() if response.content else None}
+        return response
+
+    fetch(f"/users/{username}")
+    for endpoint in ("followers", "following"):
+        page = 1
+        while True:
+            response = fetch(f"/users/{username}/{endpoint}?per_page={per_page}&page={page}")
+            if response.status_code != 200 or len(response.json()) < per_page:
+                break
+            page += 1
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(recording, f)
+    return len(recording)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    config = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _rate_limit_headers(self):
+        """Counts the request against the budget. Returns (allowed, headers)."""
+        config = self.config
+        if config.rate_limit is None:
+            return True, {}
+        with config.lock:
+            now = time.time()
+            if config.reset_at is None or config.reset_at <= now:
+                config.reset_at = int(now + config.reset_after)
+                config.used = 0
+            allowed = config.used < config.rate_limit
+            if allowed:
+                config.used += 1
+            headers = {
+                "X-RateLimit-Limit": str(config.rate_limit),
+                "X-RateLimit-Remaining": str(config.rate_limit - config.used),
+                "X-RateLimit-Reset": str(config.reset_at),
+            }
+        return allowed, headers
+
+    def _send_empty(self, status, headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_json(self, payload, headers=None):
+        body = json.dumps(payload).encode()
+        headers = dict(headers or {})
+        headers.update(self.rate_headers)
+        if self.config.etags:
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()
+            headers["ETag"] = etag
+            if self.headers.get("If-None-Match") == etag:
+                with self.config.lock:
+                    self.config.not_modified_count += 1
+                self._send_empty(304, headers)
+                return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_request(self):
+        """Counts, delays and rate limits a request. Returns False if it was answered already."""
+        config = self.config
+        with config.lock:
+            config.request_count += 1
+            inject = config.inject_every and config.request_count % config.inject_every == 0
+            if inject:
+                config.injected_count += 1
+        if config.latency:
+            time.sleep(config.latency)
+        if inject:
+            self._send_empty(config.inject_status, {"Retry-After": str(config.retry_after)})
+            return False
+        allowed, self.rate_headers = self._rate_limit_headers()
+        if not allowed:
+            self._send_empty(403, self.rate_headers)
+            return False
+        return True
+
+    def _replay(self, method):
+        entry = self.config.replay.get(request_key(method, self.path))
+        if entry is None:
+            self._send_empty(404)
+            return
+        headers = dict(entry["headers"])
+        if "Link" in headers:
+            headers["Link"] = headers["Link"].replace("{base}", f"http://{self.headers['Host']}")
+        if entry["status"] != 200:
+            self._send_empty(entry["status"], headers)
+            return
+        self._send_json(entry["body"], headers)
+
+    def do_GET(self):
+        config = self.config
+        if not self._start_request():
+            return
+        if config.replay is not None:
+            self._replay("GET")
+            return
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "users":
+            self._send_json({"login": parts[1], "followers": config.followers,
+                             "following": config.following, "public_repos": len(parts[1]),
+                             "public_gists": 0, "location": None,
+                             "created_at": "2020-01-01T00:00:00Z", "site_admin": False})
+            return
+        if len(parts) == 3 and parts[0] == "users" and parts[2] in ("followers", "following"):
+            query = parse_qs(url.query)
+            per_page = int(query.get("per_page", ["30"])[0])
+            page = int(query.get("page", ["1"])[0])
+            total = getattr(config, parts[2])
+            start = (page - 1) * per_page
+            logins = [{"login": f"user{i}"} for i in range(start, min(start + per_page, total))]
+            headers = {}
+            last_page = max(1, -(-total // per_page))
+            if config.link_header and last_page > 1:
+                base = f"http://{self.headers['Host']}{url.path}"
+                headers["Link"] = f'<{base}?per_page={per_page}&page={last_page}>; rel="last"'
+            self._send_json(logins, headers)
+            return
+        self._send_empty(404)
+
+    def do_POST(self):
+        if not self._start_request():
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if urlparse(self.path).path != "/graphql":
+            self._send_empty(404)
+            return
+        # Variables are named l0, l1, ... and the fields aliased u0, u1, ...
+        data = {}
+        for name, login in (request.get("variables") or {}).items():
+            data["u" + name[1:]] = {
+                "location": None,
+                "repositories": {"totalCount": len(login)},
+                "gists": {"totalCount": 0},
+                "followers": {"totalCount": 1},
+                "following": {"totalCount": 1},
+                "createdAt": "2020-01-01T00:00:00Z",
+                "isSiteAdmin": False,
+            }
+        self._send_json({"data": data})
+
+
+def start_stub(config):
+    """Starts the stub on a free local port. Returns (server, base_url)."""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": config})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local GitHub API stub")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("record", help="save the responses of the real API for a user")
+    p.add_argument("username")
+    p.add_argument("path")
+    p = sub.add_parser("serve", help="run the stub until Ctrl+C")
+    p.add_argument("--replay", help="recording to serve")
+    p.add_argument("--followers", type=int, default=1000)
+    p.add_argument("--following", type=int, default=1000)
+    p.add_argument("--latency", type=float, default=0.0)
+    p.add_argument("--inject-every", type=int, default=0)
+    p.add_argument("--inject-status", type=int, default=429)
+    args = parser.parse_args()
+    if args.command == "record":
+        print(f"{record(args.username, args.path)} responses saved to {args.path}")
+        return
+    server, base_url = start_stub(StubConfig(args.followers, args.following, args.latency,
+                                             inject_every=args.inject_every, inject_status=args.inject_status,
+                                             replay=args.replay))
+    print(f"Serving on {base_url} (set GITHUB_API_URL={base_url}), stop with Ctrl+C", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
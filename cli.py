@@ -0,0 +1,261 @@
+"""Command line interface (no GUI) for refreshing and querying tracked accounts.
+
+Examples:
+    python cli.py refresh octocat torvalds      # fetch followers + following
+    python cli.py refresh --all --enrich        # all tracked accounts, plus user details
+    python cli.py show octocat --category not-following-back --format csv
+    python cli.py changes octocat --days 7 --unfollows
+    python cli.py daemon --all --interval 3600  # refresh every hour until stopped
+    python cli.py graph mutual octocat torvalds # users following both
+    python cli.py graph suggest octocat         # second-degree suggestions
+    python cli.py export octocat -o octocat.parquet
+    python cli.py export octocat --changes -o -  # only what changed since the last --changes export
+    python cli.py --metrics metrics.prom daemon --all  # timings/counters for a Prometheus textfile collector
+"""
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+import core
+import metrics
+import scoring
+
+
+def log(message):
+    print(f"[{core.now_str()}] {message}", flush=True)
+
+
+def accounts_from_args(args, store):
+    usernames = list(args.usernames)
+    if args.all:
+        usernames += [u for u in store.usernames() if u not in usernames]
+    if not usernames:
+        raise SystemExit("No accounts given (name them or use --all).")
+    return usernames
+
+
+def refresh(args, store):
+    """Refreshes the accounts once (concurrently, stalest first). Returns the number of accounts that failed."""
+    usernames = accounts_from_args(args, store)
+    results = core.load_results(store, usernames)
+
+    def on_account(username, changes, error, seconds):
+        if error is not None:
+            log(f"{username}: failed: {error}")
+            return
+        summary = ", ".join(
+            f"{category} {len(results[username][category])} (+{len(added)}/-{len(removed)})"
+            for category, (added, removed) in changes.items())
+        log(f"{username}: {summary} in {seconds:.1f} s")
+
+    report = core.refresh_accounts(results, store, usernames, args.categories, args.workers,
+                                   args.max_wait, on_account)
+    for line in core.format_report(report):
+        log(line)
+    if args.enrich:
+        import requests
+        for username in usernames:
+            try:
+                log(f"{username}: {core.enrich_account(results, store, username)} users enriched")
+            except requests.exceptions.RequestException as e:
+                log(f"{username}: enriching failed: {e}")
+    return report["failed"]
+
+
+def cmd_refresh(args, store):
+    return 1 if refresh(args, store) else 0
+
+
+def dump_metrics(path):
+    # Must not hide the command's own result or exception (this runs in a finally)
+    try:
+        metrics.dump(path)
+    except OSError as e:
+        log(f"Could not write metrics to {path}: {e}")
+
+
+def cmd_daemon(args, store):
+    log(f"Refreshing every {args.interval} s, stop with Ctrl+C")
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                with metrics.profiled("refresh"):
+                    refresh(args, store)
+            except (sqlite3.Error, ValueError) as e:
+                log(f"Refresh failed, trying again in {args.interval} s: {e}")  # e.g. database locked by the GUI
+            if args.metrics:
+                dump_metrics(args.metrics)  # After every run, for scraping while the daemon runs
+            time.sleep(max(0, args.interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        log("Stopped")
+    return 0
+
+
+def cmd_show(args, store):
+    results = core.load_compact(store, [args.username])
+    account = results.account(args.username)
+    if args.category == "not-following-back":
+        logins = results.not_following_back(args.username)
+        timestamp_key = "following_timestamps"
+    else:
+        logins = account.logins(args.category)
+        timestamp_key = core.TIMESTAMP_KEYS[args.category]
+    rows = []
+    details_by_login = store.get_many_user_details(logins)
+    for login in sorted(logins, key=str.casefold):
+        details = details_by_login.get(login)
+        rows.append({"login": login, "first_seen": account.timestamp(timestamp_key, login) or "",
+                     "score": core.calculate_score(details, args.profile) if details else ""})
+    if args.format == "json":
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+    elif args.format == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=["login", "first_seen", "score"])
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            print(f"{row['login']:<40} {row['first_seen']:<20} {row['score']}")
+    return 0
+
+
+def cmd_changes(args, store):
+    since = (datetime.now() - timedelta(days=args.days)).timestamp()
+    delta = -1 if args.unfollows else None
+    for login, change, ts in store.changes_since(args.username, args.category, since, delta):
+        when = datetime.fromtimestamp(ts).isoformat(sep=' ', timespec='seconds')
+        print(f"{when}  {'+' if change > 0 else '-'} {login}")
+    if not args.unfollows:
+        for day, added, removed, net in store.net_change_per_day(args.username, args.category, since):
+            print(f"{day}: +{added} -{removed} = {net:+d}")
+    return 0
+
+
+def cmd_graph(args, store):
+    import graph
+    index = core.load_graph(store)
+    if args.query == "overlap":
+        matrix = index.overlap_matrix(args.category)
+        width = max([len(u) for u in index.accounts] + [8])
+        print(" " * width + "".join(f" {u[:10]:>10}" for u in index.accounts))
+        for username, row in zip(index.accounts, matrix):
+            print(f"{username:<{width}}" + "".join(f" {count:>10}" for count in row))
+        return 0
+    if not args.usernames:
+        raise SystemExit(f"graph {args.query} needs a username.")
+    username = args.usernames[0]
+    if args.query == "mutual":
+        if len(args.usernames) < 2:
+            raise SystemExit("graph mutual needs two usernames.")
+        mutual = (index.mutual_followers if args.category == "followers" else index.mutual_following)
+        for login in sorted(mutual(username, args.usernames[1]), key=str.casefold)[:args.limit]:
+            print(login)
+    elif args.query == "suggest":
+        for login, paths in index.suggestions(username, args.limit):
+            print(f"{login:<40} {paths} paths")
+    else:  # top
+        logins = (index.followers_of(username) if args.category == "followers" else index.following_of(username))
+        engine = core.score_engine({"user_details": store.load_all_user_details()})
+        for login, score in graph.top_scored(logins, engine, args.limit, args.profile):
+            print(f"{login:<40} {score}")
+    return 0
+
+
+def cmd_export(args, store):
+    import export
+    path = args.output
+    try:
+        rows = export.export_account(store, args.username, path, args.format or export.format_for(path),
+                                     args.categories, args.changes, args.chunk_size)
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+    print(f"[{core.now_str()}] {rows} rows exported", file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="GitHub Follower Tracker (command line)")
+    parser.add_argument("--db", default=core.DB_FILE, help="SQLite data file (default: %(default)s)")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="collect timings and counters and write them to FILE (.json or Prometheus text)")
+    parser.add_argument("--profile-dir", metavar="DIR", help="save cProfile stats of each run to DIR")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_refresh_options(p):
+        p.add_argument("usernames", nargs="*")
+        p.add_argument("--all", action="store_true", help="all tracked accounts")
+        p.add_argument("--categories", nargs="+", choices=core.CATEGORIES, default=list(core.CATEGORIES))
+        p.add_argument("--enrich", action="store_true", help="also fetch missing user details")
+        p.add_argument("--workers", type=int, default=core.BULK_WORKERS,
+                       help="accounts fetched at the same time (default: %(default)s)")
+        p.add_argument("--max-wait", type=float, default=core.MAX_WAIT,
+                       help="seconds to wait for a rate limit reset before giving up (default: %(default)s)")
+
+    p = sub.add_parser("refresh", help="fetch followers/following once")
+    add_refresh_options(p)
+    p.set_defaults(func=cmd_refresh)
+
+    p = sub.add_parser("daemon", help="refresh on a fixed interval")
+    add_refresh_options(p)
+    p.add_argument("--interval", type=float, default=3600, help="seconds between runs (default: %(default)s)")
+    p.set_defaults(func=cmd_daemon)
+
+    p = sub.add_parser("show", help="print stored followers/following")
+    p.add_argument("username")
+    p.add_argument("--category", choices=core.CATEGORIES + ("not-following-back",), default="followers")
+    p.add_argument("--format", choices=("text", "csv", "json"), default="text")
+    p.add_argument("--profile", choices=sorted(scoring.PROFILES), default="default", help="score weights")
+    p.set_defaults(func=cmd_show)
+
+    p = sub.add_parser("changes", help="print logged changes")
+    p.add_argument("username")
+    p.add_argument("--category", choices=core.CATEGORIES, default="followers")
+    p.add_argument("--days", type=float, default=30)
+    p.add_argument("--unfollows", action="store_true", help="only removals (who unfollowed)")
+    p.set_defaults(func=cmd_changes)
+
+    p = sub.add_parser("graph", help="mutuals, overlap, suggestions and top users over all tracked accounts")
+    p.add_argument("query", choices=("mutual", "overlap", "suggest", "top"))
+    p.add_argument("usernames", nargs="*")
+    p.add_argument("--category", choices=core.CATEGORIES, default="followers")
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--profile", choices=sorted(scoring.PROFILES), default="default", help="score weights")
+    p.set_defaults(func=cmd_graph)
+
+    p = sub.add_parser("export", help="export followers/following to CSV, JSON Lines, Parquet or Arrow")
+    p.add_argument("username")
+    p.add_argument("-o", "--output", default="-", help="output file, - for stdout (default: %(default)s)")
+    p.add_argument("--format", choices=("csv", "jsonl", "parquet", "arrow"),
+                   help="default: from the file extension, csv for stdout")
+    p.add_argument("--categories", nargs="+", choices=core.CATEGORIES, default=list(core.CATEGORIES))
+    p.add_argument("--changes", action="store_true", help="only the changes since the last --changes export")
+    p.add_argument("--chunk-size", type=int, default=10000, help="rows read and written at a time")
+    p.set_defaults(func=cmd_export)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.metrics:
+        metrics.enable()
+    if args.profile_dir:
+        metrics.set_profile_dir(args.profile_dir)
+    store = core.open_store(args.db)
+    try:
+        if args.func is cmd_daemon:
+            return args.func(args, store)  # Profiled and dumped per run
+        with metrics.profiled(args.command):
+            return args.func(args, store)
+    finally:
+        store.close()
+        if args.metrics:
+            dump_metrics(args.metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
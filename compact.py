@@ -0,0 +1,291 @@
+"""Compact in-memory representation of the follow data.
+
+Instead of one set of login strings per account and category plus dicts of
+ISO timestamp strings, every login is stored once in a global intern table
+and mapped to an integer id:
+
+- InternTable: all logins in one UTF-8 blob with an offsets array and a
+  hash index for lookups (no per-login Python objects)
+- follow sets: sorted int32 arrays of ids
+- first-seen timestamps: epoch seconds in a uint32 array parallel to the ids
+
+Set operations (follows back, mutuals, ...) run as intersections of sorted
+arrays, vectorized with NumPy if it is installed. Without NumPy they go
+through Python sets of ids and are several times slower than the same
+operation on login sets: the format saves memory (about 4x), not time. The
+dict/set based views of the old format are still available through
+CompactAccount.logins() and CompactAccount.timestamps().
+
+core.load_compact() builds it straight from the database rows for the
+command line (show, graph); the network window converts its results dict.
+The GUI's account data and the refresh code keep the results dict.
+"""
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from itertools import groupby
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the array module is the fallback
+    np = None
+
+
+# --- sorted id arrays ---
+
+def make_ids(ids):
+    """Returns a sorted, duplicate-free id array."""
+    ids = sorted(set(ids))
+    if np is not None:
+        return np.array(ids, dtype=np.int32)
+    return array("i", ids)
+
+
+def intersect(a, b):
+    if np is not None:
+        return np.intersect1d(a, b, assume_unique=True)
+    return make_ids(set(a).intersection(b))
+
+
+def difference(a, b):
+    if np is not None:
+        return np.setdiff1d(a, b, assume_unique=True)
+    return make_ids(set(a).difference(b))
+
+
+def contains(ids, value):
+    if np is not None:
+        i = int(np.searchsorted(ids, value))
+    else:
+        i = bisect_left(ids, value)
+    return i < len(ids) and ids[i] == value
+
+
+def to_epoch(iso):
+    try:
+        return int(datetime.fromisoformat(iso).timestamp())
+    except (TypeError, ValueError):
+        return 0
+
+
+def from_epoch(ts):
+    return datetime.fromtimestamp(ts).isoformat(sep=' ', timespec='seconds') if ts else ""
+
+
+# --- intern table ---
+
+class InternTable:
+    """Bidirectional login <-> integer id mapping without per-login objects.
+
+    Lookups go through an open addressing hash table of ids (linear probing),
+    which is an int array as well.
+    """
+
+    def __init__(self):
+        self._blob = bytearray()
+        self._offsets = array("I", [0])  # Login i is _blob[_offsets[i]:_offsets[i + 1]]
+        self._slots = array("i", [-1]) * 1024  # Hash table of ids, -1 = empty
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def _bytes(self, i):
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]])
+
+    def login(self, i):
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].decode()
+
+    def logins(self, ids):
+        return [self.login(i) for i in ids]
+
+    def _find(self, key):
+        """Returns the slot of key, or the empty slot where it belongs."""
+        slots, blob, offsets = self._slots, self._blob, self._offsets
+        mask = len(slots) - 1
+        pos = hash(key) & mask
+        while True:
+            i = slots[pos]
+            if i == -1 or blob[offsets[i]:offsets[i + 1]] == key:
+                return pos
+            pos = (pos + 1) & mask
+
+    def id(self, login):
+        """Returns the id of a login, or None if it was never interned."""
+        i = self._slots[self._find(login.encode())]
+        return None if i == -1 else i
+
+    def ids(self, logins, add=True):
+        """Returns the ids of many logins; new logins are added if add is set (else skipped)."""
+        result = []
+        slots = self._slots
+        for login in logins:
+            key = login.encode()
+            pos = self._find(key)
+            i = slots[pos]
+            if i == -1:
+                if not add:
+                    continue
+                i = len(self._offsets) - 1
+                self._blob += key
+                self._offsets.append(len(self._blob))
+                slots[pos] = i
+                if 2 * i >= len(slots):
+                    self._grow()
+                    slots = self._slots
+            result.append(i)
+        return result
+
+    def _grow(self):
+        self._slots = array("i", [-1]) * (2 * len(self._slots))
+        for i in range(len(self)):
+            self._slots[self._find(self._bytes(i))] = i
+
+    def nbytes(self):
+        return (len(self._blob) + self._offsets.itemsize * len(self._offsets)
+                + self._slots.itemsize * len(self._slots))
+
+
+# --- accounts ---
+
+def _nbytes(ids):
+    return ids.nbytes if np is not None and isinstance(ids, np.ndarray) else ids.itemsize * len(ids)
+
+
+class CompactAccount:
+    def __init__(self, table):
+        self.table = table
+        self.sets = {}  # category -> sorted id array
+        self.first_seen = {}  # timestamp key -> (sorted id array, epoch array)
+        self.last_update = {}
+
+    # Setters take the old format
+
+    def set_logins(self, category, logins):
+        self.sets[category] = make_ids(self.table.ids(logins))
+
+    def set_timestamps(self, timestamp_key, timestamps):
+        self.set_first_seen(timestamp_key, timestamps.items())
+
+    def set_first_seen(self, timestamp_key, pairs):
+        """Like set_timestamps, from (login, ISO timestamp) pairs."""
+        epoch_of = {}  # Most logins share the timestamp of the refresh they were first seen in
+        logins = []
+        epochs = []
+        for login, iso in pairs:
+            epoch = epoch_of.get(iso)
+            if epoch is None:
+                epoch = epoch_of[iso] = to_epoch(iso)
+            logins.append(login)
+            epochs.append(epoch)
+        pairs = sorted(zip(self.table.ids(logins), epochs))
+        ids = make_ids(i for i, ts in pairs)
+        if np is not None:
+            epochs = np.array([ts for i, ts in pairs], dtype=np.uint32)
+        else:
+            epochs = array("I", (ts for i, ts in pairs))
+        self.first_seen[timestamp_key] = (ids, epochs)
+
+    # Accessors return the old dict/set based views
+
+    def ids(self, category):
+        return self.sets.get(category, make_ids(()))
+
+    def logins(self, category):
+        return set(self.table.logins(self.ids(category)))
+
+    def contains(self, category, login):
+        i = self.table.id(login)
+        return i is not None and contains(self.ids(category), i)
+
+    def timestamp(self, timestamp_key, login):
+        """First-seen time of one login as ISO string, or None."""
+        ids, epochs = self.first_seen.get(timestamp_key, ((), ()))
+        i = self.table.id(login)
+        if i is None or not contains(ids, i):
+            return None
+        pos = int(np.searchsorted(ids, i)) if np is not None else bisect_left(ids, i)
+        return from_epoch(int(epochs[pos]))
+
+    def timestamps(self, timestamp_key):
+        ids, epochs = self.first_seen.get(timestamp_key, ((), ()))
+        return {self.table.login(i): from_epoch(int(ts)) for i, ts in zip(ids, epochs)}
+
+    def as_dict(self):
+        """The account in the old results format."""
+        account = {category: self.logins(category) for category in self.sets}
+        for timestamp_key in self.first_seen:
+            account[timestamp_key] = self.timestamps(timestamp_key)
+        if self.last_update:
+            account["last_update"] = dict(self.last_update)
+        return account
+
+    def nbytes(self):
+        total = sum(_nbytes(ids) for ids in self.sets.values())
+        return total + sum(_nbytes(ids) + _nbytes(epochs) for ids, epochs in self.first_seen.values())
+
+
+class CompactResults:
+    """All tracked accounts sharing one intern table."""
+
+    def __init__(self):
+        self.table = InternTable()
+        self.accounts = {}
+
+    @classmethod
+    def from_results(cls, results):
+        compact = cls()
+        for username, account in results.items():
+            if username != "user_details":
+                compact.add_account(username, account)
+        return compact
+
+    def add_account(self, username, account):
+        """Adds an account given in the old results format."""
+        compact_account = CompactAccount(self.table)
+        for key, value in account.items():
+            if key == "last_update":
+                compact_account.last_update = dict(value)
+            elif key.endswith("_timestamps"):
+                compact_account.set_timestamps(key, value)
+            else:
+                compact_account.set_logins(key, value)
+        self.accounts[username] = compact_account
+        return compact_account
+
+    def add_rows(self, username, rows):
+        """Adds an account from the (table, category, login, ts) rows of SQLiteStore.iter_account_rows()."""
+        compact_account = CompactAccount(self.table)
+        for (table, category), group in groupby(rows, key=lambda row: (row[0], row[1])):
+            if table == "edges":
+                compact_account.set_logins(category, (row[2] for row in group))
+            elif table == "first_seen":
+                compact_account.set_first_seen(category, ((row[2], row[3]) for row in group))
+            else:
+                for row in group:
+                    compact_account.last_update[category] = row[3]
+                # A fetched but empty list is still a snapshot, as in load_account()
+                compact_account.sets.setdefault(category, make_ids(()))
+        self.accounts[username] = compact_account
+        return compact_account
+
+    def account(self, username):
+        return self.accounts.get(username) or CompactAccount(self.table)
+
+    # Vectorized set operations, results as login lists
+
+    def follows_back(self, username):
+        """Users the account follows that follow it back."""
+        account = self.account(username)
+        return self.table.logins(intersect(account.ids("following"), account.ids("followers")))
+
+    def not_following_back(self, username):
+        account = self.account(username)
+        return self.table.logins(difference(account.ids("following"), account.ids("followers")))
+
+    def mutual_followers(self, username_a, username_b):
+        """Users following both accounts."""
+        return self.table.logins(intersect(self.account(username_a).ids("followers"),
+                                           self.account(username_b).ids("followers")))
+
+    def nbytes(self):
+        return self.table.nbytes() + sum(account.nbytes() for account in self.accounts.values())
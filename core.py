@@ -0,0 +1,427 @@
+"""Tk-free core of the tracker: loading, refreshing, diffing and scoring.
+
+The GUI (tracker.py) and the command line (cli.py) both work on a
+"results" dict with the same layout as before:
+
+    {username: {"followers": set(), "following": set(),
+                "follower_timestamps": {login: ts}, "following_timestamps": {login: ts},
+                "last_update": {category: ts}},
+     "user_details": {login: details}}
+
+backed by a storage.SQLiteStore. github_api (and with it requests) is only
+imported when something is actually fetched, scoring when something is
+scored, which keeps the start of the command line and the GUI cheap.
+"""
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import metrics
+import storage
+
+DATA_FILE = "github_tracker_data.json"  # Old format, migrated into DB_FILE on first start
+DB_FILE = storage.DB_FILE
+CATEGORIES = ("followers", "following")
+BULK_WORKERS = 4  # Accounts fetched at the same time in a bulk refresh
+BULK_PAGE_WORKERS = 4  # Concurrent pages per account in a bulk refresh
+TIMESTAMP_KEYS = {"followers": "follower_timestamps", "following": "following_timestamps"}
+MAX_WAIT = 60  # Seconds a fetch may wait for the rate limit reset (None: no limit), as github_api
+FOLLOWERS_MAX_AGE = 600  # Seconds a follower snapshot is trusted for "follows back?" without any request
+
+_followers_checked = {}  # username -> time.time() of the last check that found the followers unchanged
+
+
+def now_str():
+    return datetime.now().isoformat(sep=' ', timespec='seconds')
+
+
+def calculate_score(details, profile="default"):
+    """Score of one user as of now (the weights are in scoring.PROFILES)."""
+    import scoring
+    return scoring.score_details(details, profile)
+
+
+def score_engine(results):
+    """A scoring.ScoreEngine over the cached user details of results."""
+    import scoring
+    engine = scoring.ScoreEngine()
+    engine.update(results.get("user_details", {}))
+    return engine
+
+
+# --- storage ---
+
+def open_store(db_file=DB_FILE, json_file=DATA_FILE):
+    """Opens the SQLite store, migrating an old JSON data file into it once."""
+    store = storage.SQLiteStore(db_file)
+    if store.is_empty() and json_file:
+        store.migrate_from_json(json_file)
+    return store
+
+
+def load_results(store, usernames=None):
+    """Loads the given accounts (default: all) and the user details cache."""
+    results = {}
+    for username in (store.usernames() if usernames is None else usernames):
+        results[username] = store.load_account(username)
+    results["user_details"] = store.load_all_user_details()
+    return results
+
+
+class LazyResults(dict):
+    """A results dict that reads accounts (and "user_details") from the store on first access.
+
+    Iterating or testing membership does not load anything; items(),
+    values() and copies load all pending entries. Entries loaded elsewhere
+    (e.g. in a background thread) can be handed in with fill().
+    """
+
+    def __init__(self, store, usernames):
+        super().__init__()
+        self.store = store
+        self.pending = dict.fromkeys(usernames)
+        self.pending["user_details"] = None
+
+    def _load(self, key):
+        if key in self.pending:
+            # Load first: if it fails, the key stays pending instead of looking like a missing account
+            value = self.store.load_all_user_details() if key == "user_details" else self.store.load_account(key)
+            del self.pending[key]
+            super().__setitem__(key, value)
+
+    def fill(self, loaded):
+        """Takes {key: value} loaded elsewhere, for keys that are still pending."""
+        for key, value in loaded.items():
+            if key in self.pending:
+                del self.pending[key]
+                super().__setitem__(key, value)
+
+    def load_all(self):
+        for key in list(self.pending):
+            self._load(key)
+
+    def __getitem__(self, key):
+        self._load(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._load(key)
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self._load(key)
+        return super().setdefault(key, default)
+
+    def __setitem__(self, key, value):
+        self.pending.pop(key, None)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        if key in self.pending:
+            del self.pending[key]
+        else:
+            super().__delitem__(key)
+
+    def __contains__(self, key):
+        return key in self.pending or super().__contains__(key)
+
+    def __iter__(self):
+        return iter(list(super().keys()) + list(self.pending))
+
+    def __len__(self):
+        return super().__len__() + len(self.pending)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        self.load_all()
+        return super().items()
+
+    def values(self):
+        self.load_all()
+        return super().values()
+
+    def copy(self):
+        self.load_all()
+        return dict(self)
+
+
+def load_results_lazy(store, first=None):
+    """Like load_results(), but only the account first is read now; the rest on first access."""
+    results = LazyResults(store, store.usernames())
+    if first:
+        results.get(first)
+    return results
+
+
+def load_compact(store, usernames=None):
+    """Loads the given accounts (default: all) into a compact.CompactResults.
+
+    The rows are streamed from the database straight into the compact
+    arrays, so the sets and dicts of load_results() are never built.
+    """
+    import compact
+    results = compact.CompactResults()
+    for username in (store.usernames() if usernames is None else usernames):
+        results.add_rows(username, store.iter_account_rows(username))
+    return results
+
+
+def load_graph(store):
+    """Builds a graph.GraphIndex over the follow edges of all tracked accounts."""
+    import graph
+    return graph.GraphIndex(load_compact(store))
+
+
+def get_last_update(results, username, category):
+    return results.get(username, {}).get('last_update', {}).get(category)
+
+
+# --- fetching and diffing ---
+
+def fetch_category(username, category, on_page=None, max_wait=MAX_WAIT, cancel=None):
+    """Fetches all logins of a category. Raises requests exceptions on failure.
+
+    cancel is a threading.Event that stops requests waiting for the rate limit.
+    """
+    import github_api
+    return github_api.fetch_logins(username, category, on_page=on_page, max_wait=max_wait, cancel=cancel)
+
+
+def followers_unchanged(username, cached_followers, cancel=None):
+    """Cheap check whether the followers of username are still cached_followers.
+
+    Needs at most three (conditional) requests instead of every page: the
+    follower count of the profile must match, and all logins of the first
+    and the last page must be known. A follower who left and another who
+    came in keep the count, but the newcomer shows up on the first or last page.
+    """
+    import github_api
+    count = github_api.fetch_profile(username, cancel=cancel).get("followers")
+    if count != len(cached_followers):
+        return False
+    last_page = max(1, -(-count // github_api.PER_PAGE))
+    for page in dict.fromkeys((1, last_page)):
+        if not cached_followers.issuperset(github_api.fetch_page(username, "followers", page, cancel=cancel)):
+            return False
+    return True
+
+
+def resolve_followers(username, cached_followers, last_update, on_page=None, max_age=FOLLOWERS_MAX_AGE,
+                      cancel=None):
+    """The current followers of username, for the "Follows back?" column of the following list.
+
+    cached_followers (a set or None) and its last_update come from the
+    stored snapshot. The snapshot is used as is while it is younger than
+    max_age seconds, and after that as long as followers_unchanged() finds
+    nothing new; only then are all follower pages fetched again.
+    Returns (followers, fetched): fetched is the newly fetched list (to be
+    stored) or None if the snapshot was used. Raises requests exceptions.
+    """
+    if cached_followers is not None:
+        checked = max(_timestamp(last_update), _followers_checked.get(username, 0))
+        if time.time() - checked < max_age:
+            metrics.inc("follows_back_total", result="fresh")
+            return cached_followers, None
+        if followers_unchanged(username, cached_followers, cancel):
+            _followers_checked[username] = time.time()
+            metrics.inc("follows_back_total", result="unchanged")
+            return cached_followers, None
+    metrics.inc("follows_back_total", result="fetched")
+    logins = fetch_category(username, "followers", on_page, cancel=cancel)
+    _followers_checked[username] = time.time()
+    return set(logins), logins
+
+
+def _timestamp(value):
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0
+
+
+def new_timestamps_for(current_logins, timestamps, now=None):
+    """Returns {login: now} for every login that has no first-seen timestamp yet."""
+    now = now or now_str()
+    return {login: now for login in current_logins if login not in timestamps}
+
+
+def apply_category(results, store, username, category, current_logins, new_timestamps=None, fetched=False):
+    """Makes current_logins the new state of an account's category.
+
+    Updates results in place and writes only the differences to the store
+    (edges, change log, first-seen timestamps, last update). The very first
+    snapshot of a category is not logged as a change. Returns the (added,
+    removed) logins compared to the previous snapshot.
+    """
+    with metrics.timer("diff_seconds", category=category):
+        return _apply_category(results, store, username, category, current_logins, new_timestamps, fetched)
+
+
+def _apply_category(results, store, username, category, current_logins, new_timestamps, fetched):
+    account = results.setdefault(username, {})
+    had_snapshot = category in account
+    old_logins = account.get(category, set())
+    timestamp_key = TIMESTAMP_KEYS.get(category)
+    if timestamp_key:
+        timestamps = account.setdefault(timestamp_key, {})
+        if new_timestamps is None:
+            new_timestamps = new_timestamps_for(current_logins, timestamps)
+        timestamps.update(new_timestamps)
+    if fetched:
+        account.setdefault('last_update', {})[category] = now_str()
+    account[category] = set(current_logins)
+
+    added, removed = store.replace_set(username, category, account[category], old_logins, had_snapshot)
+    if timestamp_key:
+        store.add_first_seen(username, timestamp_key, new_timestamps)
+    last_update = get_last_update(results, username, category)
+    if last_update:
+        store.set_last_update(username, category, last_update)
+    if not had_snapshot:
+        return set(), set()
+    return added, removed
+
+
+def refresh_account(results, store, username, categories=CATEGORIES, on_page=None, max_wait=MAX_WAIT,
+                    cancel=None):
+    """Fetches and stores the given categories of one account.
+
+    Returns {category: (added, removed)}. Fetch errors are raised.
+    """
+    changes = {}
+    for category in categories:
+        logins = fetch_category(username, category, on_page, max_wait, cancel)
+        changes[category] = apply_category(results, store, username, category, logins, fetched=True)
+    return changes
+
+
+def stalest_first(results, usernames, categories=CATEGORIES):
+    """Orders accounts by their oldest last update; never updated accounts come first."""
+    def staleness(username):
+        return min(get_last_update(results, username, category) or "" for category in categories)
+    return sorted(dict.fromkeys(usernames), key=staleness)
+
+
+def fetch_accounts(usernames, categories=CATEGORIES, max_workers=BULK_WORKERS, max_wait=MAX_WAIT, cancel=None):
+    """Fetches several accounts concurrently.
+
+    All fetches share the rate limit budget and the request cache of
+    github_api, identical requests are only sent once. Yields
+    (username, {category: logins}, error, seconds) as accounts complete;
+    error is None or the exception that stopped the account (any error,
+    e.g. also a non-JSON answer of a proxy, stops only that account).
+    """
+    import github_api
+    kwargs = {"max_workers": BULK_PAGE_WORKERS, "max_wait": max_wait, "cancel": cancel}
+
+    def fetch_one(username):
+        start = time.perf_counter()
+        fetched = {}
+        try:
+            for category in categories:
+                fetched[category] = github_api.fetch_logins(username, category, **kwargs)
+            return username, fetched, None, time.perf_counter() - start
+        except Exception as e:
+            return username, fetched, e, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(usernames) or 1))) as pool:
+        for future in as_completed([pool.submit(fetch_one, username) for username in usernames]):
+            yield future.result()
+
+
+def refresh_accounts(results, store, usernames, categories=CATEGORIES, max_workers=BULK_WORKERS,
+                     max_wait=MAX_WAIT, on_account=None, cancel=None):
+    """Bulk refresh: fetches the accounts (stalest first) concurrently and stores them.
+
+    Categories that were fetched completely are stored even if another
+    category of the same account failed. on_account(username, changes, error,
+    seconds) is called per account. Returns a report for format_report().
+    """
+    import github_api
+    usernames = stalest_first(results, usernames, categories)
+    stats_before = github_api.get_stats()
+    start = time.perf_counter()
+    accounts = []
+    for username, fetched, error, seconds in fetch_accounts(usernames, categories, max_workers, max_wait, cancel):
+        account = store_fetched_account(results, store, username, fetched, error, seconds)
+        accounts.append(account)
+        if on_account:
+            on_account(username, account["changes"], error, seconds)
+    return build_report(accounts, time.perf_counter() - start, stats_before, github_api.get_stats())
+
+
+def store_fetched_account(results, store, username, fetched, error=None, seconds=0.0):
+    """Applies the categories fetched by fetch_accounts() and returns the account entry of a report.
+
+    A database error (e.g. "database is locked" while another process writes)
+    fails only this account; it is reported like a fetch error.
+    """
+    changes = {}
+    for category, logins in fetched.items():
+        try:
+            changes[category] = apply_category(results, store, username, category, logins, fetched=True)
+        except sqlite3.Error as e:
+            error = error or e
+    return {"username": username, "seconds": seconds, "error": error, "changes": changes,
+            "logins": sum(len(logins) for logins in fetched.values())}
+
+
+def build_report(accounts, elapsed, stats_before, stats_after):
+    requests_sent = {name: stats_after[name] - stats_before.get(name, 0) for name in stats_after}
+    return {
+        "accounts": accounts,
+        "elapsed": elapsed,
+        "failed": sum(1 for account in accounts if account["error"] is not None),
+        "logins": sum(account["logins"] for account in accounts),
+        "requests": requests_sent,
+    }
+
+
+def format_report(report):
+    """Returns the summary of a bulk refresh as a list of lines."""
+    elapsed = max(report["elapsed"], 1e-9)
+    sent = report["requests"]
+    lines = [
+        f"{len(report['accounts'])} accounts ({report['failed']} failed) in {report['elapsed']:.1f} s",
+        f"{sent['requests']} requests ({sent['requests'] / elapsed:.1f}/s), {sent['not_modified']} not modified, "
+        f"{sent['coalesced']} shared, {report['logins'] / elapsed:.0f} logins/s",
+    ]
+    for account in sorted(report["accounts"], key=lambda a: a["seconds"], reverse=True):
+        status = f"failed: {account['error']}" if account["error"] is not None else \
+            ", ".join(f"{category} +{len(added)}/-{len(removed)}"
+                      for category, (added, removed) in account["changes"].items())
+        lines.append(f"  {account['username']:<30} {account['seconds']:6.2f} s  {status}")
+    return lines
+
+
+def not_following_back(results, username):
+    """Users the account follows that do not follow it back."""
+    account = results.get(username, {})
+    return account.get("following", set()) - account.get("followers", set())
+
+
+# --- user details ---
+
+def enrich_account(results, store, username, on_progress=None):
+    """Fetches missing/outdated details of all followers and followed users of an account.
+
+    Everything fetched is scored and stored, also if an error interrupts
+    the run (the error is raised afterwards). Returns the number of users enriched.
+    """
+    import enrich
+    account = results.get(username, {})
+    logins = sorted(set(account.get("followers", ())) | set(account.get("following", ())))
+    details_cache = results.setdefault("user_details", {})
+    stale = enrich.stale_logins(logins, details_cache)
+    found = {}
+    try:
+        enrich.enrich_users(stale, found, on_progress=on_progress)
+    finally:
+        for details in found.values():
+            details["score"] = calculate_score(details)
+        details_cache.update(found)
+        store.upsert_many_user_details(found)
+    return len(found)
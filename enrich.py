@@ -0,0 +1,169 @@
+"""Bulk enrichment of user details.
+
+With a token, details of up to BATCH_SIZE users are fetched per GraphQL
+request (one aliased user(login:) field per user). Without a token GraphQL
+is not available, so the profiles are fetched over REST with a bounded
+thread pool instead. Entries in the details cache that are younger than
+DETAILS_TTL are not fetched again.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import requests
+
+import github_api
+import metrics
+
+BATCH_SIZE = 50
+MAX_WORKERS = 4
+DETAILS_TTL = timedelta(days=7)
+
+USER_FIELDS = """
+    location
+    repositories(privacy: PUBLIC) { totalCount }
+    gists(privacy: PUBLIC) { totalCount }
+    followers { totalCount }
+    following { totalCount }
+    createdAt
+    isSiteAdmin
+"""
+
+
+def details_from_rest(data):
+    """Maps a /users/{login} response to the details dict kept in the cache."""
+    return {
+        "location": data.get("location", "-"),
+        "public_repos": data.get("public_repos", "-"),
+        "public_gists": data.get("public_gists", "-"),
+        "following": data.get("following", "-"),
+        "followers": data.get("followers", "-"),
+        "created_at": data.get("created_at", "-"),
+        "site_admin": data.get("site_admin", False),
+        "fetched_at": datetime.now().isoformat(sep=' ', timespec='seconds'),
+    }
+
+
+def details_from_graphql(node):
+    return {
+        "location": node.get("location"),
+        "public_repos": node["repositories"]["totalCount"],
+        "public_gists": node["gists"]["totalCount"],
+        "following": node["following"]["totalCount"],
+        "followers": node["followers"]["totalCount"],
+        "created_at": node.get("createdAt", "-"),
+        "site_admin": node.get("isSiteAdmin", False),
+        "fetched_at": datetime.now().isoformat(sep=' ', timespec='seconds'),
+    }
+
+
+def is_fresh(details, ttl=DETAILS_TTL, now=None):
+    """True if cached details were fetched less than ttl ago."""
+    fetched_at = (details or {}).get("fetched_at")
+    if not fetched_at:
+        return False
+    try:
+        return (now or datetime.now()) - datetime.fromisoformat(fetched_at) < ttl
+    except ValueError:
+        return False
+
+
+def stale_logins(logins, cached_details, ttl=DETAILS_TTL):
+    """Returns the logins whose cached details are missing or older than ttl."""
+    now = datetime.now()
+    logins = list(dict.fromkeys(logins))
+    stale = [login for login in logins if not is_fresh(cached_details.get(login), ttl, now)]
+    if metrics.ENABLED:
+        missing = sum(1 for login in stale if login not in cached_details)
+        metrics.inc("user_details_cache_total", len(logins) - len(stale), result="hit")
+        metrics.inc("user_details_cache_total", missing, result="miss")
+        metrics.inc("user_details_cache_total", len(stale) - missing, result="stale")
+    return stale
+
+
+class GraphQLError(requests.exceptions.RequestException):
+    """A GraphQL request failed as a whole (errors other than NOT_FOUND)."""
+
+
+def _graphql_batch(logins, base_url, cancel=None):
+    params = ", ".join(f"$l{i}: String!" for i in range(len(logins)))
+    fields = "\n".join(f"u{i}: user(login: $l{i}) {{ {USER_FIELDS} }}" for i in range(len(logins)))
+    query = f"query({params}) {{\n{fields}\n}}"
+    variables = {f"l{i}": login for i, login in enumerate(logins)}
+    response = github_api.post_graphql(query, variables, base_url=base_url, cancel=cancel)
+    # Errors come with HTTP 200; anything but unknown logins (e.g. RATE_LIMITED) fails the batch,
+    # instead of sending every login of it to REST one by one
+    errors = [error for error in response.get("errors") or () if error.get("type") != "NOT_FOUND"]
+    if errors:
+        message = "; ".join(error.get("message", str(error)) for error in errors)
+        if any(error.get("type") == "RATE_LIMITED" for error in errors):
+            raise github_api.RateLimitError(f"GraphQL: {message}")
+        raise GraphQLError(f"GraphQL: {message}")
+    data = response.get("data") or {}
+    found = {}
+    for i, login in enumerate(logins):
+        node = data.get(f"u{i}")
+        if node:
+            found[login] = details_from_graphql(node)
+    # Logins GraphQL does not know as users (e.g. organizations) are left to REST
+    return found, [login for login in logins if login not in found]
+
+
+def _rest_one(login, base_url, cancel=None):
+    try:
+        return details_from_rest(github_api.fetch_profile(login, base_url, cancel=cancel, cached=False))
+    except requests.exceptions.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return None  # Account deleted in the meantime
+        raise
+
+
+def enrich_users(logins, results=None, batch_size=BATCH_SIZE, max_workers=MAX_WORKERS,
+                 use_graphql=None, base_url=None, on_progress=None, cancel=None):
+    """Fetches details for all logins and returns {login: details}.
+
+    results is filled in place, so after an exception it still holds every
+    user fetched until then. use_graphql defaults to "if a token is set",
+    base_url to github_api.API_URL. on_progress(done, total) is called after
+    every batch / user. Logins that no longer exist are skipped. Setting the
+    cancel event stops requests that wait for the rate limit.
+    """
+    if results is None:
+        results = {}
+    logins = list(dict.fromkeys(logins))
+    total = len(logins)
+    done = 0
+    if use_graphql is None:
+        use_graphql = github_api.has_token()
+
+    rest_logins = logins
+    if use_graphql:
+        rest_logins = []
+        batches = [logins[i:i + batch_size] for i in range(0, total, batch_size)]
+        pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches) or 1)))
+        try:
+            futures = [pool.submit(_graphql_batch, batch, base_url, cancel) for batch in batches]
+            for future in as_completed(futures):
+                found, missing = future.result()
+                results.update(found)
+                rest_logins.extend(missing)
+                done += len(found)
+                if on_progress:
+                    on_progress(done, total)
+        finally:
+            # Don't start the remaining batches after an error / cancellation
+            pool.shutdown(cancel_futures=True)
+
+    if rest_logins:
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {pool.submit(_rest_one, login, base_url, cancel): login for login in rest_logins}
+            for future in as_completed(futures):
+                details = future.result()
+                if details is not None:
+                    results[futures[future]] = details
+                done += 1
+                if on_progress:
+                    on_progress(done, total)
+        finally:
+            pool.shutdown(cancel_futures=True)
+    return results
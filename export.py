@@ -0,0 +1,170 @@
+"""Streaming export of stored follow data to CSV, JSON Lines, Parquet or Arrow.
+
+Rows are read from the store in chunks (over a separate read-only
+connection) and written chunk by chunk, so memory use does not grow with
+the size of an account. Parquet and Arrow need pyarrow (optional).
+
+Two kinds of export:
+
+- snapshot: every login of followers/following with first-seen time, the
+  follows-back flag (login is also in the other category), user details
+  and score
+- changes: only what was added/removed since the last changes export of
+  the same account and category (from the change log). The id of the last
+  exported change is kept in the store's metadata.
+"""
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+
+import scoring
+from core import TIMESTAMP_KEYS
+
+CHUNK_SIZE = 10000
+FORMATS = ("csv", "jsonl", "parquet", "arrow")
+EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet",
+              ".arrow": "arrow", ".feather": "arrow"}
+OTHER_CATEGORY = {"followers": "following", "following": "followers"}
+DETAIL_FIELDS = ("location", "followers", "following", "public_repos", "public_gists", "created_at", "site_admin")
+
+SNAPSHOT_FIELDS = ("account", "category", "login", "first_seen", "follows_back") + \
+    tuple(f"user_{name}" for name in DETAIL_FIELDS) + ("score",)
+CHANGE_FIELDS = ("account", "category", "login", "change", "detected_at") + \
+    tuple(f"user_{name}" for name in DETAIL_FIELDS) + ("score",)
+
+
+def format_for(path):
+    """Guesses the format from a file name (default csv)."""
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), "csv")
+
+
+def mark_key(username, category):
+    return f"last_export:{username}:{category}"
+
+
+def _details_columns(details_json, now):
+    if not details_json:
+        return (None,) * (len(DETAIL_FIELDS) + 1)
+    details = json.loads(details_json)
+    values = tuple(None if details.get(name) in (None, "-") else details.get(name) for name in DETAIL_FIELDS)
+    return values + (scoring.score_details(details, now=now),)
+
+
+def snapshot_chunks(store, username, categories, chunk_size=CHUNK_SIZE):
+    """Yields lists of row tuples (SNAPSHOT_FIELDS) of the current follow sets."""
+    now = datetime.now().timestamp()
+    for category in categories:
+        for rows in store.iter_category_rows(username, category, OTHER_CATEGORY[category],
+                                             TIMESTAMP_KEYS[category], chunk_size):
+            yield [(username, category, login, first_seen, bool(other)) + _details_columns(details, now)
+                   for login, first_seen, other, details in rows]
+
+
+def change_chunks(store, username, categories, marks, chunk_size=CHUNK_SIZE):
+    """Yields lists of row tuples (CHANGE_FIELDS) of the changes after marks[category];
+    marks is updated to the last exported change per category."""
+    now = datetime.now().timestamp()
+    for category in categories:
+        for rows in store.iter_changes(username, category, marks.get(category, 0), chunk_size):
+            marks[category] = rows[-1][0]
+            yield [(username, category, login, "added" if delta > 0 else "removed",
+                    datetime.fromtimestamp(ts).isoformat(sep=' ', timespec='seconds')) + _details_columns(details, now)
+                   for event_id, login, delta, ts, details in rows]
+
+
+# --- writers: write(chunk) per list of row tuples, then close() ---
+
+class CsvWriter:
+    def __init__(self, out, fields):
+        self.out = out
+        self.writer = csv.writer(out)
+        self.writer.writerow(fields)
+
+    def write(self, chunk):
+        self.writer.writerows(chunk)
+
+    def close(self):
+        self.out.flush()
+
+
+class JsonlWriter:
+    def __init__(self, out, fields):
+        self.out = out
+        self.fields = fields
+
+    def write(self, chunk):
+        self.out.writelines(json.dumps(dict(zip(self.fields, row))) + "\n" for row in chunk)
+
+    def close(self):
+        self.out.flush()
+
+
+class ArrowWriter:
+    """Parquet or Arrow IPC file, one record batch / row group per chunk."""
+
+    def __init__(self, path, fields, fmt):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError(f"{fmt} export needs pyarrow (pip install pyarrow)") from None
+        self.pa = pa
+        types = {"follows_back": pa.bool_(), "user_site_admin": pa.bool_(), "score": pa.int64(),
+                 "user_followers": pa.int64(), "user_following": pa.int64(),
+                 "user_public_repos": pa.int64(), "user_public_gists": pa.int64()}
+        self.schema = pa.schema([(name, types.get(name, pa.string())) for name in fields])
+        if fmt == "parquet":
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, chunk):
+        columns = [list(column) for column in zip(*chunk)]
+        self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def open_writer(path, fields, fmt):
+    """Returns (writer, file to close or None). path "-" writes csv/jsonl to stdout."""
+    if fmt in ("parquet", "arrow"):
+        if path == "-":
+            raise RuntimeError(f"{fmt} export needs an output file")
+        return ArrowWriter(path, fields, fmt), None
+    out = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+    writer = (CsvWriter if fmt == "csv" else JsonlWriter)(out, fields)
+    return writer, (None if path == "-" else out)
+
+
+def export_account(store, username, path, fmt=None, categories=("followers", "following"), changes=False,
+                   chunk_size=CHUNK_SIZE, on_progress=None):
+    """Exports one account to path. With changes only the changes since the last changes export.
+
+    on_progress(rows_written) is called after every chunk. The export marks
+    are saved only after the file was written completely. Returns the number of rows.
+    """
+    fmt = fmt or format_for(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    marks = {category: int(store.get_metadata(mark_key(username, category), 0)) for category in categories}
+    chunks = (change_chunks(store, username, categories, marks, chunk_size) if changes
+              else snapshot_chunks(store, username, categories, chunk_size))
+    writer, out = open_writer(path, CHANGE_FIELDS if changes else SNAPSHOT_FIELDS, fmt)
+    written = 0
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+            written += len(chunk)
+            if on_progress:
+                on_progress(written)
+        writer.close()
+    finally:
+        if out is not None:
+            out.close()
+    if changes:
+        for category, mark in marks.items():
+            store.set_metadata(mark_key(username, category), mark)
+    return written
@@ -0,0 +1,549 @@
+"""Fetch engine for the GitHub REST API.
+
+All requests go through one pooled keep-alive session. Paginated lists
+(followers / following) are fetched by reading page 1, working out how many
+pages there are and then loading the remaining pages concurrently.
+
+Responses are remembered in a small SQLite cache together with their ETag /
+Last-Modified headers, so a refresh can send conditional requests and reuse
+the cached page when GitHub answers 304 Not Modified (which does not count
+against the rate limit).
+
+A RateLimiter reads the X-RateLimit-* and Retry-After headers of every
+response. When the budget is used up, requests wait ("park") until the reset
+time instead of failing; if that is further away than the caller is willing
+to wait, a RateLimitError is raised and the pages fetched so far are kept so
+a call shortly after the reset can resume; any other error drops them. Set
+GITHUB_TOKEN to raise the budget from 60 to 5000 requests per hour.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# e.g. for GitHub Enterprise; read on every call (base_url=None), so it can be changed at run time
+API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+PER_PAGE = 100
+MAX_WORKERS = 8
+HTTP_CACHE_FILE = "github_http_cache.db"
+HTTP_CACHE_MAX_ENTRIES = 20000  # Pages and profiles; the least recently used ones are dropped beyond this
+MAX_PARK_SECONDS = 60  # Default for how long a request may wait for the rate limit reset (None: no limit)
+CANCEL_POLL_SECONDS = 0.2  # How often a waiting request looks at its cancel event
+SECONDARY_LIMIT_WAIT = 60  # GitHub's advice for 403/429 without any retry hint
+MAX_ATTEMPTS = 3
+RESUME_SECONDS = 300  # Pages of a rate limited fetch are reused until this long after the reset
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class RateLimitError(requests.exceptions.RequestException):
+    """Raised when the rate limit blocks a request for longer than allowed.
+
+    reset_at is the epoch time at which requests are possible again,
+    pages_done / total_pages describe how far a paginated fetch got.
+    """
+
+    def __init__(self, *args, reset_at=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reset_at = reset_at
+        self.pages_done = None
+        self.total_pages = None
+
+
+class Cancelled(Exception):
+    """Raised when the cancel event of a request was set while it was waiting."""
+
+
+def _check_cancel(cancel):
+    if cancel is not None and cancel.is_set():
+        raise Cancelled()
+
+
+class RateLimiter:
+    """Tracks the request budget reported by GitHub and paces requests.
+
+    acquire() is called before every request. It takes one request from the
+    known budget, or waits until the reset time when nothing is left. A
+    waiting request stops with Cancelled as soon as its cancel event
+    (a threading.Event, e.g. Job.cancelled) is set.
+    """
+
+    def __init__(self, reserve=0):
+        self.reserve = reserve
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.blocked_until = 0
+        self.cond = threading.Condition()
+
+    def _wait_time(self, now):
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        if self.reset_at is not None and self.reset_at <= now:
+            # Window is over, budget unknown until the next response
+            self.remaining = None
+            self.reset_at = None
+        if self.remaining is not None and self.remaining <= self.reserve and self.reset_at:
+            return self.reset_at - now + 1
+        return 0
+
+    def acquire(self, max_wait=MAX_PARK_SECONDS, cancel=None):
+        with self.cond:
+            while True:
+                _check_cancel(cancel)
+                now = time.time()
+                wait = self._wait_time(now)
+                if wait <= 0:
+                    if self.remaining is not None:
+                        self.remaining -= 1
+                    return
+                if max_wait is not None and wait > max_wait:
+                    raise RateLimitError(
+                        f"GitHub API rate limit exhausted until {time.strftime('%H:%M:%S', time.localtime(now + wait))}",
+                        reset_at=now + wait)
+                self.cond.wait(wait if cancel is None else min(wait, CANCEL_POLL_SECONDS))
+
+    def update(self, response):
+        """Takes the budget from the X-RateLimit-* headers of a response."""
+        headers = response.headers
+        with self.cond:
+            try:
+                if "X-RateLimit-Limit" in headers:
+                    self.limit = int(headers["X-RateLimit-Limit"])
+                if "X-RateLimit-Remaining" in headers:
+                    remaining = int(headers["X-RateLimit-Remaining"])
+                    reset_at = int(headers.get("X-RateLimit-Reset", 0)) or None
+                    if reset_at != self.reset_at or self.remaining is None:
+                        self.remaining = remaining
+                    else:
+                        # Responses of concurrent requests arrive out of order
+                        self.remaining = min(self.remaining, remaining)
+                    self.reset_at = reset_at
+            except ValueError:
+                pass
+            self.cond.notify_all()
+
+    def retry_delay(self, response):
+        """Seconds to wait before retrying a 403/429 response."""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return int(retry_after)
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            reset_at = int(response.headers.get("X-RateLimit-Reset", 0) or 0)
+            return max(1, reset_at - time.time() + 1)
+        return SECONDARY_LIMIT_WAIT
+
+    def block(self, seconds):
+        with self.cond:
+            self.blocked_until = max(self.blocked_until, time.time() + seconds)
+            self.cond.notify_all()
+
+    def status(self):
+        """Returns (remaining, limit, reset_at); values are None while unknown."""
+        with self.cond:
+            return self.remaining, self.limit, self.reset_at
+
+
+class ConditionalCache:
+    """Per-URL cache of validators (ETag / Last-Modified) and payloads.
+
+    Entries look like {"etag": ..., "last_modified": ..., "data": ..., "last_page": ...}
+    where "data" is the already reduced payload (e.g. the list of logins).
+    They are kept in an SQLite database at path (None: in memory only) and
+    read on first use. save() writes only the entries added or used since
+    the last save and drops the least recently used ones beyond max_entries.
+    """
+
+    def __init__(self, path=HTTP_CACHE_FILE, max_entries=HTTP_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = {}  # Entries read or written in this run
+        self.dirty = {}  # key -> entry not saved yet
+        self.used = set()  # Keys read since the last save
+        self.lock = threading.Lock()
+        self.conn = None
+        if path:
+            try:
+                self.conn = sqlite3.connect(path, check_same_thread=False)
+                self.conn.execute("CREATE TABLE IF NOT EXISTS http_cache "
+                                  "(key TEXT PRIMARY KEY, entry TEXT NOT NULL, used_at INTEGER NOT NULL)")
+            except sqlite3.Error:
+                self.conn = None  # A broken cache only costs full downloads
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None and self.conn is not None:
+                try:
+                    row = self.conn.execute("SELECT entry FROM http_cache WHERE key = ?", (key,)).fetchone()
+                    entry = json.loads(row[0]) if row else None
+                except (sqlite3.Error, ValueError):
+                    entry = None
+                if entry is not None:
+                    self.entries[key] = entry
+            if entry is not None:
+                self.used.add(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = self.dirty[key] = entry
+
+    def save(self):
+        with self.lock:
+            if self.conn is None or not (self.dirty or self.used):
+                return
+            now = int(time.time())
+            try:
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT INTO http_cache (key, entry, used_at) VALUES (?, ?, ?) ON CONFLICT (key) "
+                        "DO UPDATE SET entry = excluded.entry, used_at = excluded.used_at",
+                        [(key, json.dumps(entry), now) for key, entry in self.dirty.items()])
+                    self.conn.executemany("UPDATE http_cache SET used_at = ? WHERE key = ?",
+                                          [(now, key) for key in self.used.difference(self.dirty)])
+                    count = self.conn.execute("SELECT COUNT(*) FROM http_cache").fetchone()[0]
+                    if count > self.max_entries:
+                        self.conn.execute(
+                            "DELETE FROM http_cache WHERE key IN "
+                            "(SELECT key FROM http_cache ORDER BY used_at LIMIT ?)", (count - self.max_entries,))
+            except sqlite3.Error:
+                return  # Kept in memory and tried again on the next save
+            self.dirty = {}
+            self.used = set()
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+            self.dirty = {}
+            self.used = set()
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute("DELETE FROM http_cache")
+
+
+_cache = None
+_rate_limiter = RateLimiter()
+_graphql_rate_limiter = RateLimiter()
+# (base_url, username, endpoint_type) -> {"total_pages": n, "pages": {page: logins}, "expires_at": epoch}
+_partial_fetches = {}
+_partial_lock = threading.Lock()
+_inflight = {}  # (url, extract) -> Future of a GET that is currently running
+_inflight_lock = threading.Lock()
+_stats = {"requests": 0, "not_modified": 0, "coalesced": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_stats():
+    """Returns a copy of the request counters (requests sent, 304 answers, coalesced duplicates)."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def get_rate_limiter():
+    return _rate_limiter
+
+
+def set_token(token):
+    """Uses a personal access token for all further requests (None to drop it)."""
+    session = get_session()
+    if token:
+        session.headers["Authorization"] = f"Bearer {token}"
+    else:
+        session.headers.pop("Authorization", None)
+
+
+def get_cache():
+    """Returns the shared conditional request cache (loaded on first use)."""
+    global _cache
+    with _session_lock:
+        if _cache is None:
+            _cache = ConditionalCache()
+        return _cache
+
+
+def get_session():
+    """Returns the shared keep-alive session (created on first use)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # Pool must be at least as large as the worker pool, otherwise
+            # connections get thrown away and re-opened (new TLS handshake).
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS * 4)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"Accept": "application/vnd.github+json"})
+            token = os.environ.get("GITHUB_TOKEN")
+            if token:
+                session.headers["Authorization"] = f"Bearer {token}"
+            _session = session
+        return _session
+
+
+def is_rate_limited(response):
+    """True if a 403/429 response means "slow down" rather than "not allowed".
+
+    429 always does. A 403 only with an exhausted budget, a Retry-After
+    header or a secondary rate limit message; any other 403 (token without
+    access, blocked resource) is a plain error.
+    """
+    if response.status_code == 429:
+        return True
+    if response.status_code != 403:
+        return False
+    if response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers:
+        return True
+    return "rate limit" in response.text.lower()
+
+
+def _request(method, url, limiter, max_wait=MAX_PARK_SECONDS, cancel=None, **kwargs):
+    for attempt in range(MAX_ATTEMPTS):
+        with metrics.timer("rate_limit_wait_seconds"):
+            limiter.acquire(max_wait, cancel)
+        with metrics.timer("http_request_seconds", method=method):
+            response = get_session().request(method, url, timeout=30, **kwargs)
+        _count("requests")
+        metrics.inc("http_responses_total", status=str(response.status_code))
+        limiter.update(response)
+        if not is_rate_limited(response):
+            response.raise_for_status()
+            return response
+        # Rate limited: park until GitHub lets us continue, then try again
+        limiter.block(limiter.retry_delay(response))
+    raise RateLimitError(f"{response.status_code} for {url}", response=response,
+                         reset_at=limiter.blocked_until)
+
+
+def _get(url, params=None, headers=None, max_wait=MAX_PARK_SECONDS, cancel=None):
+    return _request("GET", url, get_rate_limiter(), max_wait, cancel, params=params, headers=headers)
+
+
+def post_graphql(query, variables=None, base_url=None, max_wait=MAX_PARK_SECONDS, cancel=None):
+    """Runs a GraphQL query (needs a token) and returns the JSON response.
+
+    GraphQL has its own rate limit, tracked by a separate RateLimiter.
+    """
+    response = _request("POST", f"{base_url or API_URL}/graphql", _graphql_rate_limiter, max_wait, cancel,
+                        json={"query": query, "variables": variables or {}})
+    return response.json()
+
+
+def has_token():
+    return "Authorization" in get_session().headers
+
+
+def _get_cached(url, params=None, extract=None, max_wait=MAX_PARK_SECONDS, cancel=None):
+    """Conditional GET through the cache.
+
+    extract(json) reduces the response body to what is worth keeping.
+    Returns (data, last_page) where last_page comes from the Link header
+    (remembered from the original response on a 304). Identical requests
+    running at the same time (e.g. while refreshing several accounts) are
+    sent only once and share the result.
+    """
+    key = requests.Request("GET", url, params=params).prepare().url
+    while True:
+        with _inflight_lock:
+            future = _inflight.get((key, extract))
+            running = future is not None
+            if not running:
+                future = _inflight[(key, extract)] = Future()
+        if not running:
+            break
+        _count("coalesced")
+        metrics.inc("http_cache_total", result="coalesced")
+        try:
+            return _wait_for(future, cancel)
+        except Cancelled:
+            _check_cancel(cancel)
+            # Only the request we waited for was cancelled: send it ourselves
+    try:
+        result = _get_conditional(key, url, params, extract, max_wait, cancel)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[(key, extract)]
+
+
+def _wait_for(future, cancel):
+    if cancel is None:
+        return future.result()
+    while True:
+        try:
+            return future.result(CANCEL_POLL_SECONDS)
+        except TimeoutError:
+            _check_cancel(cancel)
+
+
+def _get_conditional(key, url, params, extract, max_wait, cancel):
+    cache = get_cache()
+    entry = cache.get(key)
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    response = _get(url, params=params, headers=headers, max_wait=max_wait, cancel=cancel)
+    if response.status_code == 304 and entry:
+        _count("not_modified")
+        metrics.inc("http_cache_total", result="not_modified")
+        return entry["data"], entry.get("last_page")
+    metrics.inc("http_cache_total", result="modified" if entry else "uncached")
+    with metrics.timer("json_parse_seconds"):
+        data = response.json()
+        if extract:
+            data = extract(data)
+    last_page = _last_page_from_links(response)
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        cache.put(key, {"etag": etag, "last_modified": last_modified,
+                        "data": data, "last_page": last_page})
+    return data, last_page
+
+
+def _extract_logins(items):
+    return [item["login"] for item in items]
+
+
+def _last_page_from_links(response):
+    """Reads the page number of rel="last" from the Link header, or None."""
+    last = response.links.get("last")
+    if not last:
+        return None
+    query = last["url"].split("?", 1)[-1]
+    for part in query.split("&"):
+        key, _, value = part.partition("=")
+        if key == "page" and value.isdigit():
+            return int(value)
+    return None
+
+
+def fetch_profile(username, base_url=None, max_wait=MAX_PARK_SECONDS, cancel=None, cached=True):
+    """Returns the JSON profile of /users/{username}.
+
+    cached=False skips the request cache, for profiles that are fetched
+    once for their details (enrichment) and would only fill it up.
+    """
+    url = f"{base_url or API_URL}/users/{username}"
+    if not cached:
+        return _get(url, max_wait=max_wait, cancel=cancel).json()
+    return _get_cached(url, max_wait=max_wait, cancel=cancel)[0]
+
+
+def fetch_page(username, endpoint_type, page, per_page=PER_PAGE, base_url=None,
+               max_wait=MAX_PARK_SECONDS, cancel=None):
+    """Fetches a single page of a list endpoint and returns the logins on it."""
+    url = f"{base_url or API_URL}/users/{username}/{endpoint_type}"
+    params = {"per_page": per_page, "page": page}
+    with metrics.timer("page_seconds", endpoint=endpoint_type):
+        return _get_cached(url, params=params, extract=_extract_logins, max_wait=max_wait, cancel=cancel)[0]
+
+
+def fetch_logins(username, endpoint_type, per_page=PER_PAGE, max_workers=MAX_WORKERS,
+                 base_url=None, on_page=None, max_wait=MAX_PARK_SECONDS, cancel=None):
+    """Fetches all logins of /users/{username}/{endpoint_type}.
+
+    Page 1 is loaded first. The total number of pages is taken from its
+    Link header or, if that is missing, from the follower/following count
+    of the profile. The remaining pages are then fetched concurrently and
+    joined back together in page order.
+
+    on_page(page, total_pages) is called after every page, if given.
+    Every page is requested conditionally, unchanged pages are taken from
+    the cache. A request waits up to max_wait seconds (None: no limit) for
+    the rate limit to reset. If it would have to wait longer, RateLimitError
+    is raised; the pages fetched so far are kept and skipped by a call within
+    RESUME_SECONDS after the reset. Raises requests.exceptions.RequestException
+    on other failures (and forgets the pages fetched so far), Cancelled once
+    the cancel event is set while a request waits.
+    """
+    try:
+        return _fetch_logins(username, endpoint_type, per_page, max_workers, base_url or API_URL,
+                             on_page, max_wait, cancel)
+    finally:
+        get_cache().save()
+
+
+def _fetch_logins(username, endpoint_type, per_page, max_workers, base_url, on_page, max_wait, cancel):
+    url = f"{base_url}/users/{username}/{endpoint_type}"
+    with metrics.timer("page_seconds", endpoint=endpoint_type):
+        first_logins, total_pages = _get_cached(
+            url, params={"per_page": per_page, "page": 1}, extract=_extract_logins, max_wait=max_wait,
+            cancel=cancel)
+    if len(first_logins) < per_page:
+        if on_page:
+            on_page(1, 1)
+        return first_logins
+
+    if total_pages is None:
+        count = fetch_profile(username, base_url, max_wait, cancel).get(endpoint_type) or 0
+        total_pages = max(1, -(-int(count) // per_page))
+    if on_page:
+        on_page(1, total_pages)
+
+    # Resume a fetch stopped by the rate limit, unless it is too old or the number of pages has changed
+    key = (base_url, username, endpoint_type)
+    with _partial_lock:
+        partial = _partial_fetches.pop(key, None)
+    done = {}
+    if partial and partial["total_pages"] == total_pages and time.time() < partial["expires_at"]:
+        done = partial["pages"]
+    done[1] = first_logins
+
+    def load(page):
+        logins = done.get(page)
+        if logins is None:
+            logins = fetch_page(username, endpoint_type, page, per_page, base_url, max_wait, cancel)
+            done[page] = logins
+        if on_page:
+            on_page(page, total_pages)
+        return logins
+
+    try:
+        pages = [first_logins]
+        if total_pages > 1:
+            workers = max(1, min(max_workers, total_pages - 1))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # map() yields results in submission order, i.e. in page order
+                pages.extend(pool.map(load, range(2, total_pages + 1)))
+
+        # The count may have grown since the Link header / profile was read:
+        # keep walking serially while the last page is full.
+        page = total_pages
+        while len(pages[-1]) == per_page:
+            page += 1
+            pages.append(fetch_page(username, endpoint_type, page, per_page, base_url, max_wait, cancel))
+            if on_page:
+                on_page(page, page)
+    except RateLimitError as e:
+        e.pages_done = len(done)
+        e.total_pages = total_pages
+        with _partial_lock:
+            _partial_fetches[key] = {"total_pages": total_pages, "pages": done,
+                                     "expires_at": (e.reset_at or time.time()) + RESUME_SECONDS}
+        raise
+
+    all_logins = []
+    for logins in pages:
+        all_logins.extend(logins)
+    return all_logins
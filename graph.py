@@ -0,0 +1,126 @@
+"""Graph analytics over the cached follow data.
+
+GraphIndex turns the stored follow edges of all tracked accounts into a
+directed graph over the ids of a compact.CompactResults. Out- and
+in-neighbours are kept as compressed sparse rows (one offsets array, one
+array of sorted neighbour ids), so queries are slices and sorted-array
+intersections instead of Python sets built on every call:
+
+- mutual_followers(a, b): users following both accounts
+- overlap_matrix(): shared followers/following between all tracked accounts
+- suggestions(user): second-degree users, ranked by the number of paths
+- top_scored(logins, engine): the best users of a list by score
+
+Only edges that touch a tracked account are known, so the graph is exact
+around tracked accounts and partial elsewhere.
+"""
+import heapq
+from array import array
+from collections import Counter
+from itertools import accumulate
+
+import compact
+
+
+def _csr(pairs, size):
+    """Compressed sparse rows: the neighbours of node i are indices[indptr[i]:indptr[i + 1]] (sorted)."""
+    pairs = sorted(pairs)
+    counts = array("I", [0]) * size
+    for src, dst in pairs:
+        counts[src] += 1
+    indptr = array("I", accumulate(counts, initial=0))
+    indices = array("i", (dst for src, dst in pairs))
+    if compact.np is not None:
+        indices = compact.np.array(indices, dtype=compact.np.int32)
+    return indptr, indices
+
+
+class GraphIndex:
+    """Sparse adjacency index over a compact.CompactResults (built once, then read only)."""
+
+    def __init__(self, results):
+        self.results = results
+        self.table = results.table
+        self.accounts = sorted(results.accounts)
+        self.account_ids = dict(zip(self.accounts, self.table.ids(self.accounts)))
+        edges = set()
+        for username, node in self.account_ids.items():
+            account = results.accounts[username]
+            edges.update((int(follower), node) for follower in account.ids("followers"))
+            edges.update((node, int(followed)) for followed in account.ids("following"))
+        size = len(self.table)
+        self.edge_count = len(edges)
+        self._out = _csr(edges, size)
+        self._in = _csr(((dst, src) for src, dst in edges), size)
+        self._overlap = {}  # category -> matrix
+
+    # --- neighbours ---
+
+    def _neighbours(self, csr, node):
+        indptr, indices = csr
+        if node is None or node >= len(indptr) - 1:
+            return indices[0:0]
+        return indices[indptr[node]:indptr[node + 1]]
+
+    def _following(self, node):
+        return self._neighbours(self._out, node)
+
+    def _followers(self, node):
+        return self._neighbours(self._in, node)
+
+    def following_of(self, login):
+        """Known users a login follows."""
+        return self.table.logins(self._following(self.table.id(login)))
+
+    def followers_of(self, login):
+        """Known followers of a login."""
+        return self.table.logins(self._followers(self.table.id(login)))
+
+    # --- queries ---
+
+    def mutual_followers(self, login_a, login_b):
+        """Users following both a and b."""
+        return self.table.logins(compact.intersect(self._followers(self.table.id(login_a)),
+                                                   self._followers(self.table.id(login_b))))
+
+    def mutual_following(self, login_a, login_b):
+        """Users followed by both a and b."""
+        return self.table.logins(compact.intersect(self._following(self.table.id(login_a)),
+                                                   self._following(self.table.id(login_b))))
+
+    def overlap_matrix(self, category="followers"):
+        """Returns a matrix of shared logins between all tracked accounts (rows/columns as in .accounts).
+
+        The diagonal holds the size of the category itself. Computed once per category.
+        """
+        matrix = self._overlap.get(category)
+        if matrix is None:
+            sets = [self.results.accounts[username].ids(category) for username in self.accounts]
+            matrix = [[0] * len(sets) for _ in sets]
+            for i, a in enumerate(sets):
+                matrix[i][i] = len(a)
+                for j in range(i + 1, len(sets)):
+                    matrix[i][j] = matrix[j][i] = len(compact.intersect(a, sets[j]))
+            self._overlap[category] = matrix
+        return matrix
+
+    def suggestions(self, login, limit=20):
+        """Second-degree users: followed by users the login follows, but not by the login itself.
+
+        Returns [(login, paths)] ranked by the number of followed users leading to them.
+        """
+        node = self.table.id(login)
+        following = self._following(node)
+        paths = Counter()
+        for followed in following:
+            paths.update(self._following(int(followed)))
+        paths.pop(node, None)
+        for followed in following:
+            paths.pop(followed, None)
+        best = heapq.nsmallest(limit, paths.items(), key=lambda item: (-item[1], self.table.login(item[0])))
+        return [(self.table.login(candidate), count) for candidate, count in best]
+
+
+def top_scored(logins, engine, n=10, profile="default"):
+    """The n logins with the highest score (of a scoring.ScoreEngine) as [(login, score)]."""
+    return engine.top_k(n, logins, profile)
@@ -0,0 +1,136 @@
+"""Background jobs for the Tk GUI.
+
+Tk widgets may only be touched from the main thread. Jobs run on a small
+thread pool; their progress, results and errors are put on a queue which
+the main thread drains every POLL_MS milliseconds via window.after, so all
+callbacks run on the main thread.
+
+A cancelled job keeps running until its next check()/progress(). Until it
+has stopped, a new job with the same key waits and is started afterwards,
+so the same pages are never fetched twice at the same time.
+"""
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """Raised inside a job (by Job.check / Job.progress) once it was cancelled."""
+
+
+class Job:
+    def __init__(self, runner, key):
+        self.runner = runner
+        self.key = key
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def check(self):
+        """Raises JobCancelled if the job was cancelled; call it between steps."""
+        if self.cancelled.is_set():
+            raise JobCancelled(self.key)
+
+    def progress(self, *args):
+        """Reports progress to the job's on_progress callback (on the main thread)."""
+        self.check()
+        self.runner._post(self, "progress", args)
+
+
+class JobRunner:
+    POLL_MS = 50
+
+    def __init__(self, root, max_workers=4):
+        self.root = root
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.queue = queue.Queue()
+        self.jobs = {}  # key -> (job, on_done, on_error, on_progress); only used on the main thread
+        self.waiting = {}  # key -> (job, func, on_done, on_error, on_progress) until the cancelled job stopped
+        self.root.after(self.POLL_MS, self._poll)
+
+    def submit(self, key, func, on_done=None, on_error=None, on_progress=None):
+        """Runs func(job) in the background and returns the Job.
+
+        If a job with the same key is still running, nothing new is started
+        and the running job is returned instead. If it was cancelled but has
+        not stopped yet, the new job starts once it has. on_done(result),
+        on_error(exception) and on_progress(*args) are called on the main thread.
+        """
+        running = self.jobs.get(key)
+        if running and not running[0].cancelled.is_set():
+            return running[0]
+        job = Job(self, key)
+        if running:
+            self.waiting[key] = (job, func, on_done, on_error, on_progress)  # Replaces an older waiting job
+        else:
+            self._start(job, func, on_done, on_error, on_progress)
+        return job
+
+    def _start(self, job, func, on_done, on_error, on_progress):
+        self.jobs[job.key] = (job, on_done, on_error, on_progress)
+        self.pool.submit(self._run, job, func)
+
+    def is_running(self, key):
+        """True if a job with the key is running (and not cancelled) or waiting to start."""
+        entry = self.jobs.get(key)
+        return key in self.waiting or (entry is not None and not entry[0].cancelled.is_set())
+
+    def cancel(self, key=None):
+        """Cancels the job with the given key, or all jobs if key is None.
+
+        Callbacks of a cancelled job are not called any more. Its entry is
+        kept until the job has actually stopped.
+        """
+        keys = list(self.jobs) + list(self.waiting) if key is None else [key]
+        for k in keys:
+            self.waiting.pop(k, None)
+            entry = self.jobs.get(k)
+            if entry:
+                entry[0].cancel()
+
+    def _run(self, job, func):
+        try:
+            self._post(job, "done", func(job))
+        except JobCancelled:
+            self._post(job, "cancelled", None)
+        except Exception as e:
+            self._post(job, "error", e)
+
+    def _post(self, job, kind, payload):
+        self.queue.put((job, kind, payload))
+
+    def _poll(self):
+        try:
+            while True:
+                job, kind, payload = self.queue.get_nowait()
+                try:
+                    self._dispatch(job, kind, payload)
+                except Exception:
+                    self.root.report_callback_exception(*sys.exc_info())
+        except queue.Empty:
+            pass
+        self.root.after(self.POLL_MS, self._poll)
+
+    def _dispatch(self, job, kind, payload):
+        entry = self.jobs.get(job.key)
+        if entry is None or entry[0] is not job:
+            return
+        _, on_done, on_error, on_progress = entry
+        if kind == "progress":
+            if on_progress and not job.cancelled.is_set():
+                on_progress(*payload)
+            return
+        # The job has stopped: start the one waiting for it
+        del self.jobs[job.key]
+        waiting = self.waiting.pop(job.key, None)
+        if waiting:
+            self._start(*waiting)
+        if job.cancelled.is_set():
+            return
+        if kind == "done":
+            if on_done:
+                on_done(payload)
+        elif on_error:
+            on_error(payload)
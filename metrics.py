@@ -0,0 +1,254 @@
+"""Counters and timing histograms for finding out where the time goes.
+
+Off by default. While disabled, inc()/observe() return at once and timer()
+returns a shared do-nothing context manager, so the instrumented code paths
+cost one function call and a flag check. Enable with enable() or by setting
+GITHUB_TRACKER_METRICS=1.
+
+Metrics have a name and optional labels, e.g.
+    metrics.inc("http_responses_total", status="304")
+    with metrics.timer("http_request_seconds", method="GET"):
+        ...
+
+snapshot() returns everything as a dict (also what the Diagnostics window
+shows), prometheus_text() the Prometheus text format and dump(path) writes
+either (.json or Prometheus text) for headless runs.
+
+profiled(name) runs a block under cProfile and saves the stats as
+{name}-{time}.prof in the directory given by set_profile_dir() or
+GITHUB_TRACKER_PROFILE (view with python -m pstats or snakeviz). Only one
+block is profiled at a time; others running meanwhile are not profiled.
+"""
+import itertools
+import json
+import os
+import re
+import threading
+import time
+
+ENABLED = bool(os.environ.get("GITHUB_TRACKER_METRICS"))
+PREFIX = "github_tracker_"
+# Upper bounds of the histogram buckets in seconds (the last bucket is +Inf)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_histograms = {}  # (name, labels) -> Histogram
+_profile_dir = os.environ.get("GITHUB_TRACKER_PROFILE") or None
+_profile_lock = threading.Lock()
+_profile_seq = itertools.count(1)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        index = 0
+        while index < len(BUCKETS) and value > BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the maximum for the last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = bool(on)
+
+
+def _key(name, labels):
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.add(seconds)
+
+
+def timer(name, **labels):
+    """Context manager that adds the duration of the block to the histogram name."""
+    if not ENABLED:
+        return _NULL
+    return _Timer(name, labels)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _label_text(labels):
+    return ",".join(f"{key}={value}" for key, value in labels)
+
+
+def snapshot():
+    """Returns {"counters": [...], "histograms": [...]}, sorted by name and labels."""
+    with _lock:
+        counters = [{"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(_counters.items())]
+        histograms = [{"name": name, "labels": dict(labels), "count": h.count, "sum": h.sum, "max": h.max,
+                       "p50": h.quantile(0.5), "p99": h.quantile(0.99),
+                       "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], h.counts))}
+                      for (name, labels), h in sorted(_histograms.items())]
+    return {"counters": counters, "histograms": histograms}
+
+
+def rows():
+    """Flat rows (metric, labels, count, total, p50, p99) for displaying the snapshot."""
+    data = snapshot()
+    result = [(c["name"], _label_text(c["labels"].items()), c["value"], "", "", "") for c in data["counters"]]
+    result += [(h["name"], _label_text(h["labels"].items()), h["count"], h["sum"], h["p50"], h["p99"])
+               for h in data["histograms"]]
+    return sorted(result, key=lambda row: (row[0], row[1]))
+
+
+def _prom_name(name):
+    return PREFIX + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _prom_labels(labels, extra=()):
+    items = list(labels.items()) + list(extra)
+    if not items:
+        return ""
+    escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in items) + "}"
+
+
+def prometheus_text():
+    """The current metrics in the Prometheus text exposition format."""
+    data = snapshot()
+    lines = []
+    typed = set()
+    for c in data["counters"]:
+        name = _prom_name(c["name"])
+        if name not in typed:
+            lines.append(f"# TYPE {name} counter")
+            typed.add(name)
+        lines.append(f"{name}{_prom_labels(c['labels'])} {c['value']}")
+    for h in data["histograms"]:
+        name = _prom_name(h["name"])
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        cumulative = 0
+        for bound, count in h["buckets"].items():
+            cumulative += count
+            lines.append(f"{name}_bucket{_prom_labels(h['labels'], [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_sum{_prom_labels(h['labels'])} {h['sum']}")
+        lines.append(f"{name}_count{_prom_labels(h['labels'])} {h['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(path):
+    """Writes the metrics to path: JSON for *.json, Prometheus text otherwise."""
+    if path.lower().endswith(".json"):
+        text = json.dumps(dict(snapshot(), time=time.time()), indent=1)
+    else:
+        text = prometheus_text()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)  # A scraper never sees a half written file
+
+
+# --- profiling ---
+
+def set_profile_dir(path):
+    """Saves cProfile stats of every profiled() block to path (None: profiling off)."""
+    global _profile_dir
+    if path:
+        os.makedirs(path, exist_ok=True)
+    _profile_dir = path or None
+
+
+def get_profile_dir():
+    return _profile_dir
+
+
+class _Profiled:
+    def __init__(self, name, directory):
+        self.name = name
+        self.directory = directory
+        self.profile = None
+
+    def __enter__(self):
+        if _profile_lock.acquire(blocking=False):
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile is None:
+            return False
+        self.profile.disable()
+        _profile_lock.release()
+        name = re.sub(r"[^a-zA-Z0-9_.-]", "_", self.name)
+        os.makedirs(self.directory, exist_ok=True)
+        self.profile.dump_stats(os.path.join(self.directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{next(_profile_seq)}.prof"))
+        return False
+
+
+def profiled(name):
+    """Context manager that profiles the block if a profile directory is set."""
+    if _profile_dir is None:
+        return _NULL
+    return _Profiled(name, _profile_dir)
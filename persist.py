@@ -0,0 +1,348 @@
+"""Write-behind persistence for the GUI: saves never block the Tk thread.
+
+WriteBehindStore wraps a storage.SQLiteStore. Write calls only queue the
+operation and return; a single writer thread waits DEBOUNCE_SECONDS after
+the first queued write, merges what arrived meanwhile (user details of
+several saves become one upsert, repeated metadata/last update writes keep
+the last value) and commits everything in one transaction.
+
+SQLite already makes each commit atomic (WAL, the database is never left
+half written). Writes that are queued but not yet committed are covered
+by an optional append-only journal: the writer thread appends every write
+as one numbered JSON line as soon as it wakes up, with one fsync for all
+writes that arrived meanwhile (group commit), long before the debounced
+database commit. The caller only appends to an in-memory list. The journal
+is cleared once the writer has committed everything, and writes still in
+it at the next start are applied again before anything is read. The number
+of the last committed write is stored in the same transaction, so nothing
+is applied twice.
+
+Reads never wait for the writer: they use a second connection to the
+database (WAL lets it read while the writer commits) and lay the writes
+that are not committed yet over the result, for the reads the GUI depends
+on (sets, accounts, user details, metadata, usernames). Other reads, like
+the change log, see the committed data only. Errors of the writer are only
+reported by take_error().
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import metrics
+import storage
+
+DEBOUNCE_SECONDS = 0.5
+JOURNAL_FILE = "github_tracker_journal.jsonl"
+RETRY_SECONDS = 2  # First retry after a failed commit, doubled up to 60 s
+
+
+class WriteBehindStore:
+    """Same interface as storage.SQLiteStore; writes are applied asynchronously."""
+
+    WRITES = ("apply_diff", "add_first_seen", "set_last_update", "upsert_many_user_details", "set_metadata")
+
+    def __init__(self, store, journal_path=None, debounce=DEBOUNCE_SECONDS):
+        self.store = store
+        self.debounce = debounce
+        self.journal_path = journal_path
+        self.pending = []  # [(seq, method, args)] not yet committed
+        self.busy = False  # The writer holds a batch that is not committed yet
+        self.inflight = []  # That batch, still laid over reads until it is committed
+        self.error = None  # Last commit error (the writes are retried)
+        self.closed = False
+        self.flushing = 0  # Threads waiting in flush(): skip the debounce
+        self.cond = threading.Condition()
+        self.stats = {"writes": 0, "commits": 0}
+        self._journal = None
+        self._unjournaled = []  # Queued writes the writer has not appended to the journal yet
+        self.seq = int(store.get_metadata("journal_seq", 0))  # Number of the last queued write
+        # An in-memory database cannot be opened twice: read through the store itself
+        self.reader = store if store.path == ":memory:" else storage.SQLiteStore(store.path)
+        if journal_path:
+            self._recover()
+            self._journal = open(journal_path, "a", encoding="utf-8")
+        self.thread = threading.Thread(target=self._run, name="store-writer", daemon=True)
+        self.thread.start()
+
+    # --- journal ---
+
+    def _recover(self):
+        """Applies the writes left in the journal by a previous run that did not finish them."""
+        if not os.path.exists(self.journal_path):
+            return
+        ops = []
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    seq, method, args = json.loads(line)
+                except ValueError:
+                    break  # Cut off by the crash
+                if method in self.WRITES and seq > self.seq:
+                    ops.append((seq, method, args))
+        if ops:
+            with self.store.batch():
+                for seq, method, args in ops:
+                    getattr(self.store, method)(*args)
+                self.seq = ops[-1][0]
+                self.store.set_metadata("journal_seq", self.seq)
+        os.remove(self.journal_path)
+
+    def _write_journal(self):
+        """Appends the writes queued since the last call, with one fsync (writer thread only)."""
+        with self.cond:
+            ops, self._unjournaled = self._unjournaled, []
+        if not ops:
+            return
+        try:
+            # Sets (the logins of apply_diff) are written as sorted lists
+            self._journal.write("".join(json.dumps([seq, method, args], default=sorted) + "\n"
+                                        for seq, method, args in ops))
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        except OSError as e:
+            with self.cond:
+                self.error = e  # The writes are still committed to the database
+
+    # --- writes (called from any thread) ---
+
+    def _queue(self, method, *args):
+        with self.cond:
+            if self.closed:
+                raise sqlite3.ProgrammingError("Store is closed")
+            self.seq += 1
+            self.pending.append((self.seq, method, args))
+            if self._journal:
+                self._unjournaled.append(self.pending[-1])
+            self.stats["writes"] += 1
+            metrics.inc("store_writes_total", method=method)
+            self.cond.notify_all()
+
+    def replace_set(self, username, category, logins, old_logins=None, record_changes=True):
+        """Like SQLiteStore.replace_set; the difference is computed now (it is returned), written later."""
+        if old_logins is None:
+            old_logins = self.get_set(username, category)
+        logins = set(logins)
+        added = logins.difference(old_logins)
+        removed = set(old_logins).difference(logins)
+        if added or removed:
+            # Frozen copies: the caller may change the returned sets; sorting is left to the writer
+            self._queue("apply_diff", username, category, frozenset(added), frozenset(removed),
+                        record_changes, int(time.time()))
+        return added, removed
+
+    def add_first_seen(self, username, category, timestamps):
+        if timestamps:
+            self._queue("add_first_seen", username, category, dict(timestamps))
+
+    def set_last_update(self, username, category, ts):
+        self._queue("set_last_update", username, category, ts)
+
+    def upsert_user_details(self, login, details):
+        self.upsert_many_user_details({login: details})
+
+    def upsert_many_user_details(self, details_by_login):
+        if details_by_login:
+            self._queue("upsert_many_user_details", {login: dict(d) for login, d in details_by_login.items()})
+
+    def set_metadata(self, key, value):
+        self._queue("set_metadata", key, value)
+
+    # --- writer thread ---
+
+    @staticmethod
+    def _coalesce(ops):
+        """Merges a batch of writes: one details upsert, last value per metadata/last update key."""
+        merged = []
+        details = {}
+        latest = {}  # (method, key...) -> index in merged
+        for seq, method, args in ops:
+            if method == "upsert_many_user_details":
+                details.update(args[0])
+                continue
+            if method in ("set_metadata", "set_last_update"):
+                key = (method,) + tuple(args[:-1])
+                if key in latest:
+                    merged[latest[key]] = (method, args)
+                    continue
+                latest[key] = len(merged)
+            merged.append((method, args))
+        if details:
+            merged.append(("upsert_many_user_details", (details,)))
+        return merged
+
+    def _run(self):
+        delay = RETRY_SECONDS
+        while True:
+            with self.cond:
+                while not self.pending and not self.closed:
+                    self.cond.wait()
+                if not self.pending:
+                    return  # Closed and everything written
+            deadline = time.monotonic() + self.debounce
+            while True:  # Let a burst of saves arrive, journaling them as they come
+                if self._journal:
+                    self._write_journal()
+                with self.cond:
+                    remaining = deadline - time.monotonic()
+                    if self.closed or self.flushing or remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+            with self.cond:
+                batch, self.pending = self.pending, []
+                self.inflight = batch
+                self.busy = True
+            if self._journal:
+                self._write_journal()  # What arrived since the last wakeup
+            try:
+                with metrics.profiled("store-commit"), self.store.batch():
+                    for method, args in self._coalesce(batch):
+                        getattr(self.store, method)(*args)
+                    self.store.set_metadata("journal_seq", batch[-1][0])
+            except sqlite3.Error as e:
+                with self.cond:
+                    self.pending[:0] = batch  # Keep the order, retry later
+                    self.inflight = []
+                    self.busy = False
+                    self.error = e
+                    self.cond.notify_all()
+                    closed = self.closed
+                    if not closed:
+                        self.cond.wait(delay)
+                if closed:
+                    if self._journal:
+                        self._write_journal()
+                    return  # Left in the journal for the next start
+                delay = min(delay * 2, 60)
+                continue
+            delay = RETRY_SECONDS
+            with self.cond:
+                self.inflight = []
+                self.busy = False
+                self.error = None
+                self.stats["commits"] += 1
+                metrics.inc("store_commits_total")
+                if not self.pending and self._journal:
+                    self._unjournaled = []  # Committed before they were journaled
+                    self._journal.truncate(0)  # Everything in it is committed
+                    self._journal.seek(0)
+                self.cond.notify_all()
+
+    # --- reads (never wait for the writer) ---
+
+    def _read(self, read, overlay):
+        """Returns read(reader) with overlay(value, ops) applied for the writes not committed yet."""
+        while True:
+            with self.cond:
+                commits = self.stats["commits"]
+                ops = self.inflight + self.pending
+            value = read(self.reader)
+            for seq, method, args in ops:
+                overlay(value, method, args)  # Writes are idempotent: laying over committed ones is harmless
+            with self.cond:
+                if self.stats["commits"] == commits:
+                    return value
+            # A commit happened meanwhile: the read may mix old and new data, read again
+
+    def get_set(self, username, category):
+        def overlay(logins, method, args):
+            if method == "apply_diff" and args[:2] == (username, category):
+                logins.update(args[2])
+                logins.difference_update(args[3])
+        return self._read(lambda r: r.get_set(username, category), overlay)
+
+    def load_account(self, username):
+        def overlay(account, method, args):
+            if method == "upsert_many_user_details" or method == "set_metadata" or args[0] != username:
+                return
+            category = args[1]
+            if method == "apply_diff":
+                logins = account.setdefault(category, set())
+                logins.update(args[2])
+                logins.difference_update(args[3])
+            elif method == "add_first_seen":
+                timestamps = account.setdefault(category, {})
+                for login, ts in args[2].items():
+                    timestamps.setdefault(login, ts)
+            elif method == "set_last_update":
+                account.setdefault("last_update", {})[category] = args[2]
+                account.setdefault(category, set())
+        return self._read(lambda r: r.load_account(username), overlay)
+
+    def usernames(self):
+        def overlay(names, method, args):
+            if method in ("apply_diff", "add_first_seen", "set_last_update") and args[0] not in names:
+                names.append(args[0])
+        return sorted(self._read(lambda r: r.usernames(), overlay))
+
+    def get_metadata(self, key, default=None):
+        def overlay(value, method, args):
+            if method == "set_metadata" and args[0] == key:
+                value[0] = None if args[1] is None else str(args[1])  # The column is TEXT
+        return self._read(lambda r: [r.get_metadata(key, default)], overlay)[0]
+
+    def load_all_user_details(self):
+        def overlay(details, method, args):
+            if method == "upsert_many_user_details":
+                details.update(args[0])
+        return self._read(lambda r: r.load_all_user_details(), overlay)
+
+    def get_many_user_details(self, logins):
+        logins = set(logins)
+
+        def overlay(details, method, args):
+            if method == "upsert_many_user_details":
+                details.update((login, d) for login, d in args[0].items() if login in logins)
+        return self._read(lambda r: r.get_many_user_details(logins), overlay)
+
+    def get_user_details(self, login):
+        return self.get_many_user_details([login]).get(login)
+
+    # --- control ---
+
+    def flush(self, timeout=None):
+        """Waits until all queued writes are committed; False if the timeout passed first.
+
+        While the writer is failing it keeps waiting for a successful retry
+        (the error itself is reported by take_error()).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            self.flushing += 1
+            self.cond.notify_all()
+            try:
+                while self.pending or self.busy:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self.cond.wait(remaining)
+            finally:
+                self.flushing -= 1
+        return True
+
+    def take_error(self):
+        """Returns (and clears) the last commit error, for showing it to the user."""
+        with self.cond:
+            error, self.error = self.error, None
+        return error
+
+    def close(self):
+        """Writes everything still queued and closes the store."""
+        with self.cond:
+            if self.closed:
+                return
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join()
+        if self._journal:
+            self._journal.close()
+            if not self.pending and os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+        if self.reader is not self.store:
+            self.reader.close()
+        self.store.close()
+
+    def __getattr__(self, name):
+        # Other reads (change log, exports, ...) see the committed data only
+        return getattr(self.reader, name)
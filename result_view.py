@@ -0,0 +1,199 @@
+"""Virtualized result list on top of ttk.Treeview.
+
+The full list of rows lives in a Python list (the model). The Treeview only
+ever holds as many items as fit on screen; scrolling re-fills these items
+with the rows of the new window instead of inserting/deleting items. Showing
+or scrolling a list of 100k rows therefore costs the same as a list of 30.
+
+Sorting works on the model as well: every column can have a key function
+that turns a cell into a typed sort key (computed once per column and
+data set), and the resulting order is cached per column and direction.
+"""
+import tkinter as tk
+from tkinter import ttk
+
+import metrics
+
+
+class VirtualTreeview:
+    """A Treeview plus scrollbar that displays rows of a Python-side model.
+
+    rows are (values, tags) tuples. The Treeview itself is available as
+    .tree for headings, column setup, tag configuration and event bindings.
+    sort_keys maps a column name to a function cell value -> sort key;
+    columns without one are sorted by their casefolded text.
+    """
+
+    def __init__(self, parent, columns, height=15, sort_keys=None):
+        self.columns = tuple(columns)
+        self.sort_keys = dict(sort_keys or {})
+        self.rows = []
+        self.order = None  # Display order as list of model indices, None = model order
+        self.offset = 0  # Display index of the first visible row
+        self.selected_index = None  # Display index of the selected row
+        self._key_cache = {}  # column -> list of sort keys, one per model row
+        self._order_cache = {}  # (column, reverse) -> order
+        self.tree = ttk.Treeview(parent, columns=columns, show="headings", height=height)
+        self.scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.yview)
+        self._slots = []  # Item ids of the Treeview, top to bottom
+
+        self.tree.bind("<Configure>", lambda event: self.refresh())
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self._scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda event: self._scroll_by(3))
+        self.tree.bind("<Up>", lambda event: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda event: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda event: self._move_selection(-self.visible_count()))
+        self.tree.bind("<Next>", lambda event: self._move_selection(self.visible_count()))
+        self.tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+
+    def pack(self, **kwargs):
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, **kwargs)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    # --- model ---
+
+    def set_rows(self, rows):
+        """Replaces the model; only the first screen of rows is materialized."""
+        with metrics.timer("ui_populate_seconds"):
+            self.rows = rows if isinstance(rows, list) else list(rows)
+            self.order = None
+            self._key_cache = {}
+            self._order_cache = {}
+            self.offset = 0
+            self.selected_index = None
+            self.refresh()
+
+    def row_at(self, index):
+        """Returns the row at a display position."""
+        if self.order is not None:
+            index = self.order[index]
+        return self.rows[index]
+
+    def _window(self, start, end):
+        if self.order is None:
+            return self.rows[start:end]
+        rows = self.rows
+        return [rows[i] for i in self.order[start:end]]
+
+    # --- sorting ---
+
+    def _keys(self, col):
+        keys = self._key_cache.get(col)
+        if keys is None:
+            col_index = self.columns.index(col)
+            key_func = self.sort_keys.get(col, lambda value: str(value).casefold())
+            keys = [key_func(values[col_index]) for values, tags in self.rows]
+            self._key_cache[col] = keys
+        return keys
+
+    def sort(self, col, reverse=False):
+        """Shows the rows ordered by col. The selected row stays selected."""
+        key = (col, reverse)
+        order = self._order_cache.get(key)
+        if order is None:
+            with metrics.timer("ui_sort_seconds"):
+                keys = self._keys(col)
+                order = sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+            self._order_cache[key] = order
+        selected_row = None
+        if self.selected_index is not None:
+            selected_row = self.order[self.selected_index] if self.order is not None else self.selected_index
+        self.order = order
+        if selected_row is not None:
+            self.selected_index = order.index(selected_row)
+        self.refresh()
+
+    # --- window ---
+
+    def visible_count(self):
+        height = self.tree.winfo_height()
+        if height <= 1:  # Not mapped yet
+            return int(self.tree.cget("height"))
+        top, rowheight = 25, 20
+        if self._slots:
+            box = self.tree.bbox(self._slots[0])
+            if box:
+                top, rowheight = box[1], box[3]
+        return max(1, (height - top) // max(rowheight, 1))
+
+    def refresh(self):
+        """Fills the Treeview items with the rows of the current window."""
+        total = len(self.rows)
+        count = min(self.visible_count(), total)
+        self.offset = max(0, min(self.offset, total - count))
+        # Add or remove items so that exactly one item per visible row exists
+        while len(self._slots) < count:
+            self._slots.append(self.tree.insert("", tk.END))
+        if len(self._slots) > count:
+            self.tree.delete(*self._slots[count:])
+            del self._slots[count:]
+        for slot, (values, tags) in zip(self._slots, self._window(self.offset, self.offset + count)):
+            self.tree.item(slot, values=values, tags=tags)
+        self._sync_selection()
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + count) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll_to(self, offset):
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+
+    def _scroll_by(self, rows):
+        self.scroll_to(self.offset + rows)
+        return "break"
+
+    def yview(self, *args):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", n, "units"/"pages")."""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2].startswith("page"):
+                step *= self.visible_count()
+            self._scroll_by(step)
+
+    def _on_mousewheel(self, event):
+        # Windows reports multiples of 120, macOS small deltas
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_by(-3 * delta)
+
+    # --- selection ---
+
+    def _sync_selection(self):
+        index = self.selected_index
+        slot = None
+        if index is not None and self.offset <= index < self.offset + len(self._slots):
+            slot = self._slots[index - self.offset]
+        current = self.tree.selection()
+        wanted = (slot,) if slot else ()
+        if tuple(current) != wanted:
+            self.tree.selection_set(wanted)
+        if slot:
+            self.tree.focus(slot)
+
+    def _on_select(self, event):
+        selected = self.tree.selection()
+        if selected and selected[0] in self._slots:
+            self.selected_index = self.offset + self._slots.index(selected[0])
+
+    def _move_selection(self, step):
+        if not self.rows:
+            return "break"
+        if self.selected_index is None:
+            index = self.offset
+        else:
+            index = max(0, min(len(self.rows) - 1, self.selected_index + step))
+        count = len(self._slots) or 1
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + count:
+            self.offset = index - count + 1
+        self.selected_index = index
+        self.refresh()
+        self.tree.event_generate("<<TreeviewSelect>>")
+        return "break"
@@ -0,0 +1,179 @@
+"""Community score of the cached users, computed in bulk.
+
+The score is a weighted sum of a user's followers, public repos and gists,
+account age in years and a site admin bonus. ScoreEngine keeps these inputs
+of all cached users as columns (one array per input, NumPy if installed)
+and computes scores for everyone at once:
+
+- update() only re-parses the users whose inputs changed; the age-free part
+  of the score is recomputed for those rows only
+- the age part is added at query time, so scores never go stale
+- weight profiles are plain dicts in PROFILES (add your own)
+- the ranking of all users is cached per profile and day and answers top-K
+  and percentile queries, also restricted to a list of logins
+"""
+import heapq
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+YEAR_SECONDS = 365.25 * 86400
+FEATURES = ("followers", "public_repos", "public_gists", "site_admin")
+
+# Einfache Score-Logik: Gewichtung kann angepasst werden
+PROFILES = {
+    "default": {"followers": 2, "public_repos": 1.5, "public_gists": 1, "years": 2, "site_admin": 20},
+    "builders": {"followers": 0.5, "public_repos": 4, "public_gists": 2, "years": 1, "site_admin": 0},
+    "influence": {"followers": 5, "public_repos": 0.5, "public_gists": 0, "years": 1, "site_admin": 0},
+}
+
+
+def _number(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):  # "-" for unknown values
+        return 0.0
+
+
+def _epoch(created_at):
+    """Account creation time as epoch seconds, 0 if unknown."""
+    try:
+        return datetime.fromisoformat(created_at.replace("Z", "+00:00")).timestamp() if created_at else 0.0
+    except (AttributeError, ValueError):
+        return 0.0
+
+
+def inputs_of(details):
+    """The score inputs of one user: (followers, public_repos, public_gists, site_admin, created)."""
+    return (_number(details.get("followers")), _number(details.get("public_repos")),
+            _number(details.get("public_gists")), 1.0 if details.get("site_admin") else 0.0,
+            _epoch(details.get("created_at", "")))
+
+
+def score_inputs(inputs, profile="default", now=None):
+    weights = PROFILES[profile]
+    *features, created = inputs
+    years = ((now or datetime.now().timestamp()) - created) / YEAR_SECONDS if created else 0
+    return int(sum(weights[name] * value for name, value in zip(FEATURES, features)) + weights["years"] * years)
+
+
+def score_details(details, profile="default", now=None):
+    """Score of a single user (details as fetched by enrich.py)."""
+    return score_inputs(inputs_of(details), profile, now)
+
+
+class ScoreEngine:
+    """Scores of all cached users as columns, recomputed incrementally."""
+
+    def __init__(self):
+        self.logins = []
+        self.rows = {}  # login -> row
+        self.columns = {name: array("d") for name in FEATURES + ("created",)}
+        self._base = {}  # profile -> array of the age-free part of the score per row
+        self._stale = {}  # profile -> rows whose base must be recomputed
+        self._ranking = {}  # (profile, day) -> result of ranking()
+
+    def __len__(self):
+        return len(self.logins)
+
+    def update(self, details_by_login):
+        """Takes new/changed user details ({login: details}). Returns the number of changed rows."""
+        changed = 0
+        names = FEATURES + ("created",)
+        for login, details in details_by_login.items():
+            inputs = inputs_of(details)
+            row = self.rows.get(login)
+            if row is None:
+                row = self.rows[login] = len(self.logins)
+                self.logins.append(login)
+                for name, value in zip(names, inputs):
+                    self.columns[name].append(value)
+            elif all(self.columns[name][row] == value for name, value in zip(names, inputs)):
+                continue
+            else:
+                for name, value in zip(names, inputs):
+                    self.columns[name][row] = value
+            for stale in self._stale.values():
+                stale.add(row)
+            changed += 1
+        if changed:
+            self._ranking.clear()
+        return changed
+
+    def _base_scores(self, profile):
+        weights = PROFILES[profile]
+        base = self._base.get(profile)
+        if base is None:
+            base = self._base[profile] = array("d")
+            self._stale[profile] = set(range(len(self.logins)))
+        base.extend([0.0] * (len(self.logins) - len(base)))
+        stale = self._stale[profile]
+        if np is not None and len(stale) * 4 > len(base):
+            # Many changed rows: recompute the whole column vectorized
+            total = sum(weights[name] * np.array(self.columns[name], dtype=np.float64) for name in FEATURES)
+            base[:] = array("d", total.tobytes())
+        else:
+            for row in stale:
+                base[row] = sum(weights[name] * self.columns[name][row] for name in FEATURES)
+        stale.clear()
+        return base
+
+    def _age_score(self, profile, created, now):
+        return (now - created) * PROFILES[profile]["years"] / YEAR_SECONDS if created else 0.0
+
+    def scores(self, profile="default", now=None):
+        """Scores of all rows (order of .logins) as floats."""
+        base = self._base_scores(profile)
+        weight = PROFILES[profile]["years"] / YEAR_SECONDS
+        now = now or datetime.now().timestamp()
+        if np is not None:
+            created = np.array(self.columns["created"], dtype=np.float64)
+            return np.array(base, dtype=np.float64) + np.where(created > 0, (now - created) * weight, 0.0)
+        return [b + ((now - c) * weight if c else 0.0) for b, c in zip(base, self.columns["created"])]
+
+    def score(self, login, profile="default", now=None):
+        row = self.rows.get(login)
+        if row is None:
+            return None
+        now = now or datetime.now().timestamp()
+        return int(self._base_scores(profile)[row] + self._age_score(profile, self.columns["created"][row], now))
+
+    def ranking(self, profile="default"):
+        """(rows by score descending, scores ascending, scores by row, time of the scores), cached per profile and day."""
+        day = datetime.now().date()
+        ranking = self._ranking.get((profile, day))
+        if ranking is None:
+            now = datetime.now().timestamp()
+            scores = self.scores(profile, now)
+            if np is not None:
+                ascending = np.argsort(scores, kind="stable")
+                ranking = (ascending[::-1], scores[ascending], scores, now)
+            else:
+                ascending = sorted(range(len(scores)), key=scores.__getitem__)
+                ranking = (ascending[::-1], [scores[row] for row in ascending], scores, now)
+            self._ranking = {key: value for key, value in self._ranking.items() if key[1] == day}
+            self._ranking[(profile, day)] = ranking
+        return ranking
+
+    def top_k(self, k=10, logins=None, profile="default"):
+        """The k best users as [(login, score)], of all cached users or only of logins."""
+        order, ascending, scores, now = self.ranking(profile)
+        if logins is None:
+            rows = [int(row) for row in order[:k]]
+        else:
+            rows = heapq.nlargest(k, (self.rows[login] for login in logins if login in self.rows),
+                                  key=scores.__getitem__)
+        return [(self.logins[row], self.score(self.logins[row], profile, now)) for row in rows]
+
+    def percentile(self, login, profile="default"):
+        """Share of cached users (in percent) scoring at most as high as login, or None if unknown."""
+        row = self.rows.get(login)
+        if row is None:
+            return None
+        order, ascending, scores, now = self.ranking(profile)
+        return 100.0 * bisect_right(ascending, scores[row]) / len(ascending)
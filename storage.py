@@ -0,0 +1,408 @@
+"""SQLite storage backend for the tracker data.
+
+Replaces the single github_tracker_data.json file. Every tracked account,
+follow edge, first-seen timestamp and cached user detail is a row, so an
+update only touches the rows that changed instead of rewriting everything.
+
+Tables:
+    metadata     (key, value)                        e.g. last_username
+    accounts     (id, username)
+    edges        (account_id, category, login)       followers / following / ...
+    first_seen   (account_id, category, login, ts)   category is follower_timestamps / following_timestamps
+    last_update  (account_id, category, ts)
+    user_details (login, data, updated_at)           data is the JSON of the details dict
+    events       (account_id, category, login, delta, ts)
+                 append-only change log: delta is +1 (added) or -1 (removed), ts epoch seconds
+"""
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import metrics
+
+DB_FILE = "github_tracker_data.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS edges (
+    account_id INTEGER NOT NULL REFERENCES accounts(id),
+    category TEXT NOT NULL,
+    login TEXT NOT NULL,
+    PRIMARY KEY (account_id, category, login)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS edges_login ON edges (login);
+CREATE TABLE IF NOT EXISTS first_seen (
+    account_id INTEGER NOT NULL REFERENCES accounts(id),
+    category TEXT NOT NULL,
+    login TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    PRIMARY KEY (account_id, category, login)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS last_update (
+    account_id INTEGER NOT NULL REFERENCES accounts(id),
+    category TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    PRIMARY KEY (account_id, category)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    account_id INTEGER NOT NULL REFERENCES accounts(id),
+    category TEXT NOT NULL,
+    login TEXT NOT NULL,
+    delta INTEGER NOT NULL,
+    ts INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_time ON events (account_id, category, ts);
+CREATE TABLE IF NOT EXISTS user_details (
+    login TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+TIMESTAMP_CATEGORIES = ("follower_timestamps", "following_timestamps")
+QUERY_CHUNK = 500  # Logins per "IN (...)" query; SQLite limits the number of parameters
+
+
+class SQLiteStore:
+    """Thread-safe wrapper around one SQLite connection.
+
+    All writes run inside a transaction; callers pass only what changed.
+    """
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._account_ids = {}
+        self._batch_depth = 0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # --- helpers ---
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # Inside batch() the outer transaction commits
+        if self._batch_depth:
+            yield
+        else:
+            with metrics.timer("store_transaction_seconds"), self.conn:
+                yield
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Runs all writes inside the with block in one transaction (a single commit)."""
+        with self.lock:
+            self._batch_depth += 1
+            try:
+                with metrics.timer("store_transaction_seconds"), self.conn:
+                    yield self
+            finally:
+                self._batch_depth -= 1
+
+    def _account_id(self, username):
+        account_id = self._account_ids.get(username)
+        if account_id is None:
+            self.conn.execute("INSERT OR IGNORE INTO accounts (username) VALUES (?)", (username,))
+            account_id = self.conn.execute(
+                "SELECT id FROM accounts WHERE username = ?", (username,)).fetchone()[0]
+            self._account_ids[username] = account_id
+        return account_id
+
+    def is_empty(self):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT EXISTS (SELECT 1 FROM accounts) OR EXISTS (SELECT 1 FROM user_details)").fetchone()
+            return not row[0]
+
+    # --- metadata ---
+
+    def get_metadata(self, key, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM metadata WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_metadata(self, key, value):
+        with self.lock, self._transaction():
+            self.conn.execute(
+                "INSERT INTO metadata (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value", (key, value))
+
+    # --- follow data ---
+
+    def usernames(self):
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT username FROM accounts ORDER BY username")]
+
+    def get_set(self, username, category):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT e.login FROM edges e JOIN accounts a ON a.id = e.account_id "
+                "WHERE a.username = ? AND e.category = ?", (username, category))
+            return {row[0] for row in rows}
+
+    def replace_set(self, username, category, logins, old_logins=None, record_changes=True):
+        """Makes the stored set equal to logins, writing only the difference.
+
+        old_logins is what the store currently holds, if the caller knows it;
+        otherwise it is read from the database. With record_changes the
+        added/removed logins are appended to the change log in the same
+        transaction (turn it off for the very first snapshot of a category).
+        Returns (added, removed).
+        """
+        logins = set(logins)
+        with self.lock:
+            if old_logins is None:
+                old_logins = self.get_set(username, category)
+            added = logins.difference(old_logins)
+            removed = set(old_logins).difference(logins)
+            self.apply_diff(username, category, added, removed, record_changes)
+            return added, removed
+
+    def apply_diff(self, username, category, added, removed, record_changes=True, ts=None):
+        """Adds/removes logins of a stored set (and logs them with record_changes, at epoch time ts)."""
+        if not added and not removed:
+            return
+        with self.lock, self._transaction():
+            account_id = self._account_id(username)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO edges (account_id, category, login) VALUES (?, ?, ?)",
+                ((account_id, category, login) for login in added))
+            self.conn.executemany(
+                "DELETE FROM edges WHERE account_id = ? AND category = ? AND login = ?",
+                ((account_id, category, login) for login in removed))
+            if record_changes:
+                now = int(ts or time.time())
+                self.conn.executemany(
+                    "INSERT INTO events (account_id, category, login, delta, ts) VALUES (?, ?, ?, ?, ?)",
+                    [(account_id, category, login, 1, now) for login in added]
+                    + [(account_id, category, login, -1, now) for login in removed])
+
+    # --- change log ---
+
+    def changes_since(self, username, category, since=0, delta=None):
+        """Returns [(login, delta, ts)] of the change log since epoch time since, newest first.
+
+        delta=-1 answers "who unfollowed me since X" (for category followers).
+        """
+        query = ("SELECT e.login, e.delta, e.ts FROM events e JOIN accounts a ON a.id = e.account_id "
+                 "WHERE a.username = ? AND e.category = ? AND e.ts >= ?")
+        params = [username, category, int(since)]
+        if delta is not None:
+            query += " AND e.delta = ?"
+            params.append(delta)
+        with self.lock:
+            return self.conn.execute(query + " ORDER BY e.ts DESC, e.id DESC", params).fetchall()
+
+    def net_change_per_day(self, username, category, since=0):
+        """Returns [(day, added, removed, net)] per local calendar day since epoch time since."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT date(e.ts, 'unixepoch', 'localtime') AS day, SUM(e.delta > 0), SUM(e.delta < 0), "
+                "SUM(e.delta) FROM events e JOIN accounts a ON a.id = e.account_id "
+                "WHERE a.username = ? AND e.category = ? AND e.ts >= ? GROUP BY day ORDER BY day",
+                (username, category, int(since))).fetchall()
+
+    def add_first_seen(self, username, category, timestamps):
+        """Stores first-seen timestamps ({login: ts}); existing ones are kept."""
+        if not timestamps:
+            return
+        with self.lock, self._transaction():
+            account_id = self._account_id(username)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO first_seen (account_id, category, login, ts) VALUES (?, ?, ?, ?)",
+                ((account_id, category, login, ts) for login, ts in timestamps.items()))
+
+    def set_last_update(self, username, category, ts):
+        with self.lock, self._transaction():
+            account_id = self._account_id(username)
+            self.conn.execute(
+                "INSERT INTO last_update (account_id, category, ts) VALUES (?, ?, ?) "
+                "ON CONFLICT (account_id, category) DO UPDATE SET ts = excluded.ts",
+                (account_id, category, ts))
+
+    # --- user details ---
+
+    def upsert_user_details(self, login, details):
+        self.upsert_many_user_details({login: details})
+
+    def upsert_many_user_details(self, details_by_login):
+        now = datetime.now().isoformat(sep=' ', timespec='seconds')
+        with self.lock, self._transaction():
+            self.conn.executemany(
+                "INSERT INTO user_details (login, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (login) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                ((login, json.dumps(details), now) for login, details in details_by_login.items()))
+
+    def get_user_details(self, login):
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM user_details WHERE login = ?", (login,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many_user_details(self, logins):
+        """Returns {login: details} for those of the logins that have details."""
+        logins = list(logins)
+        result = {}
+        with self.lock:
+            for start in range(0, len(logins), QUERY_CHUNK):
+                chunk = logins[start:start + QUERY_CHUNK]
+                result.update((login, json.loads(data)) for login, data in self.conn.execute(
+                    f"SELECT login, data FROM user_details WHERE login IN ({','.join('?' * len(chunk))})", chunk))
+        return result
+
+    # --- bulk load ---
+
+    def load_account(self, username):
+        """Returns the account in the in-memory format used by tracker.py."""
+        with self.lock, metrics.timer("store_load_seconds", what="account"):
+            row = self.conn.execute("SELECT id FROM accounts WHERE username = ?", (username,)).fetchone()
+            if row is None:
+                return {}
+            account_id = row[0]
+            account = {}
+            for category, login in self.conn.execute(
+                    "SELECT category, login FROM edges WHERE account_id = ?", (account_id,)):
+                account.setdefault(category, set()).add(login)
+            for category, login, ts in self.conn.execute(
+                    "SELECT category, login, ts FROM first_seen WHERE account_id = ?", (account_id,)):
+                account.setdefault(category, {})[login] = ts
+            for category, ts in self.conn.execute(
+                    "SELECT category, ts FROM last_update WHERE account_id = ?", (account_id,)):
+                account.setdefault("last_update", {})[category] = ts
+                # A fetched but empty list is still a snapshot (needed for the change log)
+                account.setdefault(category, set())
+            return account
+
+    def load_all_user_details(self):
+        with self.lock, metrics.timer("store_load_seconds", what="user_details"):
+            return {login: json.loads(data)
+                    for login, data in self.conn.execute("SELECT login, data FROM user_details")}
+
+    # --- streaming reads (export) ---
+
+    def _reader(self):
+        # Own read-only connection: a long export neither holds the lock nor blocks writes (WAL)
+        return sqlite3.connect(f"file:{os.path.abspath(self.path)}?mode=ro", uri=True, check_same_thread=False)
+
+    def _iter_chunks(self, query, params, chunk_size):
+        conn = self._reader()
+        try:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            conn.close()
+
+    def iter_category_rows(self, username, category, other_category, timestamp_category, chunk_size=10000):
+        """Yields lists of (login, first_seen, in_other_category, details_json) of a stored set, by login."""
+        return self._iter_chunks(
+            "SELECT e.login, f.ts, EXISTS (SELECT 1 FROM edges o WHERE o.account_id = e.account_id "
+            "AND o.category = ? AND o.login = e.login), d.data "
+            "FROM edges e JOIN accounts a ON a.id = e.account_id "
+            "LEFT JOIN first_seen f ON f.account_id = e.account_id AND f.category = ? AND f.login = e.login "
+            "LEFT JOIN user_details d ON d.login = e.login "
+            "WHERE a.username = ? AND e.category = ? ORDER BY e.login",
+            (other_category, timestamp_category, username, category), chunk_size)
+
+    def iter_changes(self, username, category, after_id=0, chunk_size=10000):
+        """Yields lists of (event_id, login, delta, ts, details_json) of the change log after event after_id."""
+        return self._iter_chunks(
+            "SELECT ev.id, ev.login, ev.delta, ev.ts, d.data "
+            "FROM events ev JOIN accounts a ON a.id = ev.account_id "
+            "LEFT JOIN user_details d ON d.login = ev.login "
+            "WHERE a.username = ? AND ev.category = ? AND ev.id > ? ORDER BY ev.id",
+            (username, category, int(after_id)), chunk_size)
+
+    def iter_account_rows(self, username, chunk_size=10000):
+        """Yields (table, category, login, ts) rows of an account, grouped by table and category.
+
+        table is "edges" (ts is None), "first_seen" or "last_update" (login
+        is None). For building other in-memory formats without the sets and
+        dicts of load_account().
+        """
+        for query in (
+                "SELECT 'edges', e.category, e.login, NULL FROM edges e JOIN accounts a ON a.id = e.account_id "
+                "WHERE a.username = ? ORDER BY e.category",
+                "SELECT 'first_seen', f.category, f.login, f.ts FROM first_seen f "
+                "JOIN accounts a ON a.id = f.account_id WHERE a.username = ? ORDER BY f.category",
+                "SELECT 'last_update', u.category, NULL, u.ts FROM last_update u "
+                "JOIN accounts a ON a.id = u.account_id WHERE a.username = ?"):
+            for rows in self._iter_chunks(query, (username,), chunk_size):
+                yield from rows
+
+    # --- migration ---
+
+    def migrate_from_json(self, json_path):
+        """One-shot import of the old github_tracker_data.json format.
+
+        Runs in a single transaction. The JSON file is renamed to
+        <name>.migrated afterwards so the import never runs twice.
+        Returns True if anything was imported.
+        """
+        if not os.path.exists(json_path):
+            return False
+        with open(json_path, "r") as f:
+            loaded_data = json.load(f)
+        users = loaded_data.get("users", {})
+        # Older versions saved the details cache as a pseudo user "user_details"
+        details = users.get("user_details")
+        with self.lock, self.conn:
+            last_username = loaded_data.get("_metadata", {}).get("last_username")
+            if last_username:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO metadata (key, value) VALUES ('last_username', ?)",
+                    (last_username,))
+            for username, categories in users.items():
+                if username == "user_details" or not isinstance(categories, dict):
+                    continue
+                account_id = self._account_id(username)
+                for category, value in categories.items():
+                    if category in TIMESTAMP_CATEGORIES:
+                        try:
+                            value = dict(value)
+                        except (TypeError, ValueError):
+                            continue
+                        self.conn.executemany(
+                            "INSERT OR IGNORE INTO first_seen (account_id, category, login, ts) "
+                            "VALUES (?, ?, ?, ?)",
+                            ((account_id, category, login, ts) for login, ts in value.items()))
+                    elif category == "last_update":
+                        if isinstance(value, dict):
+                            self.conn.executemany(
+                                "INSERT OR REPLACE INTO last_update (account_id, category, ts) VALUES (?, ?, ?)",
+                                ((account_id, key, ts) for key, ts in value.items()))
+                    elif category == "user_details":
+                        if isinstance(value, dict) and not details:
+                            details = value
+                    elif isinstance(value, list):
+                        self.conn.executemany(
+                            "INSERT OR IGNORE INTO edges (account_id, category, login) VALUES (?, ?, ?)",
+                            ((account_id, category, login) for login in value))
+            if isinstance(details, dict):
+                now = datetime.now().isoformat(sep=' ', timespec='seconds')
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO user_details (login, data, updated_at) VALUES (?, ?, ?)",
+                    ((login, json.dumps(value), now) for login, value in details.items()
+                     if isinstance(value, dict)))
+        os.replace(json_path, json_path + ".migrated")
+        return True
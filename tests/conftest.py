@@ -0,0 +1,28 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))  # github_stub
+
+import pytest
+
+import github_api
+from github_stub import StubConfig, start_stub
+
+
+@pytest.fixture
+def api_stub(monkeypatch):
+    """Returns start(**config) -> (StubConfig, base_url) for a local API stub, with fresh github_api state."""
+    monkeypatch.setattr(github_api, "_cache", github_api.ConditionalCache(path=None))
+    monkeypatch.setattr(github_api, "_partial_fetches", {})
+    servers = []
+
+    def start(**kwargs):
+        config = StubConfig(**kwargs)
+        server, base_url = start_stub(config)
+        servers.append(server)
+        return config, base_url
+    yield start
+    for server in servers:
+        server.shutdown()
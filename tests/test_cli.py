@@ -0,0 +1,30 @@
+import sqlite3
+
+import cli
+
+
+def test_daemon_survives_a_failed_run(monkeypatch, tmp_path, capsys):
+    runs = []
+
+    def refresh(args, store):
+        runs.append(1)
+        raise sqlite3.OperationalError("database is locked")
+
+    def sleep(seconds):
+        if len(runs) >= 2:
+            raise KeyboardInterrupt
+    monkeypatch.setattr(cli, "refresh", refresh)
+    monkeypatch.setattr(cli.time, "sleep", sleep)
+    assert cli.main(["--db", str(tmp_path / "data.db"), "daemon", "--all", "--interval", "0"]) == 0
+    assert len(runs) == 2
+    assert "database is locked" in capsys.readouterr().out
+
+
+def test_metrics_write_error_does_not_hide_the_result(tmp_path, capsys):
+    metrics_file = str(tmp_path / "missing" / "metrics.prom")
+    try:
+        assert cli.main(["--db", str(tmp_path / "data.db"), "--metrics", metrics_file,
+                         "show", "alice"]) == 0
+    finally:
+        cli.metrics.enable(False)
+    assert "Could not write metrics" in capsys.readouterr().out
@@ -0,0 +1,31 @@
+import compact
+import core
+import storage
+
+
+def test_load_compact_matches_load_account(tmp_path):
+    store = storage.SQLiteStore(str(tmp_path / "data.db"))
+    store.replace_set("alice", "followers", {"bob", "carol"}, set(), False)
+    store.replace_set("alice", "following", {"bob", "dave"}, set(), False)
+    store.add_first_seen("alice", "follower_timestamps", {"bob": "2024-05-01 12:00:00",
+                                                          "carol": "2024-05-02 08:30:00"})
+    store.set_last_update("alice", "followers", "2024-05-02 08:30:00")
+    store.set_last_update("alice", "following", "2024-05-02 08:30:00")
+    store.set_last_update("erin", "followers", "2024-05-02 08:30:00")  # Fetched, but nobody follows erin
+
+    results = core.load_compact(store)
+    assert results.account("alice").as_dict() == store.load_account("alice")
+    assert results.account("erin").as_dict() == store.load_account("erin") == {
+        "followers": set(), "last_update": {"followers": "2024-05-02 08:30:00"}}
+    assert results.not_following_back("alice") == ["dave"]
+    assert results.follows_back("alice") == ["bob"]
+    assert results.account("alice").timestamp("follower_timestamps", "carol") == "2024-05-02 08:30:00"
+    store.close()
+
+
+def test_sorted_id_operations():
+    a = compact.make_ids([5, 1, 3, 3])
+    b = compact.make_ids([3, 4, 5])
+    assert list(compact.intersect(a, b)) == [3, 5]
+    assert list(compact.difference(a, b)) == [1]
+    assert compact.contains(a, 3) and not compact.contains(a, 4)
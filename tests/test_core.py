@@ -0,0 +1,93 @@
+import sqlite3
+
+import pytest
+
+import core
+import github_api
+import storage
+
+
+def test_bulk_refresh_keeps_going_after_an_account_fails(monkeypatch, tmp_path):
+    def fetch_logins(username, category, **kwargs):
+        if username == "broken":
+            raise ValueError("Expecting value: line 1 column 1 (char 0)")  # e.g. HTML from a proxy
+        return [f"{username}-{category}-{i}" for i in range(3)]
+    monkeypatch.setattr(github_api, "fetch_logins", fetch_logins)
+    store = storage.SQLiteStore(str(tmp_path / "data.db"))
+    results = {}
+    report = core.refresh_accounts(results, store, ["alice", "broken", "bob"])
+    store.close()
+    errors = {account["username"]: account["error"] for account in report["accounts"]}
+    assert set(errors) == {"alice", "broken", "bob"}
+    assert isinstance(errors["broken"], ValueError)
+    assert errors["alice"] is None and errors["bob"] is None
+    assert report["failed"] == 1
+    assert len(results["alice"]["followers"]) == 3
+
+
+class LockedStore:
+    def replace_set(self, *args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def test_store_error_fails_only_the_account():
+    account = core.store_fetched_account({}, LockedStore(), "alice", {"followers": ["bob"]})
+    assert "locked" in str(account["error"])
+
+
+class FlakyStore:
+    def __init__(self):
+        self.calls = 0
+
+    def load_account(self, username):
+        self.calls += 1
+        if self.calls == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return {"followers": {"bob"}}
+
+
+def test_lazy_results_keeps_a_failed_load_pending():
+    results = core.LazyResults(FlakyStore(), ["alice"])
+    try:
+        results["alice"]
+    except sqlite3.OperationalError:
+        pass
+    assert "alice" in results.pending
+    assert results["alice"] == {"followers": {"bob"}}
+
+
+@pytest.fixture
+def stub(monkeypatch, api_stub):
+    """A stub API with 250 followers (user0..user249, three pages) as github_api.API_URL."""
+    config, base_url = api_stub(followers=250)
+    monkeypatch.setattr(github_api, "API_URL", base_url)
+    monkeypatch.setattr(core, "_followers_checked", {})
+    return config
+
+
+FOLLOWERS = {f"user{i}" for i in range(250)}
+LONG_AGO = "2024-05-01 12:00:00"
+
+
+def test_recent_snapshot_is_used_without_requests(stub):
+    followers, fetched = core.resolve_followers("alice", FOLLOWERS, core.now_str())
+    assert (followers, fetched, stub.request_count) == (FOLLOWERS, None, 0)
+
+
+def test_unchanged_followers_are_checked_with_three_requests(stub):
+    followers, fetched = core.resolve_followers("alice", FOLLOWERS, LONG_AGO)
+    assert (followers, fetched, stub.request_count) == (FOLLOWERS, None, 3)  # Profile, first and last page
+    core.resolve_followers("alice", FOLLOWERS, LONG_AGO)
+    assert stub.request_count == 3  # Checked just now
+
+
+@pytest.mark.parametrize("cached", [
+    FOLLOWERS - {"user0"} | {"gone"},  # Same count, but a new follower on page 1
+    FOLLOWERS - {"user249"} | {"gone"},  # ... on the last page
+    FOLLOWERS - {"user0"},  # Count changed
+    None,  # Never fetched
+])
+def test_changed_followers_are_fetched(stub, cached):
+    followers, fetched = core.resolve_followers("alice", cached, LONG_AGO)
+    assert followers == FOLLOWERS
+    assert sorted(fetched) == sorted(FOLLOWERS)
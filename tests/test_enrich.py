@@ -0,0 +1,36 @@
+import pytest
+
+import enrich
+import github_api
+
+NODE = {"location": None, "repositories": {"totalCount": 3}, "gists": {"totalCount": 0},
+        "followers": {"totalCount": 1}, "following": {"totalCount": 2},
+        "createdAt": "2020-01-01T00:00:00Z", "isSiteAdmin": False}
+
+
+def test_only_not_found_logins_go_to_rest(monkeypatch):
+    monkeypatch.setattr(github_api, "post_graphql", lambda query, variables, **kwargs: {
+        "data": {"u0": NODE, "u1": None},
+        "errors": [{"type": "NOT_FOUND", "path": ["u1"], "message": "Could not resolve to a User"}]})
+    rest = []
+    monkeypatch.setattr(enrich, "_rest_one", lambda login, *args: rest.append(login) or {"login": login})
+    results = enrich.enrich_users(["alice", "some-org"], use_graphql=True)
+    assert rest == ["some-org"]
+    assert set(results) == {"alice", "some-org"}
+
+
+def test_rate_limited_batch_is_not_sent_to_rest(monkeypatch):
+    monkeypatch.setattr(github_api, "post_graphql", lambda query, variables, **kwargs: {
+        "data": None, "errors": [{"type": "RATE_LIMITED", "message": "API rate limit exceeded"}]})
+    rest = []
+    monkeypatch.setattr(enrich, "_rest_one", lambda login, *args: rest.append(login))
+    with pytest.raises(github_api.RateLimitError):
+        enrich.enrich_users([f"user{i}" for i in range(120)], use_graphql=True)
+    assert rest == []
+
+
+def test_other_graphql_errors_raise(monkeypatch):
+    monkeypatch.setattr(github_api, "post_graphql", lambda query, variables, **kwargs: {
+        "data": None, "errors": [{"type": "INTERNAL", "message": "Something went wrong"}]})
+    with pytest.raises(enrich.GraphQLError):
+        enrich.enrich_users(["alice"], use_graphql=True)
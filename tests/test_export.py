@@ -0,0 +1,30 @@
+import json
+
+import export
+import storage
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_changes_export_continues_where_the_last_one_stopped(tmp_path):
+    store = storage.SQLiteStore(str(tmp_path / "data.db"))
+    store.replace_set("alice", "followers", {"bob"}, record_changes=False)
+    store.apply_diff("alice", "followers", {"carol"}, {"bob"})
+    store.apply_diff("alice", "following", {"dave"}, set())
+    path = str(tmp_path / "changes.jsonl")
+
+    assert export.export_account(store, "alice", path, changes=True) == 3
+    rows = read_jsonl(path)
+    assert {(row["category"], row["login"], row["change"]) for row in rows} == {
+        ("followers", "carol", "added"), ("followers", "bob", "removed"), ("following", "dave", "added")}
+
+    assert export.export_account(store, "alice", path, changes=True) == 0
+    assert read_jsonl(path) == []
+
+    store.apply_diff("alice", "followers", {"erin"}, set())
+    assert export.export_account(store, "alice", path, changes=True) == 1
+    assert [row["login"] for row in read_jsonl(path)] == ["erin"]
+    store.close()
@@ -0,0 +1,153 @@
+import threading
+import time
+
+import pytest
+import requests
+
+import core
+import github_api
+
+
+def make_response(status, headers=None, text=""):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = text.encode()
+    response.url = "https://api.github.com/users/octocat"
+    return response
+
+
+@pytest.mark.parametrize("status, headers, text, expected", [
+    (429, {}, "", True),
+    (403, {"X-RateLimit-Remaining": "0"}, "", True),
+    (403, {"Retry-After": "30"}, "", True),
+    (403, {"X-RateLimit-Remaining": "4000"}, '{"message": "You have exceeded a secondary rate limit."}', True),
+    (403, {"X-RateLimit-Remaining": "4000"}, '{"message": "Resource not accessible by integration"}', False),
+    (404, {}, "", False),
+])
+def test_is_rate_limited(status, headers, text, expected):
+    assert github_api.is_rate_limited(make_response(status, headers, text)) is expected
+
+
+def test_plain_403_fails_at_once(monkeypatch):
+    calls = []
+
+    def request(method, url, **kwargs):
+        calls.append(url)
+        return make_response(403, {"X-RateLimit-Remaining": "4000"}, '{"message": "Forbidden"}')
+    monkeypatch.setattr(github_api.get_session(), "request", request)
+    limiter = github_api.RateLimiter()
+    with pytest.raises(requests.exceptions.HTTPError) as info:
+        github_api._request("GET", "https://api.github.com/users/octocat", limiter)
+    assert not isinstance(info.value, github_api.RateLimitError)
+    assert len(calls) == 1
+    assert limiter.blocked_until == 0  # Other requests are not held up
+
+
+FOLLOWERS = [f"user{i}" for i in range(450)]  # Five pages
+
+
+def fail_page_once(monkeypatch, page, error):
+    fetch_page = github_api.fetch_page
+    failed = []
+
+    def failing(username, endpoint_type, number, *args, **kwargs):
+        if number == page and not failed:
+            failed.append(number)
+            raise error
+        return fetch_page(username, endpoint_type, number, *args, **kwargs)
+    monkeypatch.setattr(github_api, "fetch_page", failing)
+
+
+def test_pages_are_not_reused_after_other_errors(monkeypatch, api_stub):
+    config, base_url = api_stub(followers=450)
+    fail_page_once(monkeypatch, 4, requests.exceptions.ConnectionError("connection reset"))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        github_api.fetch_logins("alice", "followers", base_url=base_url)
+    before = config.request_count
+    assert github_api.fetch_logins("alice", "followers", base_url=base_url) == FOLLOWERS
+    assert config.request_count - before == 5  # Every page asked again
+
+
+def test_rate_limited_fetch_resumes(monkeypatch, api_stub):
+    config, base_url = api_stub(followers=450)
+    fail_page_once(monkeypatch, 4, github_api.RateLimitError("limit", reset_at=time.time()))
+    with pytest.raises(github_api.RateLimitError):
+        github_api.fetch_logins("alice", "followers", base_url=base_url)
+    before = config.request_count
+    assert github_api.fetch_logins("alice", "followers", base_url=base_url) == FOLLOWERS
+    assert config.request_count - before == 2  # Page 1 and the missing page 4
+
+
+def test_resume_state_expires(monkeypatch, api_stub):
+    config, base_url = api_stub(followers=450)
+    monkeypatch.setattr(github_api, "RESUME_SECONDS", -1)
+    fail_page_once(monkeypatch, 4, github_api.RateLimitError("limit", reset_at=time.time()))
+    with pytest.raises(github_api.RateLimitError):
+        github_api.fetch_logins("alice", "followers", base_url=base_url)
+    before = config.request_count
+    assert github_api.fetch_logins("alice", "followers", base_url=base_url) == FOLLOWERS
+    assert config.request_count - before == 5
+
+
+def test_cancel_stops_a_parked_request():
+    limiter = github_api.RateLimiter()
+    limiter.block(60)
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    start = time.monotonic()
+    with pytest.raises(github_api.Cancelled):
+        limiter.acquire(max_wait=None, cancel=cancel)
+    assert time.monotonic() - start < 1
+
+
+def test_max_wait_none_means_no_limit_in_core(monkeypatch):
+    calls = []
+    monkeypatch.setattr(github_api, "fetch_logins", lambda *args, **kwargs: calls.append(kwargs) or [])
+    core.fetch_category("alice", "followers", max_wait=None)
+    core.fetch_category("alice", "followers")
+    assert [kwargs["max_wait"] for kwargs in calls] == [None, github_api.MAX_PARK_SECONDS]
+
+
+def test_cache_saves_only_changes_and_drops_least_recently_used(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = github_api.ConditionalCache(path, max_entries=2)
+    cache.put("a", {"etag": "1", "data": ["x"]})
+    cache.put("b", {"etag": "2", "data": ["y"]})
+    cache.save()
+    assert cache.dirty == {}
+    time.sleep(1.1)  # used_at has whole seconds
+    assert cache.get("a")["etag"] == "1"
+    cache.put("c", {"etag": "3", "data": ["z"]})
+    cache.save()
+    reopened = github_api.ConditionalCache(path, max_entries=2)
+    assert reopened.get("b") is None
+    assert reopened.get("a")["data"] == ["x"]
+    assert reopened.get("c")["data"] == ["z"]
+
+
+def test_profiles_for_details_are_not_cached(api_stub):
+    config, base_url = api_stub(followers=10)
+    github_api.fetch_profile("user0", base_url, cached=False)
+    assert github_api.get_cache().entries == {}
+    github_api.fetch_profile("user0", base_url)
+    assert len(github_api.get_cache().entries) == 1
+
+
+@pytest.mark.parametrize("link_header, requests_sent", [(True, 5), (False, 6)])  # Without Link: plus the profile
+def test_fetch_logins_joins_pages_in_order(api_stub, link_header, requests_sent):
+    config, base_url = api_stub(followers=450, link_header=link_header, latency=0.01)
+    pages = []
+    logins = github_api.fetch_logins("alice", "followers", base_url=base_url,
+                                     on_page=lambda page, total: pages.append((page, total)))
+    assert logins == FOLLOWERS
+    assert config.request_count == requests_sent
+    assert sorted(pages) == [(page, 5) for page in range(1, 6)]
+
+
+def test_unchanged_pages_come_from_the_cache(api_stub):
+    config, base_url = api_stub(followers=450)
+    github_api.fetch_logins("alice", "followers", base_url=base_url)
+    assert config.not_modified_count == 0
+    assert github_api.fetch_logins("alice", "followers", base_url=base_url) == FOLLOWERS
+    assert config.not_modified_count == 5
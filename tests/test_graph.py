@@ -0,0 +1,33 @@
+import compact
+import graph
+
+RESULTS = {
+    "alice": {"followers": {"x", "y", "bob"}, "following": {"bob", "carol"}},
+    "bob": {"followers": {"x", "y", "z", "alice"}, "following": {"carol", "w"}},
+    "carol": {"followers": {"y", "alice", "bob"}, "following": {"v", "w"}},
+    "user_details": {},
+}
+
+
+def make_index():
+    return graph.GraphIndex(compact.CompactResults.from_results(RESULTS))
+
+
+def test_mutual_followers():
+    index = make_index()
+    assert sorted(index.mutual_followers("alice", "bob")) == ["x", "y"]
+    assert sorted(index.mutual_following("bob", "carol")) == ["w"]
+    assert index.mutual_followers("alice", "unknown") == []
+
+
+def test_overlap_matrix():
+    index = make_index()
+    assert index.accounts == ["alice", "bob", "carol"]
+    assert index.overlap_matrix("followers") == [[3, 2, 2], [2, 4, 2], [2, 2, 3]]
+    assert index.overlap_matrix("following") == [[2, 1, 0], [1, 2, 1], [0, 1, 2]]
+
+
+def test_suggestions_skip_followed_users_and_rank_by_paths():
+    index = make_index()
+    assert index.suggestions("alice") == [("w", 2), ("v", 1)]
+    assert index.suggestions("alice", limit=1) == [("w", 2)]
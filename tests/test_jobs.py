@@ -0,0 +1,90 @@
+import threading
+
+from jobs import JobRunner
+
+
+class FakeRoot:
+    """Stands in for the Tk root: after() callbacks are run by hand with poll()."""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+
+    def report_callback_exception(self, *exc_info):
+        raise exc_info[1]
+
+
+def poll(root):
+    callbacks, root.callbacks = root.callbacks, []
+    for callback in callbacks:
+        callback()
+
+
+def wait_for(root, runner, key):
+    for _ in range(1000):
+        poll(root)
+        if not runner.jobs.get(key) and key not in runner.waiting:
+            return
+        threading.Event().wait(0.005)
+    raise AssertionError(f"{key} did not finish")
+
+
+def test_resubmit_after_cancel_waits_for_the_old_job():
+    root = FakeRoot()
+    runner = JobRunner(root)
+    release = threading.Event()
+    running = []
+    results = []
+
+    def old(job):
+        running.append("old")
+        release.wait(5)
+        job.check()  # Notices the cancellation only now
+        return "old"
+
+    def new(job):
+        running.append("new")
+        return "new"
+
+    runner.submit("key", old, on_done=results.append)
+    runner.cancel("key")
+    assert runner.is_running("key") is False
+    runner.submit("key", new, on_done=results.append)
+    assert runner.is_running("key")
+    poll(root)
+    assert running == ["old"]  # Not started next to the cancelled job
+    release.set()
+    wait_for(root, runner, "key")
+    assert running == ["old", "new"]
+    assert results == ["new"]
+
+
+def test_submit_while_running_returns_the_running_job():
+    root = FakeRoot()
+    runner = JobRunner(root)
+    release = threading.Event()
+    first = runner.submit("key", lambda job: release.wait(5))
+    assert runner.submit("key", lambda job: None) is first
+    release.set()
+    wait_for(root, runner, "key")
+
+
+def test_cancel_all_drops_waiting_jobs():
+    root = FakeRoot()
+    runner = JobRunner(root)
+    release = threading.Event()
+    started = []
+
+    def old(job):
+        release.wait(5)
+        job.check()
+
+    runner.submit("key", old)
+    runner.cancel("key")
+    runner.submit("key", lambda job: started.append("new"))
+    runner.cancel()
+    release.set()
+    wait_for(root, runner, "key")
+    assert started == []
@@ -0,0 +1,126 @@
+import sqlite3
+import time
+
+import persist
+import storage
+
+
+def make_store(tmp_path, debounce=60, store=None):
+    store = store or storage.SQLiteStore(str(tmp_path / "data.db"))
+    return persist.WriteBehindStore(store, journal_path=str(tmp_path / "journal.jsonl"), debounce=debounce)
+
+
+def test_reads_see_pending_writes_without_waiting(tmp_path):
+    store = make_store(tmp_path)
+    store.replace_set("alice", "followers", {"bob", "carol"}, set(), False)
+    store.replace_set("alice", "followers", {"bob"}, {"bob", "carol"})
+    store.add_first_seen("alice", "follower_timestamps", {"bob": "2024-05-01 12:00:00"})
+    store.set_last_update("alice", "followers", "2024-05-01 12:00:00")
+    store.set_metadata("last_username", "alice")
+    store.upsert_many_user_details({"bob": {"followers": 3}})
+    assert store.get_set("alice", "followers") == {"bob"}
+    assert store.load_account("alice") == {
+        "followers": {"bob"},
+        "follower_timestamps": {"bob": "2024-05-01 12:00:00"},
+        "last_update": {"followers": "2024-05-01 12:00:00"},
+    }
+    assert store.usernames() == ["alice"]
+    assert store.get_metadata("last_username") == "alice"
+    assert store.get_user_details("bob") == {"followers": 3}
+    assert store.stats["commits"] == 0
+    store.close()
+    assert storage.SQLiteStore(str(tmp_path / "data.db")).get_set("alice", "followers") == {"bob"}
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def crash(store):
+    """Stops the writer as if the program was killed: nothing queued gets committed."""
+    def batch():
+        raise sqlite3.OperationalError("disk I/O error")
+    store.store.batch = batch
+    with store.cond:
+        store.closed = True
+        store.cond.notify_all()
+    store.thread.join()
+    store._journal.close()
+
+
+def test_journal_is_replayed_after_a_crash(tmp_path):
+    store = make_store(tmp_path)
+    store.replace_set("alice", "followers", {"bob", "carol"}, set(), False)
+    store.set_last_update("alice", "followers", "2024-05-01 12:00:00")
+    store.upsert_many_user_details({"bob": {"followers": 3}})
+    journal = tmp_path / "journal.jsonl"
+    wait_for(lambda: journal.exists() and len(journal.read_text().splitlines()) == 3)
+    crash(store)
+    assert storage.SQLiteStore(str(tmp_path / "data.db")).get_set("alice", "followers") == set()
+    with open(journal, "a") as f:
+        f.write('[4, "set_metadata", ["last_us')  # Cut off by the crash
+
+    store = make_store(tmp_path)
+    assert journal.read_text() == ""
+    assert store.get_metadata("journal_seq") == "3"
+    assert store.load_account("alice") == {"followers": {"bob", "carol"},
+                                           "last_update": {"followers": "2024-05-01 12:00:00"}}
+    assert store.get_user_details("bob") == {"followers": 3}
+    assert store.get_metadata("last_username") is None
+    store.close()
+
+
+def test_coalesce_keeps_the_order_of_the_writes():
+    ops = [
+        (1, "set_metadata", ("last_username", "alice")),
+        (2, "apply_diff", ("alice", "followers", ["bob"], [], True, 10)),
+        (3, "upsert_many_user_details", ({"bob": {"followers": 1}},)),
+        (4, "set_metadata", ("last_username", "carol")),
+        (5, "apply_diff", ("alice", "followers", [], ["bob"], True, 20)),
+        (6, "upsert_many_user_details", ({"bob": {"followers": 2}, "dave": {}},)),
+    ]
+    assert persist.WriteBehindStore._coalesce(ops) == [
+        ("set_metadata", ("last_username", "carol")),
+        ("apply_diff", ("alice", "followers", ["bob"], [], True, 10)),
+        ("apply_diff", ("alice", "followers", [], ["bob"], True, 20)),
+        ("upsert_many_user_details", ({"bob": {"followers": 2}, "dave": {}},)),
+    ]
+
+
+def test_add_then_remove_in_one_commit(tmp_path):
+    store = make_store(tmp_path)
+    store.replace_set("alice", "followers", {"bob"}, set())
+    store.replace_set("alice", "followers", set(), {"bob"})
+    assert store.flush(timeout=5)
+    assert store.stats["commits"] == 1
+    assert store.get_set("alice", "followers") == set()
+    assert [(login, delta) for login, delta, ts in store.changes_since("alice", "followers")] == [
+        ("bob", -1), ("bob", 1)]
+    store.close()
+
+
+class FailingStore(storage.SQLiteStore):
+    failures = 2
+
+    def apply_diff(self, *args, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        super().apply_diff(*args, **kwargs)
+
+
+def test_failed_commit_is_retried(tmp_path, monkeypatch):
+    monkeypatch.setattr(persist, "RETRY_SECONDS", 0.01)
+    store = make_store(tmp_path, debounce=0, store=FailingStore(str(tmp_path / "data.db")))
+    store.replace_set("alice", "followers", {"bob"}, set())
+    wait_for(lambda: store.error is not None)
+    assert store.get_set("alice", "followers") == {"bob"}  # Reads still work and do not raise
+    assert store.flush(timeout=5)
+    assert store.take_error() is None
+    assert store.stats["commits"] == 1
+    store.close()
+    assert storage.SQLiteStore(str(tmp_path / "data.db")).get_set("alice", "followers") == {"bob"}
+    assert not (tmp_path / "journal.jsonl").exists()
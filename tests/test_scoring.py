@@ -0,0 +1,48 @@
+import pytest
+
+import scoring
+
+NOW = 1_700_000_000.0
+DETAILS = {
+    "alice": {"followers": 10, "public_repos": 5, "public_gists": 1, "site_admin": False,
+              "created_at": "2015-03-01T00:00:00Z"},
+    "bob": {"followers": 200, "public_repos": "-", "public_gists": 0, "site_admin": False, "created_at": "-"},
+    "carol": {"followers": 3, "public_repos": 40, "public_gists": 7, "site_admin": True,
+              "created_at": "2020-06-15T12:00:00Z"},
+    "dave": {"location": None},
+}
+
+
+@pytest.mark.parametrize("profile", sorted(scoring.PROFILES))
+def test_engine_matches_score_details(profile):
+    engine = scoring.ScoreEngine()
+    assert engine.update(DETAILS) == len(DETAILS)
+    for login, details in DETAILS.items():
+        assert engine.score(login, profile, NOW) == scoring.score_details(details, profile, NOW)
+    assert engine.score("unknown", profile, NOW) is None
+
+
+def test_update_recomputes_only_changed_rows():
+    engine = scoring.ScoreEngine()
+    engine.update(DETAILS)
+    engine.score("alice")  # Base scores of the default profile are cached now
+    changed = dict(DETAILS["alice"], followers=1000)
+    assert engine.update({"alice": changed, "bob": DETAILS["bob"]}) == 1
+    assert engine.update({"erin": {"followers": 1}}) == 1
+    assert len(engine) == 5
+    assert engine.score("alice", now=NOW) == scoring.score_details(changed, now=NOW)
+    assert engine.score("erin", now=NOW) == scoring.score_details({"followers": 1}, now=NOW)
+
+
+def test_top_k():
+    # Without creation dates the scores do not depend on the time
+    details = {login: dict(value, created_at="-") for login, value in DETAILS.items()}
+    engine = scoring.ScoreEngine()
+    engine.update(details)
+    expected = sorted(((login, scoring.score_details(value)) for login, value in details.items()),
+                      key=lambda item: -item[1])
+    assert engine.top_k(2) == expected[:2]
+    assert engine.top_k(10, ["alice", "dave", "unknown"]) == [
+        (login, score) for login, score in expected if login in ("alice", "dave")]
+    engine.update({"dave": {"followers": 10_000}})
+    assert engine.top_k(1) == [("dave", scoring.score_details({"followers": 10_000}))]
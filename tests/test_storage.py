@@ -0,0 +1,66 @@
+import json
+from datetime import datetime
+
+import storage
+
+
+def test_get_many_user_details(tmp_path):
+    store = storage.SQLiteStore(str(tmp_path / "data.db"))
+    details = {f"user{i}": {"followers": i} for i in range(storage.QUERY_CHUNK + 10)}
+    store.upsert_many_user_details(details)
+    logins = list(details) + ["unknown"]
+    assert store.get_many_user_details(logins) == details
+    assert store.get_many_user_details([]) == {}
+    store.close()
+
+
+def test_migrate_from_json(tmp_path):
+    json_path = tmp_path / "data.json"
+    json_path.write_text(json.dumps({
+        "_metadata": {"last_username": "alice"},
+        "users": {
+            "alice": {
+                "followers": ["bob", "carol"],
+                "following": ["bob"],
+                "follower_timestamps": [["bob", "2024-01-01 10:00:00"], ["carol", "2024-01-02 10:00:00"]],
+                "following_timestamps": {"bob": "2024-01-03 10:00:00"},
+                "last_update": {"followers": "2024-01-04 10:00:00"},
+            },
+            "user_details": {"bob": {"followers": 3}, "broken": "not a dict"},
+        },
+    }))
+    store = storage.SQLiteStore(str(tmp_path / "data.db"))
+    assert store.migrate_from_json(str(json_path))
+    assert store.usernames() == ["alice"]  # The old details cache is not an account
+    assert store.get_metadata("last_username") == "alice"
+    account = store.load_account("alice")
+    assert account["followers"] == {"bob", "carol"}
+    assert account["following"] == {"bob"}
+    assert account["follower_timestamps"] == {"bob": "2024-01-01 10:00:00", "carol": "2024-01-02 10:00:00"}
+    assert account["following_timestamps"] == {"bob": "2024-01-03 10:00:00"}
+    assert account["last_update"] == {"followers": "2024-01-04 10:00:00"}
+    assert store.load_all_user_details() == {"bob": {"followers": 3}}
+    assert not json_path.exists()
+    assert (tmp_path / "data.json.migrated").exists()
+    assert not store.migrate_from_json(str(json_path))  # Never runs twice
+    store.close()
+
+
+def test_change_log(tmp_path):
+    store = storage.SQLiteStore(str(tmp_path / "data.db"))
+    day1 = datetime(2024, 1, 1, 12).timestamp()
+    day2 = datetime(2024, 1, 2, 12).timestamp()
+    store.replace_set("alice", "followers", {"bob", "carol"}, record_changes=False)  # First snapshot
+    store.apply_diff("alice", "followers", {"dave"}, {"bob"}, ts=day1)
+    store.apply_diff("alice", "followers", {"erin", "frank"}, {"carol", "dave"}, ts=day2)
+    store.apply_diff("alice", "following", {"bob"}, set(), ts=day2)
+    assert store.get_set("alice", "followers") == {"erin", "frank"}
+    assert sorted(store.changes_since("alice", "followers", delta=-1)) == [
+        ("bob", -1, int(day1)), ("carol", -1, int(day2)), ("dave", -1, int(day2))]
+    assert {login for login, _, _ in store.changes_since("alice", "followers", since=day2)} == {
+        "erin", "frank", "carol", "dave"}
+    assert store.changes_since("alice", "followers")[-1][2] == int(day1)  # Newest first
+    assert store.net_change_per_day("alice", "followers") == [
+        ("2024-01-01", 1, 1, 0), ("2024-01-02", 2, 2, 0)]
+    assert store.net_change_per_day("alice", "following") == [("2024-01-02", 1, 0, 1)]
+    store.close()
@@ -1,136 +1,212 @@
-import requests
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
+from tkinter import filedialog
 import json
+import sqlite3
 
+import itertools
 import os
+import sys
+import time
 import webbrowser
 
+# requests/github_api, enrich, graph and scoring are imported on first use to keep the start fast
+import core
+import jobs
+import metrics
+import persist
+from core import calculate_score, TIMESTAMP_KEYS
+from result_view import VirtualTreeview
+
 from datetime import datetime
 # Stores previously fetched results: {'username': {'followers': set(), 'following': set(), 'not_following_back': set(), 'follower_timestamps': {user: timestamp}}}
 previous_results = {}
-DATA_FILE = "github_tracker_data.json"
+DATA_FILE = core.DATA_FILE
+DB_FILE = core.DB_FILE
+store = None
+score_engine = None  # scoring.ScoreEngine over previous_results["user_details"]
 
-def fetch_github_data(username, endpoint_type):
+def fetch_github_data(username, endpoint_type, on_page=None, cancel=None):
     """Fetches data from a GitHub API endpoint (followers or following).
-    Returns a list of logins on success, None on failure."""
-    # Paginierung: alle Seiten laden
-    all_logins = []
-    page = 1
-    per_page = 100
-    try:
-        while True:
-            url = f"https://api.github.com/users/{username}/{endpoint_type}?per_page={per_page}&page={page}"
-            response = requests.get(url)
-            if response.status_code in (403, 429):
-                # Rate limit exceeded or too many requests
-                messagebox.showwarning(
-                    "Rate Limit",
-                    "GitHub API rate limit reached or too many requests. Only locally/offline stored data will be shown."
-                )
-                return None
-            response.raise_for_status()
-            data = response.json()
-            logins = [item["login"] for item in data]
-            all_logins.extend(logins)
-            if len(data) < per_page:
-                break
-            page += 1
-        return all_logins
-    except requests.exceptions.RequestException as e:
+    Runs inside a background job: returns the list of logins and raises
+    github_api.RateLimitError / requests.exceptions.RequestException on failure."""
+    # Paginierung: alle Seiten laden (Seite 1 zuerst, Rest parallel)
+    return core.fetch_category(username, endpoint_type, on_page, cancel=cancel)
+
+def show_fetch_error(username, endpoint_type, e):
+    import github_api
+    if isinstance(e, github_api.RateLimitError):
+        # Rate limit exhausted for longer than we are willing to wait
+        progress = ""
+        if e.total_pages:
+            progress = f"\n{e.pages_done} of {e.total_pages} pages were fetched; the rest will be resumed on the next refresh."
+        reset = ""
+        if e.reset_at:
+            reset = f"\nRequests are possible again at {datetime.fromtimestamp(e.reset_at).strftime('%H:%M:%S')}."
+        messagebox.showwarning(
+            "Rate Limit",
+            "GitHub API rate limit reached or too many requests. Only locally/offline stored data will be shown."
+            + progress + reset
+        )
+    else:
         messagebox.showerror("Error", f"Failed to retrieve {endpoint_type} for {username}.\n{e}")
-        return None
-
-def get_user_followers(username):
-    return fetch_github_data(username, "followers")
 
-def get_user_following(username):
-    return fetch_github_data(username, "following")
+def update_rate_limit_label():
+    github_api = sys.modules.get("github_api")
+    if github_api is None:
+        return  # Nothing fetched yet
+    remaining, limit, reset_at = github_api.get_rate_limiter().status()
+    if remaining is None or limit is None:
+        rate_limit_label.config(text="API budget: -")
+        return
+    text = f"API budget: {max(remaining, 0)}/{limit}"
+    if reset_at:
+        text += f" (reset {datetime.fromtimestamp(reset_at).strftime('%H:%M')})"
+    rate_limit_label.config(text=text)
 
 def load_previous_results():
-    global previous_results
-    if os.path.exists(DATA_FILE):
+    """Opens the SQLite store (migrating an old JSON data file once) and loads it into previous_results."""
+    global previous_results, store
+    try:
+        # Saves are queued and committed by a writer thread (see persist.py), never on the Tk thread
+        store = persist.WriteBehindStore(core.open_store(DB_FILE, DATA_FILE), journal_path=persist.JOURNAL_FILE)
+
+        # Load last username if available
+        last_username = store.get_metadata("last_username")
+        if last_username and entry:  # Check if entry widget exists
+            entry.delete(0, tk.END)
+            entry.insert(0, last_username)
+
+        # Only the last used account is read now, the others on first use or by preload_results()
+        previous_results = core.load_results_lazy(store, last_username)
+    except (sqlite3.Error, json.JSONDecodeError, IOError) as e:
+        messagebox.showerror("Load Error", f"Could not load previous data: {e}\n"
+                                           "Nothing will be saved until the program is restarted.")
+        # Keep working in memory so that showing and refreshing lists still works
+        store = core.open_store(":memory:", None)
+        previous_results = {"user_details": {}}
+        if entry:
+            entry.delete(0, tk.END)  # Clear entry field on load error
+
+def preload_results():
+    """Reads the remaining accounts, the user details and the scores in the background after the window is up."""
+    pending = list(getattr(previous_results, "pending", ()))
+    if not pending:
+        return
+
+    def run(job):
+        loaded = {}
+        for key in pending:
+            job.check()
+            loaded[key] = store.load_all_user_details() if key == "user_details" else store.load_account(key)
+        engine = core.score_engine(loaded) if "user_details" in loaded else None
+        return loaded, engine
+
+    def on_done(result):
+        global score_engine
+        loaded, engine = result
+        if "user_details" not in previous_results.pending or score_engine is not None:
+            engine = None  # Details were loaded (and maybe changed) in the meantime
+        previous_results.fill(loaded)
+        if engine is not None:
+            score_engine = engine
+
+    def on_error(e):
+        # Not fatal: the accounts stay pending and are read again when they are needed
+        progress_label.config(text=f"Could not load the saved data in the background: {e}")
+
+    job_runner.submit(("preload",), run, on_done=on_done, on_error=on_error)
+
+def flush_store(job, poll_seconds=0.5):
+    """Waits in a job until queued saves are committed, for reads that go past the pending writes."""
+    if isinstance(store, persist.WriteBehindStore):
+        while not store.flush(poll_seconds):
+            job.check()  # The writer may be retrying a failed commit for a while
+
+def check_store_errors():
+    """Shows errors of the background writer (the writes are kept and retried)."""
+    error = store.take_error() if isinstance(store, persist.WriteBehindStore) else None
+    if error is not None:
+        messagebox.showerror("Save Error", f"Could not save data (will retry): {error}")
+    window.after(STORE_CHECK_MS, check_store_errors)
+
+def on_close():
+    job_runner.cancel()
+    if store is not None:
         try:
-            with open(DATA_FILE, 'r') as f:
-                loaded_data = json.load(f)
-
-                # Load last username if available
-                metadata = loaded_data.get("_metadata", {})
-                last_username = metadata.get("last_username")
-                if last_username and entry:  # Check if entry widget exists
-                    entry.delete(0, tk.END)
-                    entry.insert(0, last_username)
-
-                # Load user tracking data and convert lists back to sets/dicts
-                user_data_loaded = loaded_data.get("users", {})
-                for username, categories in user_data_loaded.items():
-                    previous_results[username] = {}
-                    for category, user_list in categories.items():
-                        if category in ("follower_timestamps", "following_timestamps", "last_update"):
-                            if isinstance(user_list, dict):
-                                previous_results[username][category] = user_list
-                            elif isinstance(user_list, list):
-                                try:
-                                    previous_results[username][category] = dict(user_list)
-                                except Exception:
-                                    previous_results[username][category] = {}
-                            else:
-                                previous_results[username][category] = {}
-                        elif category == "user_details":
-                            if isinstance(user_list, dict):
-                                previous_results[username][category] = user_list
-                            else:
-                                previous_results[username][category] = {}
-                        else:
-                            previous_results[username][category] = set(user_list)
-            # Ensure global user_details dict exists
-            if "user_details" not in previous_results or not isinstance(previous_results["user_details"], dict):
-                previous_results["user_details"] = {}
-        except (json.JSONDecodeError, IOError) as e:
-            messagebox.showerror("Load Error", f"Could not load previous data: {e}")
-            previous_results = {}  # Reset to empty if file is corrupt
-            if entry:
-                entry.delete(0, tk.END)  # Clear entry field on load error
-
-
-def save_previous_results():
-    users_data_to_save = {}
-    for username, categories in previous_results.items():
-        users_data_to_save[username] = {}
-        for category, user_set in categories.items():
-            if category in ("follower_timestamps", "following_timestamps"):
-                users_data_to_save[username][category] = dict(user_set)
-            elif category == "user_details":
-                # Korrekt: user_details als dict speichern!
-                if isinstance(user_set, dict):
-                    users_data_to_save[username][category] = user_set
-                else:
-                    users_data_to_save[username][category] = {}
-            else:
-                # Nur Sets oder Listen in Listen umwandeln, nicht Dicts!
-                if isinstance(user_set, (set, list)):
-                    users_data_to_save[username][category] = list(user_set)
-                else:
-                    users_data_to_save[username][category] = user_set
-    data_to_save = {
-        "_metadata": {"last_username": entry.get() if entry else ""},
-        "users": users_data_to_save
-    }
+            store.close()  # Writes what is still queued
+        except sqlite3.Error as e:
+            messagebox.showerror("Save Error", f"Could not save data: {e}\nIt will be saved on the next start.")
+    window.destroy()
+
+def get_score_engine():
+    """The scoring.ScoreEngine over all cached user details, built on first use."""
+    global score_engine
+    if score_engine is None:
+        score_engine = core.score_engine(previous_results)
+    return score_engine
+
+
+def save_category(username, category_key, current_data_list, new_timestamps, fetched=False):
+    """Makes current_data_list the new state of the category and writes what changed to the store.
+    Returns (added, removed) logins, or None if saving failed."""
     try:
-        with open(DATA_FILE, 'w') as f:
-            json.dump(data_to_save, f, indent=4)
-    except IOError as e:
+        changes = core.apply_category(previous_results, store, username, category_key,
+                                      current_data_list, new_timestamps, fetched)
+        store.set_metadata("last_username", entry.get() if entry else "")
+        return changes
+    except sqlite3.Error as e:
         messagebox.showerror("Save Error", f"Could not save data: {e}")
+        return None
 
 
 def get_last_update(username, category):
-    return previous_results.get(username, {}).get('last_update', {}).get(category)
+    return core.get_last_update(previous_results, username, category)
+
+def compute_result_rows(category_key, current_data_list, old_data_set, timestamps, followers_set):
+    """Builds the Treeview rows for a category (runs in a background job).
+
+    Returns (rows, new_timestamps): rows are (values, tags) tuples, new_timestamps
+    holds the first-seen timestamp of every user that had none yet. Neither
+    old_data_set nor timestamps are modified.
+    """
+    with metrics.timer("ui_rows_seconds", category=category_key):
+        return _compute_result_rows(category_key, current_data_list, old_data_set, timestamps, followers_set)
+
+def _compute_result_rows(category_key, current_data_list, old_data_set, timestamps, followers_set):
+    rows = []
+    new_timestamps = {}
+    now = core.now_str()
+    for user_login in current_data_list:
+        # Set timestamp if new (for followers and following)
+        timestamp_str = ""
+        if timestamps is not None:
+            timestamp_str = timestamps.get(user_login)
+            if timestamp_str is None:
+                timestamp_str = new_timestamps[user_login] = now
+        # Mark new users (not in old_data_set) with a tag
+        tags = ("new_user_tag",) if user_login not in old_data_set else ()
+
+        if category_key == "following":
+            if followers_set is None:
+                follows_back = "?"  # Unknown
+            else:
+                follows_back = "Yes" if user_login in followers_set else "No"
+            rows.append(((user_login, timestamp_str, follows_back), tags))
+        else:
+            rows.append(((user_login, timestamp_str, ""), tags))
+    return rows, new_timestamps
 
-def update_result_display(username, category_key, current_data_list, full_title, empty_list_message):
+def update_result_display(username, category_key, current_data_list, rows, new_timestamps, full_title, empty_list_message):
+    """Clears the result tree, displays the title and the precomputed rows (new users highlighted), then stores the new data."""
     # Zähler aktualisieren
     followers_count = len(previous_results.get(username, {}).get("followers", []))
     following_count = len(previous_results.get(username, {}).get("following", []))
+    if category_key == "followers":
+        followers_count = len(current_data_list)
+    elif category_key == "following":
+        following_count = len(current_data_list)
     followers_count_label.config(text=f"Followers: {followers_count}")
     following_count_label.config(text=f"Following: {following_count}")
     # Show last update timestamp for current category
@@ -139,10 +215,6 @@ def update_result_display(username, category_key, current_data_list, full_title,
         last_update_label.config(text=f"Last update: {last_update}")
     else:
         last_update_label.config(text="Last update: -")
-    """Clears the result_text, displays the title, and lists users, highlighting new ones. For followers, also show and store first-seen timestamp."""
-    # Clear previous content
-    for item in result_tree.get_children():
-        result_tree.delete(item)
 
     # Remove any existing title label before creating a new one
     if hasattr(update_result_display, "title_label") and update_result_display.title_label:
@@ -151,126 +223,478 @@ def update_result_display(username, category_key, current_data_list, full_title,
     update_result_display.title_label = ttk.Label(result_frame, text=full_title, font=("Arial", 11, "bold"))
     update_result_display.title_label.pack(fill=tk.X, pady=(0, 5), before=result_tree)
 
-    old_data_set = previous_results.get(username, {}).get(category_key, set())
-    # Prepare timestamps dict for followers and following
-    if username not in previous_results:
-        previous_results[username] = {}
-    if category_key == "followers":
-        if "follower_timestamps" not in previous_results[username]:
-            previous_results[username]["follower_timestamps"] = {}
-        timestamps = previous_results[username]["follower_timestamps"]
-    elif category_key == "following":
-        if "following_timestamps" not in previous_results[username]:
-            previous_results[username]["following_timestamps"] = {}
-        timestamps = previous_results[username]["following_timestamps"]
-    else:
-        timestamps = None
-
-    if current_data_list:
-        # For 'following', get the current followers list (for 'Follows back?' column)
-        followers_set = None
-        if category_key == "following":
-            followers = get_user_followers(username)
-            if followers is None:
-                followers_set = None  # Mark as unknown
-            else:
-                followers_set = set(followers)
-
-        for user_login in current_data_list:
-            # Set timestamp if new (for followers and following)
-            timestamp_str = ""
-            if category_key in ("followers", "following"):
-                if user_login not in timestamps:
-                    timestamps[user_login] = datetime.now().isoformat(sep=' ', timespec='seconds')
-                timestamp_str = timestamps[user_login]
-            # Mark new users (not in old_data_set) with a tag
-            tags = ("new_user_tag",) if user_login not in old_data_set else ()
-
-            if category_key == "following":
-                if followers_set is None:
-                    follows_back = "?"
-                else:
-                    follows_back = "Yes" if user_login in followers_set else "No"
-                result_tree.insert("", tk.END, values=(user_login, timestamp_str, follows_back), tags=tags)
-            elif category_key == "followers":
-                result_tree.insert("", tk.END, values=(user_login, timestamp_str, ""), tags=tags)
-            else:
-                result_tree.insert("", tk.END, values=(user_login, "", ""), tags=tags)
-    else:
-        # Show empty message as a single row
-        if category_key == "following":
-            result_tree.insert("", tk.END, values=(empty_list_message, "", ""))
+    # Only the visible rows are materialized in the Treeview
+    with metrics.profiled(f"populate-{category_key}"):
+        if rows:
+            result_view.set_rows(rows)
         else:
-            result_tree.insert("", tk.END, values=(empty_list_message, "", ""))
+            # Show empty message as a single row
+            result_view.set_rows([((empty_list_message, "", ""), ())])
+
+    # Update previous_results with the new data and save only what changed
+    changes = save_category(username, category_key, current_data_list, new_timestamps)
+    if changes and (changes[0] or changes[1]):
+        added, removed = changes
+        update_result_display.title_label.config(text=f"{full_title}  (+{len(added)} / -{len(removed)} since last update)")
+
+CATEGORY_TEXTS = {
+    # category: (title, empty list message, warning if nothing is available)
+    "followers": ("Followers of {}:", "(No followers found for this user.)",
+                  "No current or saved follower data available."),
+    "following": ("Users {} is following:", "(This user is not following anyone.)",
+                  "No current or saved following data available."),
+}
 
-    # Tag config for new users (yellow background)
-    result_tree.tag_configure("new_user_tag", background="yellow", foreground="black")
+def load_category(job, username, category_key, refresh, old_data_set, timestamps, cached_followers=None,
+                  followers_update=None):
+    """Background job: fetches a category if needed and computes the rows to display.
+
+    For 'following', the followers snapshot (cached_followers, last updated at
+    followers_update) answers "Follows back?"; it is only fetched again if it is outdated.
+    """
+    import requests
+    errors = []
+    current_data_list = None
+    if refresh:
+        try:
+            current_data_list = fetch_github_data(username, category_key, page_reporter(job, category_key),
+                                                  job.cancelled)
+        except requests.exceptions.RequestException as e:
+            errors.append((category_key, e))
+    fetched = current_data_list is not None
+    if current_data_list is None:
+        current_data_list = list(old_data_set)
+
+    # For 'following', the current followers (for 'Follows back?' column)
+    followers_set = None
+    fetched_followers = None
+    if category_key == "following" and current_data_list:
+        try:
+            followers_set, fetched_followers = core.resolve_followers(
+                username, cached_followers, followers_update, page_reporter(job, "followers"),
+                cancel=job.cancelled)
+        except requests.exceptions.RequestException as e:
+            errors.append(("followers", e))  # Column shows "?"
+            followers_set = cached_followers  # Outdated but better than nothing
+    job.check()
+    rows, new_timestamps = compute_result_rows(category_key, current_data_list, old_data_set,
+                                               timestamps, followers_set)
+    return {"logins": current_data_list, "fetched": fetched, "errors": errors,
+            "rows": rows, "new_timestamps": new_timestamps, "followers": fetched_followers}
+
+def page_reporter(job, endpoint_type):
+    """Returns an on_page callback that reports "n of total pages done" to the job."""
+    done = itertools.count(1)
+    return lambda page, total_pages: job.progress(f"{endpoint_type} pages", next(done), total_pages)
+
+def display_category(category_key, force_refresh=False):
+    username = entry.get()
+    if not username:
+        messagebox.showwarning("Warning", "Please enter your GitHub username.")
+        return
+    title, empty_list_message, unavailable_message = CATEGORY_TEXTS[category_key]
+    cached = previous_results.get(username, {})
+    refresh = force_refresh or not cached.get(category_key)
+    timestamp_key = TIMESTAMP_KEYS.get(category_key)
+    # Snapshots for the job: the sets are replaced, never modified in place, and
+    # timestamps only get new entries on the main thread.
+    old_data_set = cached.get(category_key, set())
+    timestamps = cached.get(timestamp_key, {}) if timestamp_key else None
+    cached_followers = cached.get("followers")
+    followers_update = get_last_update(username, "followers")
+
+    def on_done(result):
+        finish_progress()
+        for endpoint_type, e in result["errors"]:
+            show_fetch_error(username, endpoint_type, e)
+        if result["fetched"]:
+            previous_results.setdefault(username, {}).setdefault('last_update', {})[category_key] = core.now_str()
+        elif not result["logins"]:
+            messagebox.showwarning("Warning", unavailable_message)
+        update_result_display(username, category_key, result["logins"], result["rows"],
+                              result["new_timestamps"], title.format(username), empty_list_message)
+        if result["followers"] is not None:
+            # Followers had to be fetched for "Follows back?": keep them as the new followers snapshot
+            save_category(username, "followers", result["followers"], None, fetched=True)
+
+    def on_error(e):
+        finish_progress()
+        messagebox.showerror("Error", f"Could not load {category_key} for {username}.\n{e}")
+
+    def run(job):
+        with metrics.profiled(f"{'refresh' if refresh else 'show'}-{category_key}"):
+            return load_category(job, username, category_key, refresh, old_data_set, timestamps,
+                                 cached_followers, followers_update)
+
+    progress_label.config(text=f"Loading {category_key} of {username}...")
+    job_runner.submit(("category", username, category_key), run,
+                      on_done=on_done, on_error=on_error, on_progress=show_progress)
+
+def enrich_all():
+    """Fetches missing or outdated details of all followers and followed users of the entered user."""
+    import enrich
+    import requests
+    username = entry.get()
+    if not username:
+        messagebox.showwarning("Warning", "Please enter your GitHub username.")
+        return
+    cached = previous_results.get(username, {})
+    logins = set(cached.get("followers", ())) | set(cached.get("following", ()))
+    stale = enrich.stale_logins(sorted(logins), previous_results["user_details"])
+    if not stale:
+        messagebox.showinfo("Enrich", "No users to enrich. Load followers/following first, or all details are up to date.")
+        return
 
-    # Update previous_results with the new successfully fetched data
-    if username not in previous_results:
-        previous_results[username] = {}
-    previous_results[username][category_key] = set(current_data_list)
-    save_previous_results() # Save after updating
+    def run(job):
+        results = {}
+        error = None
+        try:
+            with metrics.profiled("enrich"):
+                enrich.enrich_users(stale, results, on_progress=lambda done, total: job.progress("user details", done, total),
+                                    cancel=job.cancelled)
+        except requests.exceptions.RequestException as e:
+            error = e  # Keep what was fetched so far
+        for details in results.values():
+            details["score"] = calculate_score(details)
+        return results, error
+
+    def on_done(result):
+        results, error = result
+        previous_results["user_details"].update(results)
+        get_score_engine().update(results)
+        store.upsert_many_user_details(results)
+        finish_progress()
+        if error is not None:
+            show_fetch_error(username, "user details", error)
+        progress_label.config(text=f"Enriched {len(results)} of {len(stale)} users")
+
+    def on_error(e):
+        finish_progress()
+        messagebox.showerror("Error", f"Could not enrich users of {username}.\n{e}")
+
+    job_runner.submit(("enrich", username), run, on_done=on_done, on_error=on_error, on_progress=show_progress)
+
+def refresh_all_accounts():
+    """Refreshes followers and following of all tracked accounts concurrently, stalest first."""
+    usernames = core.stalest_first(previous_results, [u for u in previous_results if u != "user_details"])
+    if not usernames:
+        messagebox.showwarning("Warning", "No tracked accounts yet.")
+        return
 
-def display_followers(force_refresh=False):
+    def run(job):
+        import github_api
+        stats_before = github_api.get_stats()
+        start = time.perf_counter()
+        fetched_accounts = []
+        with metrics.profiled("refresh-all"):
+            for done, fetched_account in enumerate(core.fetch_accounts(usernames, cancel=job.cancelled), 1):
+                fetched_accounts.append(fetched_account)
+                job.progress("accounts", done, len(usernames))
+        return fetched_accounts, time.perf_counter() - start, stats_before, github_api.get_stats()
+
+    def on_done(result):
+        fetched_accounts, elapsed, stats_before, stats_after = result
+        accounts = []
+        try:
+            for username, fetched, error, seconds in fetched_accounts:
+                accounts.append(core.store_fetched_account(previous_results, store, username, fetched, error, seconds))
+        except sqlite3.Error as e:
+            messagebox.showerror("Save Error", f"Could not save data: {e}")
+        finish_progress()
+        report = core.build_report(accounts, elapsed, stats_before, stats_after)
+        progress_label.config(text=f"Refreshed {len(accounts) - report['failed']} of {len(usernames)} accounts")
+        messagebox.showinfo("Refresh All", "\n".join(core.format_report(report)))
+
+    def on_error(e):
+        finish_progress()
+        messagebox.showerror("Error", f"Refreshing all accounts failed.\n{e}")
+
+    job_runner.submit(("refresh_all",), run, on_done=on_done, on_error=on_error, on_progress=show_progress)
+
+HISTORY_DAYS = 30
+CHANGE_TEXTS = {
+    ("followers", 1): "new follower", ("followers", -1): "unfollowed",
+    ("following", 1): "followed", ("following", -1): "unfollowed",
+}
+
+def show_history():
+    """Opens a window with the logged changes of the last HISTORY_DAYS days and the net change per day."""
+    username = entry.get()
+    if not username:
+        messagebox.showwarning("Warning", "Please enter your GitHub username.")
+        return
+    since = time.time() - HISTORY_DAYS * 86400
+
+    def run(job):
+        flush_store(job)  # The change log is read from the database only
+        return {category_key: (store.net_change_per_day(username, category_key, since),
+                               store.changes_since(username, category_key, since))
+                for category_key in ("followers", "following")}
+
+    def on_error(e):
+        messagebox.showerror("Error", f"Could not read the history of {username}.\n{e}")
+
+    job_runner.submit(("history", username), run, on_done=lambda result: open_history_window(username, result),
+                      on_error=on_error)
+
+def open_history_window(username, history_data):
+    history = tk.Toplevel(window)
+    history.title(f"History of {username} (last {HISTORY_DAYS} days)")
+    history.geometry("600x700")
+    for category_key, (net_per_day, changes) in history_data.items():
+        frame = ttk.LabelFrame(history, text=category_key.capitalize(), padding=(10, 5))
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        per_day = ttk.Treeview(frame, columns=("day", "added", "removed", "net"), show="headings", height=5)
+        for col, text in (("day", "Day"), ("added", "Added"), ("removed", "Removed"), ("net", "Net change")):
+            per_day.heading(col, text=text)
+            per_day.column(col, width=100, anchor="center")
+        for day, added, removed, net in reversed(net_per_day):
+            per_day.insert("", tk.END, values=(day, added, removed, f"{net:+d}"))
+        per_day.pack(fill=tk.X, pady=(0, 5))
+
+        changes_frame = ttk.Frame(frame)
+        changes_frame.pack(fill=tk.BOTH, expand=True)
+        changes_view = VirtualTreeview(changes_frame, columns=("username", "change", "time"), height=8)
+        changes_view.tree.heading("username", text="Username")
+        changes_view.tree.heading("change", text="Change")
+        changes_view.tree.heading("time", text="Detected at")
+        rows = [((login, CHANGE_TEXTS[(category_key, delta)],
+                  datetime.fromtimestamp(ts).isoformat(sep=' ', timespec='seconds')), ())
+                for login, delta, ts in changes]
+        changes_view.set_rows(rows or [(("(No changes recorded.)", "", ""), ())])
+        changes_view.pack()
+
+EXPORT_FILETYPES = [("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("Parquet (needs pyarrow)", "*.parquet"),
+                    ("Arrow (needs pyarrow)", "*.arrow")]
+
+def export_data():
+    """Exports followers and following of the entered user, or only the changes since the last export, to a file."""
     username = entry.get()
     if not username:
         messagebox.showwarning("Warning", "Please enter your GitHub username.")
         return
+    if username not in previous_results:
+        messagebox.showwarning("Warning", f"Load followers/following of {username} first.")
+        return
+    changes = messagebox.askyesnocancel(
+        "Export", "Export only the changes since the last changes export?\n\nYes: changes only\nNo: all followers and following")
+    if changes is None:
+        return
+    path = filedialog.asksaveasfilename(title="Export to", defaultextension=".csv", filetypes=EXPORT_FILETYPES,
+                                        initialfile=f"{username}-changes.csv" if changes else f"{username}.csv")
+    if not path:
+        return
+    account = previous_results.get(username, {})
+    total = 0 if changes else len(account.get("followers", ())) + len(account.get("following", ()))
 
-    followers_list = None
-    if force_refresh or not previous_results.get(username, {}).get("followers"):
-        followers_list = get_user_followers(username)
-        if followers_list is not None:
-            if username not in previous_results:
-                previous_results[username] = {}
-            if 'last_update' not in previous_results[username]:
-                previous_results[username]['last_update'] = {}
-            previous_results[username]['last_update']['followers'] = datetime.now().isoformat(sep=' ', timespec='seconds')
-    if followers_list is None:
-        followers_list = list(previous_results.get(username, {}).get("followers", []))
-        if not followers_list:
-            messagebox.showwarning("Warning", "No current or saved follower data available.")
-    update_result_display(
-        username,
-        "followers",
-        followers_list,
-        f"Followers of {username}:",
-        "(No followers found for this user.)"
-    )
+    def run(job):
+        import export
 
-def display_following(force_refresh=False):
+        flush_store(job)  # Exports read the database directly, including the change log
+
+        def on_progress(rows):
+            job.check()
+            job.progress("export rows", rows, max(total, rows))
+        return export.export_account(store, username, path, on_progress=on_progress, changes=changes)
+
+    def on_done(rows):
+        finish_progress()
+        progress_label.config(text=f"Exported {rows} rows to {os.path.basename(path)}")
+
+    def on_error(e):
+        finish_progress()
+        messagebox.showerror("Export Error", f"Could not export {username}.\n{e}")
+
+    job_runner.submit(("export", username), run, on_done=on_done, on_error=on_error, on_progress=show_progress)
+
+NETWORK_LIMIT = 50
+
+def show_network():
+    """Builds the graph index of all tracked accounts in the background and opens the network window."""
     username = entry.get()
     if not username:
         messagebox.showwarning("Warning", "Please enter your GitHub username.")
         return
+    # Follow sets are replaced, not changed, on updates: copying the references is a consistent snapshot
+    snapshot = {u: {c: account[c] for c in core.CATEGORIES if c in account}
+                for u, account in previous_results.items() if u != "user_details"}
+    if not snapshot.get(username):
+        messagebox.showwarning("Warning", f"Load followers/following of {username} first.")
+        return
+
+    def on_done(index):
+        finish_progress()
+        open_network_window(username, index)
+
+    def on_error(e):
+        finish_progress()
+        messagebox.showerror("Error", f"Could not build the network index.\n{e}")
+
+    def run(job):
+        import compact
+        import graph
+        return graph.GraphIndex(compact.CompactResults.from_results(snapshot))
+
+    progress_label.config(text="Building network index...")
+    job_runner.submit(("network",), run, on_done=on_done, on_error=on_error)
+
+def open_network_window(username, index):
+    import graph
+    engine = get_score_engine()
+    score_of = lambda login: engine.score(login) if login in engine.rows else ""
+    network = tk.Toplevel(window)
+    network.title(f"Network of {username} ({len(index.accounts)} tracked accounts)")
+    network.geometry("700x800")
+
+    def add_list(title, columns, headings, rows, height=6):
+        frame = ttk.LabelFrame(network, text=title, padding=(10, 5))
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        list_frame = ttk.Frame(frame)
+        list_frame.pack(side=tk.BOTTOM, fill=tk.BOTH, expand=True)
+        numeric = {col: lambda value: value if isinstance(value, (int, float)) else -1 for col in columns[1:]}
+        view = VirtualTreeview(list_frame, columns=columns, height=height, sort_keys=numeric)
+        for col, text in zip(columns, headings):
+            view.tree.heading(col, text=text, command=lambda col=col: treeview_sort_column(view, col, False))
+        view.set_rows(rows)
+        view.pack()
+        return frame, view
+
+    # Overlap of followers between all tracked accounts
+    matrix = index.overlap_matrix("followers")
+    columns = ("account",) + tuple(f"c{i}" for i in range(len(index.accounts)))
+    overlap_rows = [((account,) + tuple(row), ()) for account, row in zip(index.accounts, matrix)]
+    frame, overlap_view = add_list("Shared followers between tracked accounts", columns,
+                                   ("Account",) + tuple(index.accounts), overlap_rows, height=min(len(index.accounts), 6))
+    for col in columns[1:]:
+        overlap_view.tree.column(col, width=80, anchor="center")
+
+    # Mutual followers with another tracked account
+    others = [account for account in index.accounts if account != username]
+    frame, mutual_view = add_list("Mutual followers with", ("username", "score"), ("Username", "Score"), [])
+    other_var = tk.StringVar(value=others[0] if others else "")
+    def show_mutuals(event=None):
+        logins = sorted(index.mutual_followers(username, other_var.get()), key=str.casefold)
+        mutual_view.set_rows([((login, score_of(login)), ()) for login in logins] or [(("(None)", ""), ())])
+    combo = ttk.Combobox(frame, textvariable=other_var, values=others, state="readonly")
+    combo.bind("<<ComboboxSelected>>", show_mutuals)
+    combo.pack(anchor="w", pady=(0, 5))
+    if others:
+        show_mutuals()
+
+    # Second degree: followed by users the account follows
+    suggestions = [((login, paths, score_of(login)), ()) for login, paths in index.suggestions(username, NETWORK_LIMIT)]
+    add_list("Suggestions (followed by users you follow)", ("username", "paths", "score"),
+             ("Username", "Via", "Score"), suggestions or [(("(None)", "", ""), ())])
+
+    # Best followers by score (needs enriched user details)
+    top = graph.top_scored(index.followers_of(username), engine, NETWORK_LIMIT)
+    add_list("Top followers by score", ("username", "score"), ("Username", "Score"),
+             [((login, score), ()) for login, score in top] or [(("(Enrich users first.)", ""), ())])
+
+DIAGNOSTICS_REFRESH_MS = 1000
+PROFILE_DIR = "profiles"
+METRICS_FILETYPES = [("Prometheus text", "*.prom"), ("JSON", "*.json")]
+
+def format_seconds(value):
+    if value is None or value == "":
+        return ""
+    return f"{value * 1000:.1f} ms" if value < 1 else f"{value:.2f} s"
+
+def show_diagnostics():
+    """Opens a window with the collected counters and timings (see metrics.py), updated every second."""
+    existing = getattr(show_diagnostics, "window", None)
+    if existing is not None and existing.winfo_exists():
+        existing.lift()
+        return
+    diagnostics = show_diagnostics.window = tk.Toplevel(window)
+    diagnostics.title("Diagnostics")
+    diagnostics.geometry("800x500")
+
+    controls = ttk.Frame(diagnostics, padding=(10, 5))
+    controls.pack(fill=tk.X)
+    collecting = tk.BooleanVar(value=metrics.ENABLED)
+    ttk.Checkbutton(controls, text="Collect metrics", variable=collecting,
+                    command=lambda: metrics.enable(collecting.get())).pack(side=tk.LEFT)
+    profiling = tk.BooleanVar(value=metrics.get_profile_dir() is not None)
+    ttk.Checkbutton(controls, text=f"Profile each operation (to {PROFILE_DIR}/)", variable=profiling,
+                    command=lambda: metrics.set_profile_dir(PROFILE_DIR if profiling.get() else None)
+                    ).pack(side=tk.LEFT, padx=10)
+
+    def save():
+        path = filedialog.asksaveasfilename(title="Save metrics", defaultextension=".prom",
+                                            filetypes=METRICS_FILETYPES, parent=diagnostics)
+        if path:
+            try:
+                metrics.dump(path)
+            except OSError as e:
+                messagebox.showerror("Save Error", f"Could not save metrics: {e}", parent=diagnostics)
+
+    def reset():
+        metrics.reset()
+        refresh()
+
+    ttk.Button(controls, text="Reset", command=reset).pack(side=tk.RIGHT)
+    ttk.Button(controls, text="Save...", command=save).pack(side=tk.RIGHT, padx=5)
+
+    frame = ttk.Frame(diagnostics)
+    frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+    columns = ("metric", "labels", "count", "total", "p50", "p99")
+    tree = ttk.Treeview(frame, columns=columns, show="headings")
+    for col, text, width in (("metric", "Metric", 200), ("labels", "Labels", 160), ("count", "Count", 80),
+                             ("total", "Total", 100), ("p50", "p50", 90), ("p99", "p99", 90)):
+        tree.heading(col, text=text)
+        tree.column(col, width=width, anchor="w" if col in ("metric", "labels") else "e")
+    scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    status = ttk.Label(diagnostics, text="", padding=(10, 0, 10, 5))
+    status.pack(fill=tk.X)
+
+    def refresh():
+        if not diagnostics.winfo_exists():
+            return
+        rows = metrics.rows()
+        tree.delete(*tree.get_children())
+        for name, labels, count, total, p50, p99 in rows:
+            if name.endswith("_seconds"):
+                total, p50, p99 = format_seconds(total), format_seconds(p50), format_seconds(p99)
+            tree.insert("", tk.END, values=(name, labels, count, total, p50, p99))
+        if not metrics.ENABLED:
+            status.config(text="Metrics are off. Tick \"Collect metrics\" and repeat the slow operation.")
+        else:
+            status.config(text=f"{len(rows)} metrics, p50/p99 are histogram bucket bounds")
+        diagnostics.after(DIAGNOSTICS_REFRESH_MS, refresh)
+
+    refresh()
+
+def display_followers(force_refresh=False):
+    display_category("followers", force_refresh)
+
+def display_following(force_refresh=False):
+    display_category("following", force_refresh)
 
-    following_list = None
-    if force_refresh or not previous_results.get(username, {}).get("following"):
-        following_list = get_user_following(username)
-        if following_list is not None:
-            if username not in previous_results:
-                previous_results[username] = {}
-            if 'last_update' not in previous_results[username]:
-                previous_results[username]['last_update'] = {}
-            previous_results[username]['last_update']['following'] = datetime.now().isoformat(sep=' ', timespec='seconds')
-    if following_list is None:
-        following_list = list(previous_results.get(username, {}).get("following", []))
-        if not following_list:
-            messagebox.showwarning("Warning", "No current or saved following data available.")
-    update_result_display(
-        username,
-        "following",
-        following_list,
-        f"Users {username} is following:",
-        "(This user is not following anyone.)"
-    )
+def show_progress(what, done, total):
+    progress_label.config(text=f"Fetching {what}: {done}/{total}")
+    progress_bar.config(maximum=max(total, 1), value=min(done, total))
+
+def finish_progress():
+    update_rate_limit_label()
+    if not job_runner.jobs:
+        progress_label.config(text="")
+        progress_bar.config(value=0)
+
+def cancel_jobs():
+    job_runner.cancel()
+    finish_progress()
 
 
 # Create the main window
 window = tk.Tk()
 window.title("GitHub Follower Analyzer")
 window.geometry("700x800") # Increased window size
+job_runner = jobs.JobRunner(window)
 
 
 # Create a label and an entry field for the username
@@ -300,6 +724,38 @@ refresh_followers_button.pack(side=tk.LEFT, padx=5)
 refresh_following_button = ttk.Button(button_frame, text="Refresh Following", command=lambda: display_following(True))
 refresh_following_button.pack(side=tk.LEFT, padx=5)
 
+# Second row: actions over many users / accounts
+tools_frame = ttk.Frame(window)
+tools_frame.pack(pady=(0, 10))
+
+enrich_button = ttk.Button(tools_frame, text="Enrich All", command=enrich_all)
+enrich_button.pack(side=tk.LEFT, padx=5)
+
+refresh_all_button = ttk.Button(tools_frame, text="Refresh All", command=refresh_all_accounts)
+refresh_all_button.pack(side=tk.LEFT, padx=5)
+
+history_button = ttk.Button(tools_frame, text="History", command=show_history)
+history_button.pack(side=tk.LEFT, padx=5)
+
+network_button = ttk.Button(tools_frame, text="Network", command=show_network)
+network_button.pack(side=tk.LEFT, padx=5)
+
+export_button = ttk.Button(tools_frame, text="Export", command=export_data)
+export_button.pack(side=tk.LEFT, padx=5)
+
+diagnostics_button = ttk.Button(tools_frame, text="Diagnostics", command=show_diagnostics)
+diagnostics_button.pack(side=tk.LEFT, padx=5)
+
+# Progress of running background fetches (per page)
+progress_frame = ttk.Frame(window)
+progress_frame.pack(fill=tk.X, padx=10)
+progress_bar = ttk.Progressbar(progress_frame, mode="determinate", length=200)
+progress_bar.pack(side=tk.LEFT)
+progress_label = ttk.Label(progress_frame, text="")
+progress_label.pack(side=tk.LEFT, padx=10)
+cancel_button = ttk.Button(progress_frame, text="Cancel", command=cancel_jobs)
+cancel_button.pack(side=tk.RIGHT)
+
 
 # Create a Treeview to display the result in columns
 result_frame = ttk.Frame(window)
@@ -307,37 +763,40 @@ result_frame.pack(fill=tk.BOTH, expand=True)
 
 
 # --- Treeview mit sortierbaren Spalten ---
-def treeview_sort_column(treeview, col, reverse):
-    # Get all items and their values for the given column
-    data = [(treeview.set(k, col), k) for k in treeview.get_children("")]
-    # Try to convert to datetime for timestamp, or to string otherwise
-    if col == "timestamp":
-        from datetime import datetime
-        def parse_dt(val):
-            try:
-                return datetime.fromisoformat(val)
-            except Exception:
-                return val
-        data.sort(key=lambda t: parse_dt(t[0]), reverse=reverse)
-    else:
-        data.sort(key=lambda t: t[0].lower() if isinstance(t[0], str) else t[0], reverse=reverse)
-    # Rearrange items in sorted positions
-    for index, (val, k) in enumerate(data):
-        treeview.move(k, '', index)
+def treeview_sort_column(view, col, reverse):
+    # Sort the row model with precomputed typed keys (only the visible rows live in the Treeview)
+    view.sort(col, reverse)
     # Reverse sort next time
-    treeview.heading(col, command=lambda: treeview_sort_column(treeview, col, not reverse))
+    view.tree.heading(col, command=lambda: treeview_sort_column(view, col, not reverse))
+
+def timestamp_sort_key(value):
+    # Epoch seconds; rows without a valid timestamp sort first
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except (TypeError, ValueError):
+        return -1
+
+FOLLOWS_BACK_ORDER = {"Yes": 0, "No": 1, "?": 2}
+SORT_KEYS = {
+    "timestamp": timestamp_sort_key,
+    "follows_back": lambda value: FOLLOWS_BACK_ORDER.get(value, 3),
+}
 
 
 
-# --- Treeview with sortable columns (all English) ---
-result_tree = ttk.Treeview(result_frame, columns=("username", "timestamp", "follows_back"), show="headings", height=15)
-result_tree.heading("username", text="Username", command=lambda: treeview_sort_column(result_tree, "username", False))
-result_tree.heading("timestamp", text="First seen / following since", command=lambda: treeview_sort_column(result_tree, "timestamp", False))
-result_tree.heading("follows_back", text="Follows back?", command=lambda: treeview_sort_column(result_tree, "follows_back", False))
+# --- Treeview with sortable columns (all English), virtualized ---
+COLUMNS = ("username", "timestamp", "follows_back")
+result_view = VirtualTreeview(result_frame, columns=COLUMNS, height=15, sort_keys=SORT_KEYS)
+result_tree = result_view.tree
+result_tree.heading("username", text="Username", command=lambda: treeview_sort_column(result_view, "username", False))
+result_tree.heading("timestamp", text="First seen / following since", command=lambda: treeview_sort_column(result_view, "timestamp", False))
+result_tree.heading("follows_back", text="Follows back?", command=lambda: treeview_sort_column(result_view, "follows_back", False))
 result_tree.column("username", width=180)
 result_tree.column("timestamp", width=180)
 result_tree.column("follows_back", width=100, anchor="center")
-result_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+# Tag config for new users (yellow background)
+result_tree.tag_configure("new_user_tag", background="yellow", foreground="black")
+result_view.pack()
 
 # --- Double-click to open user profile in browser ---
 def on_treeview_double_click(event):
@@ -354,11 +813,6 @@ def on_treeview_double_click(event):
 result_tree.bind("<Double-1>", on_treeview_double_click)
 
 
-# Add vertical scrollbar
-scrollbar = ttk.Scrollbar(result_frame, orient=tk.VERTICAL, command=result_tree.yview)
-result_tree.configure(yscrollcommand=scrollbar.set)
-scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
 # Labels for follower and following count and last update
 count_frame = ttk.Frame(window)
 count_frame.pack(fill=tk.X, padx=10, pady=(5, 10))
@@ -368,6 +822,8 @@ following_count_label = ttk.Label(count_frame, text="Following: 0")
 following_count_label.pack(side=tk.LEFT, padx=10)
 last_update_label = ttk.Label(count_frame, text="Last update: -")
 last_update_label.pack(side=tk.LEFT, padx=10)
+rate_limit_label = ttk.Label(count_frame, text="API budget: -")
+rate_limit_label.pack(side=tk.RIGHT, padx=10)
 
 # --- Detail frame for user info ---
 detail_frame = ttk.LabelFrame(window, text="User details", padding=(10, 5))
@@ -390,67 +846,41 @@ for var in detail_vars.values():
 if "user_details" not in previous_results:
     previous_results["user_details"] = {}
 
-import threading
-from datetime import datetime
-
-def calculate_score(details):
-    # Einfache Score-Logik: Gewichtung kann angepasst werden
-    followers = int(details.get("followers", 0) or 0)
-    public_repos = int(details.get("public_repos", 0) or 0)
-    public_gists = int(details.get("public_gists", 0) or 0)
-    created_at = details.get("created_at", "")
-    site_admin = details.get("site_admin", False)
-    # Account-Alter in Jahren
-    try:
-        years = (datetime.now() - datetime.fromisoformat(created_at.replace("Z", ""))).days / 365.25 if created_at else 0
-    except Exception:
-        years = 0
-    score = (
-        followers * 2 +
-        public_repos * 1.5 +
-        public_gists * 1 +
-        years * 2 +
-        (20 if site_admin else 0)
-    )
-    return int(score)
-
 def fetch_and_show_user_details(username):
     # Check cache first
     user_details = previous_results["user_details"].get(username)
+    metrics.inc("user_details_cache_total", result="hit" if user_details else "miss")
     if user_details:
-        update_detail_panel(user_details)
+        update_detail_panel(username, user_details)
         return
 
     # Show loading
     for key in detail_vars:
         detail_vars[key].set(f"{key.replace('_', ' ').capitalize()}: ...")
 
-    def fetch():
-        url = f"https://api.github.com/users/{username}"
-        try:
-            resp = requests.get(url)
-            resp.raise_for_status()
-            data = resp.json()
-            user_details = {
-                "location": data.get("location", "-"),
-                "public_repos": data.get("public_repos", "-"),
-                "public_gists": data.get("public_gists", "-"),
-                "following": data.get("following", "-"),
-                "followers": data.get("followers", "-"),
-                "created_at": data.get("created_at", "-"),
-                "site_admin": data.get("site_admin", False),
-            }
-            user_details["score"] = calculate_score(user_details)
-            previous_results["user_details"][username] = user_details
-            save_previous_results()
-            window.after(0, lambda: update_detail_panel(user_details))
-        except Exception as e:
-            window.after(0, lambda: [detail_vars[k].set(f"{k.replace('_', ' ').capitalize()}: -") for k in detail_vars])
-            messagebox.showerror("Error", f"Could not fetch details for {username}.\n{e}")
-
-    threading.Thread(target=fetch, daemon=True).start()
-
-def update_detail_panel(user_details):
+    def fetch(job):
+        import enrich
+        import github_api
+        user_details = enrich.details_from_rest(github_api.fetch_profile(username, cancel=job.cancelled, cached=False))
+        user_details["score"] = calculate_score(user_details)
+        return user_details
+
+    def on_done(user_details):
+        previous_results["user_details"][username] = user_details
+        get_score_engine().update({username: user_details})
+        store.upsert_user_details(username, user_details)
+        update_rate_limit_label()
+        update_detail_panel(username, user_details)
+
+    def on_error(e):
+        update_rate_limit_label()
+        for k in detail_vars:
+            detail_vars[k].set(f"{k.replace('_', ' ').capitalize()}: -")
+        messagebox.showerror("Error", f"Could not fetch details for {username}.\n{e}")
+
+    job_runner.submit(("details", username), fetch, on_done=on_done, on_error=on_error)
+
+def update_detail_panel(username, user_details):
     detail_vars["location"].set(f"Location: {user_details.get('location', '-')}")
     detail_vars["public_repos"].set(f"Public repos: {user_details.get('public_repos', '-')}")
     detail_vars["public_gists"].set(f"Public gists: {user_details.get('public_gists', '-')}")
@@ -458,7 +888,13 @@ def update_detail_panel(user_details):
     detail_vars["followers"].set(f"Followers: {user_details.get('followers', '-')}")
     detail_vars["created_at"].set(f"Created at: {user_details.get('created_at', '-')}")
     detail_vars["site_admin"].set(f"Site admin: {'Yes' if user_details.get('site_admin', False) else 'No'}")
-    detail_vars["score"].set(f"Community Score: {user_details.get('score', '-')}")
+    engine = get_score_engine()
+    score = engine.score(username)
+    if score is None:
+        detail_vars["score"].set("Community Score: -")
+    else:
+        percentile = engine.percentile(username)
+        detail_vars["score"].set(f"Community Score: {score} (top {max(100 - percentile, 1):.0f}% of {len(engine)} cached users)")
 
 # --- Double-click to fetch and show details ---
 def on_treeview_double_click(event):
@@ -488,13 +924,19 @@ def on_treeview_select(event):
     # Zeige sofort gecachte Details, falls vorhanden
     user_details = previous_results.get("user_details", {}).get(username)
     if user_details:
-        update_detail_panel(user_details)
+        update_detail_panel(username, user_details)
     else:
         # Zeige Platzhalter, bis ggf. Doppelklick für Abruf erfolgt
         for key in detail_vars:
             detail_vars[key].set(f"{key.replace('_', ' ').capitalize()}: -")
 
-result_tree.bind("<<TreeviewSelect>>", on_treeview_select)
+result_tree.bind("<<TreeviewSelect>>", on_treeview_select, add="+")
+
+# Read the rest of the data once the window is shown
+window.after(200, preload_results)
+STORE_CHECK_MS = 1000
+window.after(STORE_CHECK_MS, check_store_errors)
+window.protocol("WM_DELETE_WINDOW", on_close)
 
 # Start the UI main loop
 window.mainloop()